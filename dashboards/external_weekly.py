@@ -13,6 +13,9 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from auth.simple_auth import authenticate_external
 from scripts.config import get_excluded_keywords, should_exclude_article
+from scripts.topk_selector import select_top_k
+from scripts.article_store import load_latest
+from scripts.noise_filter import noise_mask
 
 # 페이지 설정
 st.set_page_config(
@@ -29,7 +32,6 @@ email = authenticate_external()
 # 대시보드 메인 코드
 # --- Data Loading Logic (Synced with Internal) ---
 import pandas as pd
-import glob
 import datetime
 from datetime import datetime, timedelta
 
@@ -38,51 +40,6 @@ def get_weekly_date_range():
     start_date = today - timedelta(days=7)
     return start_date, today
 
-# ====================
-# Filter Logic (Ported from Internal for Consistency)
-# ====================
-EXCLUDED_KEYWORDS = [
-    "네이버 배송", "네이버 쇼핑", "네이버 페이", "도착보장", 
-    "쿠팡", "배달의민족", "요기요", "무신사", "컬리", "알리익스프레스", "테무",
-    "부동산", "아파트", "전세", "매매", "청약", "건설", 
-    "금리 인하", "주식 개장", "환율", "코스피", "코스닥", "증시", "상한가", 
-    "주가", "주식", "목표주가", "특징주", "급등",
-    "여행", "호텔", "항공권", "예능", "드라마", "축구", "야구", "올림픽", "연예", "공연", "뮤지컬", "전시회", "관람",
-    "이차전지", "배터리", "전기차", "반도체", "디스플레이", "조선", "철강",
-    "채용", "신입사원", "공채", "원서접수", "고양이",
-    "음식", "1인분", "문여는", "대전시장", "이뮨온시아", "에스바이오메딕스", "알테오젠"
-]
-
-GENERIC_KEYWORDS = ["계약", "M&A", "인수", "합병", "투자", "제휴", "CJ"]
-PHARMA_CONTEXT_KEYWORDS = ["제약", "바이오", "신약", "임상", "헬스케어", "의료", "병원", "약국", "치료제", "백신", "진단", "물류", "유통", "공급"]
-
-def is_noise_article(row):
-    # Check Title + Summary + Content (Body)
-    text = str(row['title']) + " " + str(row.get('summary', '')) + " " + str(row.get('content', ''))
-    
-    # 1. Check Explicit Exclusions
-    for exc in EXCLUDED_KEYWORDS:
-        if exc in text:
-            return True
-            
-    # 2. Homonym Check: "제약" (Constraint vs Pharma)
-    if "제약" in text:
-        if any(x in text for x in ["시간 제약", "공간 제약", "물리적 제약", "발전 제약", "활동 제약"]):
-            if not any(pk in text for pk in PHARMA_CONTEXT_KEYWORDS if pk != "제약"):
-                return True
-                
-    # 3. Context Check for Generics (M&A, Investment)
-    if any(k in text for k in GENERIC_KEYWORDS):
-        if not any(pk in text for pk in PHARMA_CONTEXT_KEYWORDS):
-            return True
-            
-    # 4. Specific Distribution Exclusion
-    if str(row.get('category')) == 'Distribution':
-        if '도이치뱅크' in text:
-            return True
-            
-    return False
-
 # Configure Gemini API
 GENAI_API_KEY = os.getenv("GENAI_API_KEY")
 if not GENAI_API_KEY:
@@ -165,16 +122,20 @@ COMPETITOR_KEYWORDS = ["지오영", "블루엠텍", "바로팜", "DKSH", "쉥커
 @st.cache_data(ttl=60, show_spinner=False)
 def load_weekly_data():
     try:
-        base_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "articles_raw")
+        base_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
         if not os.path.exists(base_dir):
-            base_dir = "../data/articles_raw"
+            base_dir = "../data"
             
-        ranked_files = sorted(glob.glob(os.path.join(base_dir, "articles_ranked_*.csv")))
-        if not ranked_files:
+        # Latest ranked week: Parquet article store partition (CSV if the store is behind)
+        df, latest_file = load_latest(
+            'ranked',
+            store_dir=os.path.join(base_dir, "articles"),
+            raw_dir=os.path.join(base_dir, "articles_raw")
+        )
+        if latest_file is None:
             return pd.DataFrame(), "No Data"
-            
-        latest_file = ranked_files[-1]
-        df = pd.read_csv(latest_file, encoding='utf-8-sig')
+        # Noise flags are computed at rank time; bodies are only read for files ranked before that
+        blob_dir = os.path.join(base_dir, "blobs")
         
         if 'published_date' in df.columns:
             df['published_date'] = pd.to_datetime(df['published_date']).dt.date
@@ -187,7 +148,7 @@ def load_weekly_data():
             
         # Noise Filter
         if not df.empty:
-            df['is_noise'] = df.apply(is_noise_article, axis=1)
+            df['is_noise'] = noise_mask(df, 'external', blob_dir)
             df = df[~df['is_noise']]
         
         # Competitor Filter (HARD EXCLUDE at load time)
@@ -525,29 +486,15 @@ if show_ai_only:
         # (Competitors already stripped in load_weekly_data, so is_top20 may have <20 left — that's fine)
         df_visible = df_sorted[df_sorted['is_top20'] == True]
     else:
-        # Fallback (older files without is_top20 column)
-        balanced_selection = []
-        selected_urls = set()
-        categories = df_sorted['category'].unique()
-
-        for cat in ['Distribution', 'Client', 'BD', 'Zuellig']:
-            if cat in categories:
-                cat_articles = df_sorted[df_sorted['category'] == cat].head(4)
-                balanced_selection.append(cat_articles)
-                selected_urls.update(cat_articles['url'].tolist())
-
-        if balanced_selection:
-            df_balanced = pd.concat(balanced_selection)
-        else:
-            df_balanced = pd.DataFrame()
-
-        remaining_slots = 20 - len(df_balanced)
-        if remaining_slots > 0:
-            remaining_candidates = df_sorted[~df_sorted['url'].isin(selected_urls)]
-            df_fill = remaining_candidates.head(remaining_slots)
-            df_visible = pd.concat([df_balanced, df_fill])
-        else:
-            df_visible = df_balanced.head(20)
+        # Fallback (older files without is_top20 column): 4 per priority category, then best remaining
+        top_positions = select_top_k(
+            df_sorted[score_col].values,
+            df_sorted['category'].values,
+            k=20,
+            keys=df_sorted['url'].values,
+            min_quotas=[('Distribution', 4), ('Client', 4), ('BD', 4), ('Zuellig', 4)]
+        )
+        df_visible = df_sorted.iloc[top_positions]
 else:
     # --- Show All Mode ---
     df_visible = df_sorted
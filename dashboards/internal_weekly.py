@@ -17,6 +17,15 @@ import pytz
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from auth.simple_auth import authenticate_internal
+from scripts.topk_selector import select_top_k
+from scripts.scoring_client import ScoringClient
+from scripts.article_store import load_latest
+from scripts.noise_filter import noise_mask
+from scripts.article_catalog import ArticleCatalog
+from scripts.feedback_sink import FeedbackSink
+from scripts.gemini_client import GeminiClient
+from scripts.llm_json import salvage_objects
+from scripts.prompt_packer import PromptPacker, estimate_tokens, load_settings as load_packer_settings
 
 # Page configuration
 st.set_page_config(
@@ -212,51 +221,6 @@ def translate_text(text, target='en'):
 
 INTERNAL_KEYWORDS = list(KEYWORD_MAPPING.keys())
 
-EXCLUDED_KEYWORDS = [
-    "네이버 배송", "네이버 쇼핑", "네이버 페이", "도착보장", 
-    "쿠팡", "배달의민족", "요기요", "무신사", "컬리", "알리익스프레스", "테무",
-    "부동산", "아파트", "전세", "매매", "청약", "건설", 
-    "금리 인하", "주식 개장", "환율", "코스피", "코스닥", "증시", "상한가", 
-    "주가", "주식", "목표주가", "특징주", "급등",
-    "여행", "호텔", "항공권", "예능", "드라마", "축구", "야구", "올림픽", "연예", "공연", "뮤지컬", "전시회", "관람",
-    "이차전지", "배터리", "전기차", "반도체", "디스플레이", "조선", "철강",
-    "채용", "신입사원", "공채", "원서접수", "고양이",
-    "음식", "1인분", "문여는", "대전시장", "이뮨온시아", "에스바이오메딕스", "이지메디컴", "낙태", "살인", "의료진", "구속", "선고", "알테오젠"
-]
-
-GENERIC_KEYWORDS = ["계약", "M&A", "인수", "합병", "투자", "제휴", "CJ"]
-PHARMA_CONTEXT_KEYWORDS = ["제약", "바이오", "신약", "임상", "헬스케어", "의료", "병원", "약국", "치료제", "백신", "진단", "물류", "유통", "공급"]
-
-def is_noise_article(row):
-    # Check Title + Summary + Content (Body)
-    text = str(row['title']) + " " + str(row.get('summary', '')) + " " + str(row.get('content', ''))
-    
-    # 1. Check Explicit Exclusions
-    for exc in EXCLUDED_KEYWORDS:
-        if exc in text:
-            return True
-            
-    # 2. Homonym Check: "제약" (Constraint vs Pharma)
-    if "제약" in text:
-        if any(x in text for x in ["시간 제약", "공간 제약", "물리적 제약", "발전 제약", "활동 제약"]):
-            if not any(pk in text for pk in PHARMA_CONTEXT_KEYWORDS if pk != "제약"):
-                return True
-
-    # 3. Generic Keyword Context Check
-    row_kws = str(row.get('keywords', ''))
-    if row_kws:
-        matched_gen = [gk for gk in GENERIC_KEYWORDS if gk in row_kws]
-        if matched_gen:
-             if not any(pk in text for pk in PHARMA_CONTEXT_KEYWORDS):
-                 return True
-                 
-    # 4. Specific Distribution Exclusion
-    if str(row.get('category')) == 'Distribution':
-        if '도이치뱅크' in text:
-            return True
-            
-    return False
-
 def has_internal_keyword(row_keywords):
     if pd.isna(row_keywords) or row_keywords == '':
         return False
@@ -281,96 +245,23 @@ def handle_like(row_dict):
         pass
     st.toast("Saved!", icon="👍")
 
+@st.cache_resource(show_spinner=False)
+def get_feedback_sink(gh_repo, gh_token):
+    """One buffered sink per server process; it commits queued feedback to GitHub in the background"""
+    return FeedbackSink(repo=gh_repo, token=gh_token,
+                        base_dir=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 def save_feedback(row, label):
     """
-    Save feedback to GitHub repo via REST API (persistent across Streamlit Cloud reboots).
-    Appends to data/labels/feedback_log.csv with url as merge key.
+    Queue feedback for GitHub (persistent across Streamlit Cloud reboots) and append it to
+    data/labels/feedback_log.csv locally. The click only touches local files; queued events
+    are committed in batches as data/labels/feedback_events/*.json (see scripts/feedback_sink.py).
     label: 1 = Like (reward), 0 = Dislike
     """
-    import base64
-    from datetime import datetime
-    import pytz
-    
     try:
         gh_token = st.session_state.get('gh_token', '')
         gh_repo = st.session_state.get('gh_repo') or 'Lilyleeyaa/zp-market-monitoring-v3-share'
-        
-        file_path = "data/labels/feedback_log.csv"
-        
-        # Prepare feedback row (use csv module for proper quoting)
-        import csv, io
-        c_url = str(row.get('url', '')).strip()
-        c_title = str(row.get('title', '')).replace("\n", " ").strip()
-        c_category = str(row.get('category', '')).strip()
-        c_keywords = str(row.get('keywords', '')).strip()
-        c_score_ag = str(row.get('score_ag', '')).strip()
-        
-        # Apply KST timezone
-        kst = pytz.timezone('Asia/Seoul')
-        feedback_date = datetime.now(kst).strftime("%Y-%m-%d %H:%M")
-        
-        buf = io.StringIO()
-        writer = csv.writer(buf, quoting=csv.QUOTE_MINIMAL)
-        writer.writerow([feedback_date, c_url, c_title, c_category, c_keywords, c_score_ag, label])
-        new_line = buf.getvalue().rstrip("\r\n")
-        
-        # 1. Save locally first
-        import os
-        local_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "labels")
-        os.makedirs(local_dir, exist_ok=True)
-        local_path = os.path.join(local_dir, "feedback_log.csv")
-        try:
-            if not os.path.exists(local_path):
-                with open(local_path, "w", encoding="utf-8-sig") as f:
-                    f.write("feedback_date,url,title,category,keywords,score_ag,reward\n")
-            with open(local_path, "a", encoding="utf-8-sig") as f:
-                f.write(new_line + "\n")
-            print(f"[OK] Feedback saved locally: {c_title[:40]}...")
-        except Exception as e:
-            print(f"[WARN] Could not save feedback locally: {e}")
-            
-        if not gh_token:
-            return  # Run locally without GitHub sync if token is missing
-        
-        # GitHub API: Get existing file (or create new)
-        api_url = f"https://api.github.com/repos/{gh_repo}/contents/{file_path}"
-        headers = {
-            "Authorization": f"Bearer {gh_token}",
-            "Accept": "application/vnd.github.v3+json"
-        }
-        
-        resp = requests.get(api_url, headers=headers)
-        
-        if resp.status_code == 200:
-            # File exists — append to it
-            file_data = resp.json()
-            existing_content = base64.b64decode(file_data["content"]).decode("utf-8")
-            updated_content = existing_content.rstrip("\n") + "\n" + new_line + "\n"
-            sha = file_data["sha"]
-        else:
-            # File doesn't exist — create with header
-            header = "feedback_date,url,title,category,keywords,score_ag,reward"
-            updated_content = header + "\n" + new_line + "\n"
-            sha = None
-        
-        # Commit to GitHub
-        payload = {
-            "message": f"Feedback: {c_title[:40]}... ({feedback_date})",
-            "content": base64.b64encode(updated_content.encode("utf-8")).decode("utf-8"),
-            "branch": "main"
-        }
-        if sha:
-            payload["sha"] = sha
-        
-        put_resp = requests.put(api_url, headers=headers, json=payload)
-        
-        if put_resp.status_code in [200, 201]:
-            print(f"[OK] Feedback saved to GitHub: {c_title[:40]}...")
-        else:
-            raise RuntimeError(f"GitHub API {put_resp.status_code}: {put_resp.text[:300]}")
-            
-    except RuntimeError:
-        raise  # Re-raise to show in toast
+        get_feedback_sink(gh_repo, gh_token).record(row, label)
     except Exception as e:
         raise RuntimeError(f"save_feedback error: {e}")
 
@@ -394,6 +285,74 @@ def translate_article_batch(title, summary, keywords):  # Cache v8
         pass
     return t_title, t_summary, t_keywords
 
+@st.cache_resource(show_spinner=False)
+def get_gemini_client():
+    """One client (and rate limiter) per server process"""
+    return GeminiClient(GENAI_API_KEY)
+
+TRANSLATION_TTL = 3600  # same lifetime as translate_article_batch's cache
+
+@st.cache_resource(show_spinner=False)
+def get_translation_cache():
+    """Translations shared by every session of this server process: {key: (translation, translated_at)}"""
+    return {}
+
+def translation_key(title, summary, keywords):
+    return tuple('' if pd.isna(v) else str(v) for v in (title, summary, keywords))
+
+def cached_translation(key):
+    entry = get_translation_cache().get(key)
+    return entry[0] if entry and time.time() - entry[1] < TRANSLATION_TTL else None
+
+def translate_articles(keys):
+    """
+    Translate many (title, summary, keywords) at once: articles are packed into token-budgeted
+    Gemini requests with the glossary sent once per request as the system instruction.
+    Returns {key: (title, summary, keywords)}; keys missing from the responses fall back to
+    translate_article_batch.
+    """
+    if not GENAI_API_KEY or not keys:
+        return {}
+    full_glossary = {**KEYWORD_MAPPING, **EXTRA_GLOSSARY}
+    glossary_context = "\n".join([f"- {k}: {v}" for k, v in full_glossary.items()])
+    instructions = f"""You are a professional pharmaceutical translator.
+Translate the title, summary and keywords of each Korean article in the input to English.
+
+Rules:
+1. Maintain professional industry terminology.
+2. Use the specific glossary below for strict term matching:
+{glossary_context}
+
+Output only JSON, no explanations:
+{{"translations": [{{"id": <id>, "title": "...", "summary": "...", "keywords": "..."}}]}}"""
+
+    settings = load_packer_settings()
+    items = [{'id': i, 'title': t, 'summary': s, 'keywords': k} for i, (t, s, k) in enumerate(keys)]
+    item_tokens = lambda item: estimate_tokens(json.dumps(item, ensure_ascii=False), settings)
+    # The English output runs about as long (in tokens) as the Korean input
+    packer = PromptPacker(fixed_tokens=estimate_tokens(instructions, settings),
+                          input_cost=item_tokens, output_cost=item_tokens, settings=settings)
+    packs = packer.pack(items)
+    packer.report(packs)
+    responses = get_gemini_client().generate_many(
+        [json.dumps(pack.items, ensure_ascii=False, indent=2) for pack in packs],
+        generation_config={"temperature": 0.2, "maxOutputTokens": 8192,
+                           "responseMimeType": "application/json"},
+        system_instruction=instructions)
+
+    translated = {}
+    for response in responses:
+        if not response:
+            continue
+        # Complete entries of a truncated / malformed response are kept
+        for t in salvage_objects(response, 'translations', required='id')[0]:
+            try:
+                key = keys[int(t['id'])]
+            except (ValueError, TypeError, IndexError):
+                continue
+            translated[key] = (t.get('title') or key[0], t.get('summary') or key[1], t.get('keywords') or key[2])
+    return translated
+
 # ====================
 # Data Loading (V3 Logic with Strict Filter)
 # ====================
@@ -407,17 +366,20 @@ def get_weekly_date_range():
 @st.cache_data(ttl=60, show_spinner=False)
 def load_weekly_data():
     try:
-        import glob
-        base_dir = "data/articles_raw"
+        base_dir = "data"
         if not os.path.exists(base_dir):
-            base_dir = "../data/articles_raw"
+            base_dir = "../data"
         
-        ranked_files = sorted(glob.glob(os.path.join(base_dir, "articles_ranked_*.csv")))
-        if not ranked_files:
+        # Latest ranked week: Parquet article store partition (CSV if the store is behind)
+        df, latest_file = load_latest(
+            'ranked',
+            store_dir=os.path.join(base_dir, "articles"),
+            raw_dir=os.path.join(base_dir, "articles_raw")
+        )
+        if latest_file is None:
             return pd.DataFrame(), {}, "No Files"
-        
-        latest_file = ranked_files[-1]
-        df = pd.read_csv(latest_file, encoding='utf-8-sig') 
+        # Noise flags are computed at rank time; bodies are only read for files ranked before that
+        blob_dir = os.path.join(base_dir, "blobs")
         
         if 'published_date' in df.columns:
             df['published_date'] = pd.to_datetime(df['published_date']).dt.date
@@ -440,7 +402,7 @@ def load_weekly_data():
             other_df['has_internal_kw'] = other_df['keywords'].apply(has_internal_keyword)
             other_df = other_df[other_df['has_internal_kw']]
             if not other_df.empty:
-                other_df['is_noise'] = other_df.apply(is_noise_article, axis=1)
+                other_df['is_noise'] = noise_mask(other_df, 'internal', blob_dir)
                 other_df = other_df[~other_df['is_noise']]
             
             df = pd.concat([top20_df, other_df]).drop_duplicates(subset=['url'])
@@ -451,7 +413,7 @@ def load_weekly_data():
             
             # 2. Noise Filter
             if not df.empty:
-                df['is_noise'] = df.apply(is_noise_article, axis=1)
+                df['is_noise'] = noise_mask(df, 'internal', blob_dir)
                 df = df[~df['is_noise']]
             
         return df, os.path.basename(latest_file), "AI Ranked"
@@ -645,6 +607,76 @@ mask = temp_mask
 if selected_keywords:
     mask = mask & (df['keywords'].isin(selected_keywords))
 
+# --- On-demand Re-ranking (local scoring service, optional) ---
+@st.cache_data(ttl=30, show_spinner=False)
+def get_scoring_service_status():
+    return ScoringClient().health()
+
+view_key = (filename, str(start_date), str(end_date), tuple(selected_categories), tuple(selected_keywords))
+if get_scoring_service_status():
+    with st.expander("⚡ Re-rank this view", expanded=False):
+        q_cols = st.columns(5)
+        rerank_quotas = {}
+        for q_col, (cat, default_quota) in zip(q_cols, [('Distribution', 3), ('Zuellig', 3), ('BD', 8), ('Client', 8)]):
+            rerank_quotas[cat] = int(q_col.number_input(cat, min_value=0, max_value=20, value=default_quota, step=1))
+        rerank_k = int(q_cols[4].number_input("Top K", min_value=1, max_value=100, value=20, step=1))
+
+        b_col1, b_col2 = st.columns(2)
+        if b_col1.button("Re-rank", key="rerank_view"):
+            try:
+                client = ScoringClient()
+                with st.spinner("Re-ranking..."):
+                    result = client.select_top(rows=client.rows_from_frame(df[mask]), k=rerank_k, quotas=rerank_quotas)
+                st.session_state['rerank'] = {'view': view_key, 'articles': result['selected']}
+                st.toast(f"Re-ranked {result['n_candidates']} articles in {result['elapsed_ms']:.0f} ms", icon="⚡")
+            except Exception as e:
+                st.error(f"Re-rank failed: {e}")
+        if b_col2.button("Reset to stored ranking", key="rerank_reset"):
+            st.session_state.pop('rerank', None)
+
+# --- Archive search across all crawled weeks (indexed SQLite catalog) ---
+def _data_dir():
+    return "data" if os.path.exists("data") else "../data"
+
+@st.cache_data(ttl=300, show_spinner=False)
+def sync_article_catalog():
+    base_dir = _data_dir()
+    catalog = ArticleCatalog(os.path.join(base_dir, "cache", "article_catalog.db"))
+    catalog.sync(store_dir=os.path.join(base_dir, "articles"), raw_dir=os.path.join(base_dir, "articles_raw"))
+    return catalog.summary()
+
+@st.cache_data(ttl=300, show_spinner=False)
+def search_article_catalog(start, end, categories, keyword, top_only):
+    catalog = ArticleCatalog(os.path.join(_data_dir(), "cache", "article_catalog.db"))
+    return catalog.query(start, end, list(categories), keyword or None, top_only, limit=500)
+
+with st.expander("📚 Search all weeks", expanded=False):
+    try:
+        catalog_summary = sync_article_catalog()
+        a_col1, a_col2, a_col3, a_col4 = st.columns([2, 2, 2, 1])
+        archive_range = a_col1.date_input("Published", [datetime.now().date() - timedelta(days=90), datetime.now().date()], key="archive_range")
+        archive_categories = a_col2.multiselect("Category", all_categories, default=[], key="archive_categories")
+        archive_keyword = a_col3.text_input("Keyword (exact)", key="archive_keyword").strip()
+        archive_top_only = a_col4.checkbox("Top 20 only", value=False, key="archive_top_only")
+        if isinstance(archive_range, (list, tuple)) and len(archive_range) == 2:
+            archive_df = search_article_catalog(
+                str(archive_range[0]), str(archive_range[1]), tuple(archive_categories), archive_keyword, archive_top_only
+            )
+            st.caption(f"{len(archive_df)} articles (catalog: {catalog_summary['articles']} articles, "
+                       f"{catalog_summary['ranked_crawls']} ranked weeks)")
+            st.dataframe(
+                archive_df[['published_date', 'category', 'keywords', 'title', 'weeks_top20', 'best_final_score', 'url']],
+                column_config={'url': st.column_config.LinkColumn("url")},
+                hide_index=True, use_container_width=True
+            )
+    except Exception as e:
+        st.warning(f"Article catalog unavailable: {e}")
+
+# Re-ranked selection only applies to the view it was computed for
+rerank = st.session_state.get('rerank')
+if rerank is not None and rerank.get('view') != view_key:
+    rerank = None
+
 if show_ai_only and 'lgbm_score' in df.columns:
     df_temp = df[mask]
     score_col = 'final_score' if 'final_score' in df_temp.columns else 'lgbm_score'
@@ -652,7 +684,12 @@ if show_ai_only and 'lgbm_score' in df.columns:
     # Prefer is_top20 flag produced by rank_articles.py.
     # rank_articles already does category balancing + obesity cap,
     # so we trust it rather than re-ranking independently here.
-    if 'is_top20' in df_temp.columns and df_temp['is_top20'].any():
+    if rerank is not None:
+        # On-demand selection from the scoring service (fresh scores for this view)
+        rerank_scores = {a['url']: a['final_score'] for a in rerank['articles']}
+        filtered_df = df_temp[df_temp['url'].isin(rerank_scores)].copy()
+        filtered_df['final_score'] = filtered_df['url'].map(rerank_scores)
+    elif 'is_top20' in df_temp.columns and df_temp['is_top20'].any():
         filtered_df = df_temp[df_temp['is_top20'] == True]
     else:
         # Fallback (when file has no is_top20 column)
@@ -663,8 +700,12 @@ if show_ai_only and 'lgbm_score' in df.columns:
             '메나리니'
         ]
         ai_threshold = 0.18
-        ai_candidates = df_temp[df_temp[score_col] >= ai_threshold]
-        top_ai = ai_candidates.nlargest(20, score_col)
+        top_ai = df_temp.iloc[select_top_k(
+            df_temp[score_col].values,
+            df_temp['category'].values if 'category' in df_temp.columns else [None] * len(df_temp),
+            k=20,
+            min_score=ai_threshold
+        )]
         vip_pattern = '|'.join(VIP_KEYWORDS)
         has_vip = df_temp[
             df_temp['title'].str.contains(vip_pattern, case=False, na=False) |
@@ -704,6 +745,20 @@ unique_categories = filtered_df['category'].dropna().unique()
 sorted_categories = [cat for cat in category_priority if cat in unique_categories]
 sorted_categories += sorted([cat for cat in unique_categories if cat not in category_priority])
 
+# English: translate every article no session has translated within the hour, in a few packed requests
+if use_english:
+    pending = list(dict.fromkeys(
+        translation_key(r.get('title'), r.get('summary', ''), r.get('keywords', ''))
+        for _, r in filtered_df[filtered_df['category'].isin(sorted_categories)].iterrows()))
+    pending = [key for key in pending if cached_translation(key) is None and (key[0] or key[1])]
+    if pending:
+        with st.spinner(f"Translating {len(pending)} articles..."):
+            translated = translate_articles(pending)
+        cache, now = get_translation_cache(), time.time()
+        for key in [k for k, (_, at) in list(cache.items()) if now - at >= TRANSLATION_TTL]:
+            cache.pop(key, None)
+        cache.update({key: (value, now) for key, value in translated.items()})
+
 for cat in sorted_categories:
     cat_df = filtered_df[filtered_df['category'] == cat]
     
@@ -726,7 +781,8 @@ for cat in sorted_categories:
         
         # Translate if needed (Restored)
         if use_english:
-            title, summary, keywords_trans = translate_article_batch(title, summary, keywords)
+            title, summary, keywords_trans = (cached_translation(translation_key(title, summary, keywords))
+                                              or translate_article_batch(title, summary, keywords))
             keywords = keywords_trans
         
         # Layout: Pure HTML Card (Inline Styles - Cannot be overridden by theme)
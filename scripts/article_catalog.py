@@ -0,0 +1,330 @@
+"""
+Local Article Catalog (SQLite)
+One indexed table of every crawled article across weeks, so date-range,
+category and keyword lookups are queries instead of reading every file.
+
+    articles          one row per article_id (sha1 of the url, as in score_cache / feature_store)
+                      with canonical_url, published_date, category, site_name, score_ag, ...
+    article_keywords  (keyword, article_id) - one row per comma-separated keyword
+    rankings          (article_id, kind, crawl_date) -> final_score, lgbm_score, is_top20
+    sources           partitions / CSV files already indexed (size + mtime signature)
+
+Kept up to date by the crawlers and the ranker (index_output after each write);
+sync() indexes whatever is missing from the article store (data/articles) or,
+for files not in the store yet, data/articles_raw; ranked crawls that retention.py
+dropped are indexed from their top-20 aggregate rows (data/articles/_aggregates). The database is a derived
+cache (data/cache/article_catalog.db) and can be rebuilt at any time.
+
+    python scripts/article_catalog.py                    # sync + summary
+    python scripts/article_catalog.py --rebuild
+"""
+import os
+import re
+import glob
+import sqlite3
+import argparse
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import pandas as pd
+
+try:
+    from score_cache import article_keys
+    from data_io import read_table
+except ImportError:
+    from scripts.score_cache import article_keys
+    from scripts.data_io import read_table
+
+CATALOG_PATH = os.path.join("data", "cache", "article_catalog.db")
+STORE_DIR = os.path.join("data", "articles")
+RAW_DATA_DIR = "data/articles_raw"
+
+ARTICLE_COLUMNS = ['article_id', 'url', 'canonical_url', 'title', 'summary', 'published_date', 'category',
+                   'site_name', 'score_ag', 'keywords', 'first_seen', 'last_seen']
+# Values from the most recent crawl win, whatever order files are indexed in
+UPSERT_ARTICLE = (
+    f"INSERT INTO articles VALUES ({', '.join('?' * len(ARTICLE_COLUMNS))}) ON CONFLICT(article_id) DO UPDATE SET "
+    + ", ".join(f"{c} = CASE WHEN excluded.last_seen >= last_seen THEN COALESCE(excluded.{c}, {c}) ELSE {c} END"
+                for c in ARTICLE_COLUMNS[3:10])
+    + ", first_seen = MIN(first_seen, excluded.first_seen), last_seen = MAX(last_seen, excluded.last_seen)"
+)
+RANKED_KINDS = ('ranked', 'ranked_daily')
+AGGREGATE_SIGNATURE = 'aggregate:top20'  # ranked crawls indexed from _aggregates/top20.parquet
+TRACKING_PARAMS = re.compile(r'^(utm_.*|referer|ref|fbclid|gclid)$', re.IGNORECASE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    article_id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    canonical_url TEXT NOT NULL,
+    title TEXT,
+    summary TEXT,
+    published_date TEXT,
+    category TEXT,
+    site_name TEXT,
+    score_ag REAL,
+    keywords TEXT,
+    first_seen TEXT,
+    last_seen TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_articles_canonical_url ON articles(canonical_url);
+CREATE INDEX IF NOT EXISTS idx_articles_published_date ON articles(published_date);
+CREATE INDEX IF NOT EXISTS idx_articles_category_date ON articles(category, published_date);
+
+CREATE TABLE IF NOT EXISTS article_keywords (
+    keyword TEXT NOT NULL,
+    article_id TEXT NOT NULL,
+    PRIMARY KEY (keyword, article_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS rankings (
+    article_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    crawl_date TEXT NOT NULL,
+    final_score REAL,
+    lgbm_score REAL,
+    is_top20 INTEGER,
+    PRIMARY KEY (article_id, kind, crawl_date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_rankings_date ON rankings(crawl_date, is_top20);
+
+CREATE TABLE IF NOT EXISTS sources (
+    name TEXT PRIMARY KEY,
+    signature TEXT,
+    rows INTEGER,
+    indexed_at TEXT
+);
+"""
+
+
+def canonical_url(url):
+    """Lower-cased host without www., no fragment / tracking params / trailing slash, sorted query"""
+    try:
+        parts = urlsplit(str(url).strip())
+    except ValueError:
+        return str(url).strip()
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not TRACKING_PARAMS.match(k))
+    return urlunsplit(('https' if parts.scheme in ('http', 'https') else parts.scheme,
+                       host, parts.path.rstrip('/'), urlencode(query), ''))
+
+
+def split_keywords(value):
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return []
+    return [k.strip() for k in str(value).split(',') if k.strip()]
+
+
+def _none_if_nan(value):
+    return None if value is None or (not isinstance(value, str) and pd.isna(value)) else value
+
+
+class ArticleCatalog:
+    def __init__(self, path=CATALOG_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Connection committed on success, rolled back on error, always closed"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ---------------------------------------------------------------- writing
+    def index_frame(self, df, kind, crawl_date, source=None, signature=None):
+        """Upsert one crawl/ranking output (kind as in article_store). Returns rows indexed."""
+        if df is None or df.empty or 'url' not in df.columns:
+            return 0
+        df = df[df['url'].notna()].drop_duplicates(subset=['url'], keep='last')
+        article_ids, _ = article_keys(df[['url']])
+
+        def col(name):
+            return df[name].tolist() if name in df.columns else [None] * len(df)
+
+        score_ag = pd.to_numeric(df['score_ag'], errors='coerce').tolist() if 'score_ag' in df.columns else [None] * len(df)
+        article_rows, keyword_rows = [], []
+        for article_id, url, title, summary, published, category, site, score, keywords in zip(
+                article_ids, col('url'), col('title'), col('summary'), col('published_date'), col('category'),
+                col('site_name'), score_ag, col('keywords')):
+            article_rows.append((article_id, str(url), canonical_url(url), _none_if_nan(title), _none_if_nan(summary),
+                                 _none_if_nan(published), _none_if_nan(category), _none_if_nan(site),
+                                 _none_if_nan(score), _none_if_nan(keywords), crawl_date, crawl_date))
+            keyword_rows.extend((k, article_id) for k in split_keywords(keywords))
+
+        with self._connect() as conn:
+            conn.executemany(UPSERT_ARTICLE, article_rows)
+            conn.executemany("INSERT OR IGNORE INTO article_keywords VALUES (?, ?)", keyword_rows)
+            if kind in RANKED_KINDS:
+                final = pd.to_numeric(df['final_score'], errors='coerce').tolist() if 'final_score' in df.columns else [None] * len(df)
+                lgbm = pd.to_numeric(df['lgbm_score'], errors='coerce').tolist() if 'lgbm_score' in df.columns else [None] * len(df)
+                top = df['is_top20'].fillna(False).astype(bool).tolist() if 'is_top20' in df.columns else [False] * len(df)
+                conn.execute("DELETE FROM rankings WHERE kind = ? AND crawl_date = ?", (kind, crawl_date))
+                conn.executemany(
+                    "INSERT INTO rankings VALUES (?, ?, ?, ?, ?, ?)",
+                    [(a, kind, crawl_date, _none_if_nan(f), _none_if_nan(l), int(t))
+                     for a, f, l, t in zip(article_ids, final, lgbm, top)]
+                )
+            if source:
+                conn.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?)",
+                             (source, signature, len(df), datetime.now().isoformat(timespec='seconds')))
+        return len(df)
+
+    def sync(self, store_dir=STORE_DIR, raw_dir=RAW_DATA_DIR):
+        """Index store partitions / raw CSVs that are new or changed since last sync. Returns sources indexed."""
+        try:
+            from article_store import partition_files, read_articles, parse_filename
+            from retention import load_aggregate
+        except ImportError:
+            from scripts.article_store import partition_files, read_articles, parse_filename
+            from scripts.retention import load_aggregate
+
+        with self._connect() as conn:
+            indexed = dict(conn.execute("SELECT name, signature FROM sources").fetchall())
+
+        def signature(path):
+            stat = os.stat(path)
+            return f"{stat.st_size}:{stat.st_mtime}"
+
+        count = 0
+        in_store = set()
+        # A compacted month file is one signature for all of its crawl dates
+        for (kind, crawl_date), path in sorted(partition_files(store_dir).items(), key=lambda i: (i[0][1], i[0][0])):
+            in_store.add((kind, crawl_date))
+            name = f"{kind}/{crawl_date}"
+            if indexed.get(name) != signature(path):
+                df = read_articles(kind, crawl_date, crawl_date, store_dir=store_dir)
+                self.index_frame(df, kind, crawl_date, source=name, signature=signature(path))
+                count += 1
+
+        for path in sorted(glob.glob(os.path.join(raw_dir, "articles_*.csv"))):
+            parsed = parse_filename(path)
+            if parsed is None or parsed in in_store:
+                continue
+            in_store.add(parsed)
+            name = f"{parsed[0]}/{parsed[1]}"
+            if indexed.get(name) != signature(path):
+                df = read_table(path, memo=False)
+                self.index_frame(df, *parsed, source=name, signature=signature(path))
+                count += 1
+
+        # Ranked crawls dropped by retention.py survive as their top-20 aggregate rows
+        top20 = load_aggregate('top20', kind=list(RANKED_KINDS), store_dir=store_dir)
+        for (kind, crawl_date), rows in (top20.groupby(['kind', 'crawl_date']) if not top20.empty else []):
+            name = f"{kind}/{crawl_date}"
+            if (kind, crawl_date) in in_store or indexed.get(name) == AGGREGATE_SIGNATURE:
+                continue
+            self.index_frame(rows.assign(is_top20=True), kind, crawl_date, source=name, signature=AGGREGATE_SIGNATURE)
+            count += 1
+        return count
+
+    # ---------------------------------------------------------------- queries
+    def query(self, start=None, end=None, categories=None, keyword=None, top_only=False, limit=None):
+        """
+        Articles by published date range (YYYY-MM-DD, inclusive), categories and/or keyword,
+        with their ranking history (best final_score, number of top-20 weeks, last ranked crawl).
+        """
+        where, params = [], []
+        if start:
+            where.append("a.published_date >= ?")
+            params.append(str(start))
+        if end:
+            where.append("a.published_date < ?")
+            params.append((pd.Timestamp(end) + timedelta(days=1)).strftime('%Y-%m-%d'))
+        if categories:
+            where.append(f"a.category IN ({','.join('?' * len(categories))})")
+            params.extend(categories)
+        if keyword:
+            where.append("a.article_id IN (SELECT article_id FROM article_keywords WHERE keyword = ?)")
+            params.append(keyword)
+        having = "HAVING weeks_top20 > 0" if top_only else ""
+        sql = f"""
+            SELECT a.*, MAX(r.final_score) AS best_final_score,
+                   COALESCE(SUM(r.is_top20), 0) AS weeks_top20, MAX(r.crawl_date) AS last_ranked
+            FROM articles a LEFT JOIN rankings r ON r.article_id = a.article_id
+            {"WHERE " + " AND ".join(where) if where else ""}
+            GROUP BY a.article_id {having}
+            ORDER BY a.published_date DESC
+            {"LIMIT " + str(int(limit)) if limit else ""}
+        """
+        with self._connect() as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def top_ranked(self, start=None, end=None, kind='ranked'):
+        """Top-20 selections of every ranked crawl in [start, end] (crawl dates, YYYYMMDD)"""
+        sql = """
+            SELECT r.crawl_date, r.final_score, r.lgbm_score, a.*
+            FROM rankings r JOIN articles a ON a.article_id = r.article_id
+            WHERE r.kind = ? AND r.is_top20 = 1 AND r.crawl_date >= ? AND r.crawl_date <= ?
+            ORDER BY r.crawl_date DESC, r.final_score DESC
+        """
+        with self._connect() as conn:
+            return pd.read_sql_query(sql, conn, params=[kind, start or '00000000', end or '99999999'])
+
+    def find_url(self, url):
+        """Catalog rows sharing the url's canonical form (same article under different urls)"""
+        with self._connect() as conn:
+            return pd.read_sql_query("SELECT * FROM articles WHERE canonical_url = ?", conn,
+                                     params=[canonical_url(url)])
+
+    def keywords(self, start=None, end=None):
+        """Keyword -> article count for articles published in the range"""
+        sql = """
+            SELECT k.keyword, COUNT(*) AS articles
+            FROM article_keywords k JOIN articles a ON a.article_id = k.article_id
+            WHERE a.published_date >= ? AND a.published_date < ?
+            GROUP BY k.keyword ORDER BY articles DESC
+        """
+        end = (pd.Timestamp(end) + timedelta(days=1)).strftime('%Y-%m-%d') if end else '9999'
+        with self._connect() as conn:
+            return pd.read_sql_query(sql, conn, params=[str(start or ''), end])
+
+    def summary(self):
+        with self._connect() as conn:
+            return {
+                'articles': conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0],
+                'keywords': conn.execute("SELECT COUNT(DISTINCT keyword) FROM article_keywords").fetchone()[0],
+                'ranked_crawls': conn.execute("SELECT COUNT(DISTINCT kind || crawl_date) FROM rankings").fetchone()[0],
+                'sources': conn.execute("SELECT COUNT(*) FROM sources").fetchone()[0],
+            }
+
+
+def index_output(df, csv_path, path=CATALOG_PATH):
+    """Index a crawler/ranker output right after it is written (never fails the caller)"""
+    try:
+        try:
+            from article_store import parse_filename
+        except ImportError:
+            from scripts.article_store import parse_filename
+        parsed = parse_filename(csv_path)
+        if parsed is None:
+            return 0
+        return ArticleCatalog(path).index_frame(df, *parsed)
+    except Exception as e:
+        print(f"[WARNING] Could not update article catalog for {os.path.basename(csv_path)}: {e}")
+        return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local SQLite article catalog")
+    parser.add_argument('--rebuild', action='store_true', help="Drop the catalog and index everything again")
+    args = parser.parse_args()
+
+    if args.rebuild and os.path.exists(CATALOG_PATH):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(CATALOG_PATH + suffix):
+                os.remove(CATALOG_PATH + suffix)
+    catalog = ArticleCatalog()
+    n = catalog.sync()
+    print(f"[OK] Indexed {n} new/changed sources into {CATALOG_PATH}: {catalog.summary()}")
@@ -0,0 +1,98 @@
+"""
+Embedding Pre-Clustering for Gemini Dedup Batches
+Groups near-identical articles (cosine similarity of their ko-sroberta embeddings)
+before batching, so every copy of a story lands in the same Gemini request:
+
+    1. leader clustering: articles in input order; each joins the first cluster whose
+       leader is at least `similarity_threshold` similar, else starts a new one
+    2. clusters are packed into requests whole by prompt_packer.py (first fit);
+       a cluster larger than one request is split across requests
+    3. representatives_only: only the most informative member of each cluster (longest
+       title + summary) is sent; the others inherit its verdict as duplicates of it
+
+Embeddings go through the shared embedding cache, so re-runs encode only new text.
+"""
+import numpy as np
+
+try:
+    from config import load_pipeline_config
+except ImportError:
+    from scripts.config import load_pipeline_config
+
+DEFAULT_SETTINGS = {
+    'precluster': True,
+    'similarity_threshold': 0.88,
+    'representatives_only': False,
+}
+
+
+def load_settings():
+    """Pre-clustering settings from config/pipeline.yaml `gemini.dedup` (defaults if absent)"""
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        settings.update((load_pipeline_config().get('gemini', {}) or {}).get('dedup', {}) or {})
+    except Exception as e:
+        print(f"[WARNING] Could not read pipeline config: {e}")
+    return settings
+
+
+def article_text(article):
+    return f"{article.get('title', '') or ''} {article.get('summary', '') or ''}".strip()
+
+
+def embed_articles(articles):
+    """float32 (n, dim) embeddings of title + summary, via the embedding cache"""
+    try:
+        from embedding_backend import get_embedding_backend
+        from embedding_cache import EmbeddingCache
+    except ImportError:
+        from scripts.embedding_backend import get_embedding_backend
+        from scripts.embedding_cache import EmbeddingCache
+    encoder = EmbeddingCache(get_embedding_backend())
+    embeddings = encoder.encode([article_text(a) for a in articles])
+    encoder.save()
+    return embeddings
+
+
+def leader_clusters(embeddings, threshold):
+    """Cluster label per row (labels are leader positions, in input order)"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    unit = embeddings / np.where(norms == 0, 1, norms)
+    labels = np.full(len(unit), -1, dtype=np.int64)
+    leaders = []
+    for i in range(len(unit)):
+        if leaders:
+            similarity = unit[leaders] @ unit[i]
+            best = int(np.argmax(similarity))
+            if similarity[best] >= threshold:
+                labels[i] = leaders[best]
+                continue
+        leaders.append(i)
+        labels[i] = i
+    return labels
+
+
+def group_by_label(items, labels):
+    """[[items of one cluster]] in order of first appearance"""
+    clusters = {}
+    for item, label in zip(items, labels):
+        clusters.setdefault(int(label), []).append(item)
+    return list(clusters.values())
+
+
+def representative(cluster):
+    """Most informative member (longest title + summary; first on ties)"""
+    return max(cluster, key=lambda a: len(article_text(a)))
+
+
+def propagate(result, member_id, representative_id):
+    """Verdict of a cluster member derived from its representative's"""
+    return {
+        'id': member_id,
+        'score': result.get('score', 5),
+        'is_duplicate': True,
+        'duplicate_of': representative_id,
+        'strategic_insight': result.get('strategic_insight', ''),
+        'is_high_priority': result.get('is_high_priority', False),
+    }
@@ -0,0 +1,300 @@
+"""
+Partitioned Parquet Article Store
+Columnar copy of the crawler / ranker output, one partition per kind and crawl date:
+
+    data/articles/kind=weekly/crawl_date=20260403/part-0.parquet
+                  kind=daily/...   kind=ranked/...   kind=ranked_daily/...
+                  kind=weekly/crawl_month=202601/part-0.parquet   (compacted, see retention.py)
+
+zstd-compressed, with dictionary encoding for the low-cardinality columns
+(category, keywords, site_name, region). Readers prune partitions by kind and
+crawl date from the directory names, read only the requested columns and push
+row filters (e.g. on published_date) down to the Parquet row groups.
+Months compacted by scripts/retention.py live in one crawl_month file per kind (with a
+crawl_date column); readers see the same (kind, crawl_date) partitions either way.
+
+The crawlers and the ranker write here next to their CSV output; CSV export
+(same file names as data/articles_raw) stays available for the labelling workflow.
+
+    python scripts/article_store.py                          # list partitions
+    python scripts/article_store.py --import                 # load existing data/articles_raw CSVs
+    python scripts/article_store.py --export weekly 20260403 # partition -> CSV
+"""
+import os
+import re
+import sys
+import glob
+import json
+import shutil
+import argparse
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    from data_io import read_table, atomic_write_csv
+except ImportError:
+    from scripts.data_io import read_table, atomic_write_csv
+
+STORE_DIR = os.path.join("data", "articles")
+RAW_DATA_DIR = "data/articles_raw"
+PART_FILE = "part-0.parquet"
+# Parquet metadata of a compacted month: crawl_date -> {columns, rows, source CSV sha256/encoding}
+MONTH_INDEX_KEY = b'crawl_dates'
+
+# CSV file kind (articles_<kind>_YYYYMMDD.csv) -> store partition kind
+FILE_KINDS = {
+    'naver_api': 'weekly',
+    'daily': 'daily',
+    'ranked_naver_api': 'ranked',
+    'ranked_daily': 'ranked_daily',
+}
+FILE_PREFIXES = {kind: file_kind for file_kind, kind in FILE_KINDS.items()}
+DICTIONARY_COLUMNS = ['category', 'keywords', 'site_name', 'region']
+PARTITION_COLUMNS = ['kind', 'crawl_date']
+COMPRESSION = 'zstd'
+
+
+def parse_filename(filename):
+    """articles_<kind>_YYYYMMDD.csv -> (store kind, crawl_date), or None"""
+    match = re.match(r'^articles_(.+)_(\d{8})\.csv$', os.path.basename(filename))
+    if not match or match.group(1) not in FILE_KINDS:
+        return None
+    return FILE_KINDS[match.group(1)], match.group(2)
+
+
+def csv_filename(kind, crawl_date):
+    return f"articles_{FILE_PREFIXES[kind]}_{crawl_date}.csv"
+
+
+def partition_path(kind, crawl_date, store_dir=STORE_DIR):
+    return os.path.join(store_dir, f"kind={kind}", f"crawl_date={crawl_date}", PART_FILE)
+
+
+def month_path(kind, month, store_dir=STORE_DIR):
+    return os.path.join(store_dir, f"kind={kind}", f"crawl_month={month}", PART_FILE)
+
+
+def month_index(path):
+    """{crawl_date: {'columns', 'rows', ...}} of a compacted month file"""
+    metadata = pq.read_schema(path).metadata or {}
+    return json.loads(metadata.get(MONTH_INDEX_KEY, b'{}'))
+
+
+def partition_files(store_dir=STORE_DIR):
+    """{(kind, crawl_date): file} over daily and compacted month partitions (a daily partition wins)"""
+    files = {}
+    for path in glob.glob(os.path.join(store_dir, "kind=*", "crawl_month=*", PART_FILE)):
+        match = re.search(r'kind=([^/\\]+)[/\\]crawl_month=(\d{6})', path)
+        if match:
+            for crawl_date in month_index(path):
+                files[(match.group(1), crawl_date)] = path
+    for path in glob.glob(os.path.join(store_dir, "kind=*", "crawl_date=*", PART_FILE)):
+        match = re.search(r'kind=([^/\\]+)[/\\]crawl_date=(\d{8})', path)
+        if match:
+            files[match.groups()] = path
+    return files
+
+
+def partition_file(kind, crawl_date, store_dir=STORE_DIR):
+    """File holding one (kind, crawl_date) partition, daily or compacted, or None"""
+    path = partition_path(kind, crawl_date, store_dir)
+    if os.path.exists(path):
+        return path
+    return partition_files(store_dir).get((kind, crawl_date))
+
+
+def _to_table(df):
+    """Arrow table; object columns mixing types (e.g. '' and floats in reward) are stored as strings"""
+    df = df.reset_index(drop=True)
+    for col in df.columns:
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True).startswith('mixed'):
+            df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v))
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def write_articles(df, kind, crawl_date, store_dir=STORE_DIR):
+    """Write (replace) one partition atomically. Returns its path."""
+    if kind not in FILE_PREFIXES:
+        raise ValueError(f"Unknown article kind: {kind}")
+    path = partition_path(kind, crawl_date, store_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = _to_table(df.drop(columns=[c for c in PARTITION_COLUMNS if c in df.columns]))
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    try:
+        pq.write_table(
+            table, tmp_path,
+            compression=COMPRESSION,
+            use_dictionary=[c for c in DICTIONARY_COLUMNS if c in table.column_names],
+        )
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+def write_csv_output(df, csv_path, store_dir=STORE_DIR):
+    """Mirror a crawler/ranker CSV output file into its store partition (never fails the caller)"""
+    parsed = parse_filename(csv_path)
+    if parsed is None:
+        return None
+    try:
+        return write_articles(df, *parsed, store_dir=store_dir)
+    except Exception as e:
+        print(f"[WARNING] Could not write article store partition for {os.path.basename(csv_path)}: {e}")
+        return None
+
+
+def list_partitions(kind=None, start=None, end=None, store_dir=STORE_DIR):
+    """[(kind, crawl_date)] sorted by crawl date, pruned by kind and date range (YYYYMMDD, inclusive)"""
+    partitions = []
+    for p_kind, p_date in partition_files(store_dir):
+        if kind is not None and p_kind not in ([kind] if isinstance(kind, str) else kind):
+            continue
+        if (start and p_date < start) or (end and p_date > end):
+            continue
+        partitions.append((p_kind, p_date))
+    return sorted(partitions, key=lambda p: (p[1], p[0]))
+
+
+def latest_partition(kind, store_dir=STORE_DIR):
+    """crawl_date of the newest partition of `kind`, or None"""
+    partitions = list_partitions(kind, store_dir=store_dir)
+    return partitions[-1][1] if partitions else None
+
+
+def read_articles(kind=None, start=None, end=None, columns=None, filters=None, store_dir=STORE_DIR):
+    """
+    Articles from the matching partitions, oldest crawl first.
+    columns: projection (kind / crawl_date may be requested too); absent columns come back as NaN.
+    filters: pyarrow row filters pushed down to the files, e.g. [('published_date', '>=', '2026-03-01')]
+    """
+    files = partition_files(store_dir)
+    frames = []
+    for p_kind, p_date in list_partitions(kind, start, end, store_dir):
+        path = files[(p_kind, p_date)]
+        schema_names = pq.read_schema(path).names
+        file_columns = None if columns is None else [c for c in columns if c in schema_names]
+        if filters and any(f[0] not in schema_names for f in filters):
+            continue
+        file_filters = filters
+        if 'crawl_date' in schema_names:  # compacted month: only this date's rows, with its own columns
+            file_filters = (filters or []) + [('crawl_date', '=', p_date)]
+            date_columns = month_index(path)[p_date]['columns']
+            file_columns = [c for c in (date_columns if file_columns is None else file_columns) if c in date_columns]
+        df = pq.read_table(path, columns=file_columns, filters=file_filters).to_pandas()
+        df['kind'] = p_kind
+        df['crawl_date'] = p_date
+        frames.append(df if columns is None else df.reindex(columns=columns))
+    if not frames:
+        return pd.DataFrame(columns=columns or [])
+    return pd.concat(frames, ignore_index=True)
+
+
+def load_latest(kind, columns=None, store_dir=STORE_DIR, raw_dir=RAW_DATA_DIR):
+    """
+    Newest `kind` articles as (DataFrame, CSV file name), or (empty, None).
+    Reads the store partition, or the newest CSV in raw_dir if the store is behind it (not imported yet).
+    """
+    csv_files = sorted(glob.glob(os.path.join(raw_dir, f"articles_{FILE_PREFIXES[kind]}_*.csv")))
+    latest = latest_partition(kind, store_dir)
+    if latest and (not csv_files or csv_filename(kind, latest) >= os.path.basename(csv_files[-1])):
+        df = read_articles(kind, latest, latest, columns=columns, store_dir=store_dir)
+        if columns is None:
+            df = df.drop(columns=PARTITION_COLUMNS)
+        return df, csv_filename(kind, latest)
+    if not csv_files:
+        return pd.DataFrame(columns=columns or []), None
+    return read_table(csv_files[-1], columns=columns), os.path.basename(csv_files[-1])
+
+
+def compact_month(kind, month, sources=None, store_dir=STORE_DIR):
+    """
+    Fold the daily partitions of one month (YYYYMM) into kind=<kind>/crawl_month=<month>/part-0.parquet,
+    merged with the month file if there is one, one row group per crawl date; the daily partitions are
+    then removed. sources: crawl_date -> extra index fields (e.g. the sha256 of the source CSV).
+    Returns the crawl dates folded in.
+    """
+    path = month_path(kind, month, store_dir)
+    index = month_index(path) if os.path.exists(path) else {}
+    daily = [d for _, d in list_partitions(kind, f"{month}01", f"{month}31", store_dir)
+             if os.path.exists(partition_path(kind, d, store_dir))]
+    if not daily:
+        return []
+
+    frames = []
+    for crawl_date in sorted(set(index) | set(daily)):
+        df = read_articles(kind, crawl_date, crawl_date, store_dir=store_dir).drop(columns=['kind'])
+        entry = dict(index.get(crawl_date, {}))
+        entry.update({'columns': [c for c in df.columns if c != 'crawl_date'], 'rows': len(df)})
+        entry.update((sources or {}).get(crawl_date, {}))
+        index[crawl_date] = entry
+        frames.append(df)
+    table = _to_table(pd.concat(frames, ignore_index=True))
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                           MONTH_INDEX_KEY: json.dumps(index, sort_keys=True).encode()})
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    try:
+        with pq.ParquetWriter(tmp_path, table.schema, compression=COMPRESSION,
+                              use_dictionary=[c for c in DICTIONARY_COLUMNS if c in table.column_names]) as writer:
+            offset = 0
+            for df in frames:
+                writer.write_table(table.slice(offset, len(df)))
+                offset += len(df)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    for crawl_date in daily:
+        shutil.rmtree(os.path.dirname(partition_path(kind, crawl_date, store_dir)))
+    return daily
+
+
+def export_csv(kind, crawl_date, out_dir=RAW_DATA_DIR, store_dir=STORE_DIR):
+    """Write one partition back out as the utf-8-sig CSV the labelling workflow expects"""
+    df = read_articles(kind, crawl_date, crawl_date, store_dir=store_dir).drop(columns=PARTITION_COLUMNS)
+    return atomic_write_csv(df, os.path.join(out_dir, csv_filename(kind, crawl_date)))
+
+
+def import_csv_dir(raw_dir=RAW_DATA_DIR, store_dir=STORE_DIR):
+    """Load every articles_<kind>_YYYYMMDD.csv into the store (existing partitions are replaced)"""
+    count = 0
+    for path in sorted(glob.glob(os.path.join(raw_dir, "articles_*.csv"))):
+        parsed = parse_filename(path)
+        if parsed is None:
+            continue
+        df = read_table(path, memo=False)
+        write_articles(df, *parsed, store_dir=store_dir)
+        count += 1
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Partitioned Parquet article store")
+    parser.add_argument('--import', dest='import_dir', nargs='?', const=RAW_DATA_DIR,
+                        help="Import articles_*.csv from a directory (default: data/articles_raw)")
+    parser.add_argument('--export', nargs=2, metavar=('KIND', 'YYYYMMDD'), help="Export a partition to CSV")
+    args = parser.parse_args()
+
+    if args.import_dir:
+        print(f"[OK] Imported {import_csv_dir(args.import_dir)} CSV files into {STORE_DIR}")
+    elif args.export:
+        print(f"[OK] Exported {export_csv(*args.export)}")
+    else:
+        partitions = list_partitions()
+        files = partition_files()
+        for p_kind, p_date in partitions:
+            path = files[(p_kind, p_date)]
+            if 'crawl_month=' in path:
+                print(f"  kind={p_kind:<13} crawl_date={p_date}  {month_index(path)[p_date]['rows']:>5} rows  "
+                      f"(compacted, {os.path.basename(os.path.dirname(path))})")
+                continue
+            metadata = pq.read_metadata(path)
+            print(f"  kind={p_kind:<13} crawl_date={p_date}  {metadata.num_rows:>5} rows  "
+                  f"{os.path.getsize(path) / 1024:8.1f} KB")
+        if not partitions:
+            print(f"No partitions in {STORE_DIR}", file=sys.stderr)
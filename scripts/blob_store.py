@@ -0,0 +1,199 @@
+"""
+Compressed Blob Store for Article Bodies
+Full article bodies (the crawler's `content` column) live in append-only pack
+files instead of inline in every CSV / Parquet file; the tabular files carry a
+`content_ref` and bodies are loaded only when something needs them.
+
+Layout under data/blobs/:
+    bodies_<crawl_date>.pack   records: 1-byte codec ('Z' zstd, 'D' zlib) + uint32 raw size + payload
+    index.json                 article_id -> [content_ref, body hash] (same body is stored once)
+
+content_ref = "<pack file>:<offset>:<length>" - enough to read one body without the index.
+zstd comes from pyarrow (already needed for the article store); zlib is the fallback.
+
+    python scripts/blob_store.py --migrate   # move inline `content` out of data/articles_raw CSVs
+"""
+import os
+import sys
+import glob
+import json
+import zlib
+import struct
+import hashlib
+import threading
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    HAS_ZSTD = pa.Codec.is_available('zstd')
+except ImportError:
+    HAS_ZSTD = False
+
+try:
+    from score_cache import article_keys
+except ImportError:
+    from scripts.score_cache import article_keys
+
+BLOB_DIR = os.path.join("data", "blobs")
+RAW_DATA_DIR = "data/articles_raw"
+INDEX_FILE = "index.json"
+ZSTD_LEVEL = 9
+HEADER = struct.Struct('>cI')
+
+_write_lock = threading.Lock()
+
+
+def _compress(data):
+    if HAS_ZSTD:
+        return b'Z', pa.Codec('zstd', compression_level=ZSTD_LEVEL).compress(data, asbytes=True)
+    return b'D', zlib.compress(data, 9)
+
+
+def _decompress(codec, payload, size):
+    if codec == b'Z':
+        if not HAS_ZSTD:
+            raise RuntimeError("Body was stored with zstd but pyarrow (zstd) is not available")
+        return pa.Codec('zstd').decompress(payload, decompressed_size=size, asbytes=True)
+    return zlib.decompress(payload)
+
+
+def _body_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def parse_ref(ref):
+    pack, offset, length = str(ref).rsplit(':', 2)
+    return pack, int(offset), int(length)
+
+
+class BlobStore:
+    def __init__(self, blob_dir=BLOB_DIR):
+        self.blob_dir = blob_dir
+        self.index_path = os.path.join(blob_dir, INDEX_FILE)
+        self._index = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = {}
+            if os.path.exists(self.index_path):
+                try:
+                    with open(self.index_path, encoding='utf-8') as f:
+                        self._index = json.load(f)
+                except Exception as e:
+                    print(f"[WARNING] Could not read blob index ({e}); bodies will be re-stored")
+        return self._index
+
+    def put_many(self, article_ids, bodies, crawl_date):
+        """Append bodies not stored yet to bodies_<crawl_date>.pack. Returns content_refs (None for empty bodies)."""
+        refs, pending = [], []
+        with _write_lock:
+            pack_name = f"bodies_{crawl_date}.pack"
+            pack_path = os.path.join(self.blob_dir, pack_name)
+            os.makedirs(self.blob_dir, exist_ok=True)
+            with open(pack_path, 'ab') as pack:
+                offset = pack.tell()
+                for article_id, body in zip(article_ids, bodies):
+                    if body is None or (not isinstance(body, str) and pd.isna(body)) or str(body) == '':
+                        refs.append(None)
+                        continue
+                    body = str(body)
+                    digest = _body_hash(body)
+                    known = self.index.get(article_id)
+                    if known and known[1] == digest:
+                        refs.append(known[0])
+                        continue
+                    raw = body.encode('utf-8')
+                    codec, payload = _compress(raw)
+                    record = HEADER.pack(codec, len(raw)) + payload
+                    pack.write(record)
+                    ref = f"{pack_name}:{offset}:{len(record)}"
+                    offset += len(record)
+                    self.index[article_id] = [ref, digest]
+                    pending.append(article_id)
+                    refs.append(ref)
+            if pending:
+                tmp_path = self.index_path + ".tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.index, f, ensure_ascii=False, indent=0, sort_keys=True)
+                os.replace(tmp_path, self.index_path)
+        return refs
+
+    def get(self, ref):
+        return self.get_many([ref])[0]
+
+    def get_many(self, refs):
+        """Bodies for content_refs (None/NaN refs -> ''); each pack file is opened once"""
+        bodies = [''] * len(refs)
+        by_pack = {}
+        for i, ref in enumerate(refs):
+            if ref is None or (not isinstance(ref, str) and pd.isna(ref)) or ref == '':
+                continue
+            pack, offset, length = parse_ref(ref)
+            by_pack.setdefault(pack, []).append((offset, length, i))
+        for pack, records in by_pack.items():
+            pack_path = os.path.join(self.blob_dir, pack)
+            if not os.path.exists(pack_path):
+                print(f"[WARNING] Blob pack {pack_path} not found; {len(records)} bodies unavailable")
+                continue
+            with open(pack_path, 'rb') as f:
+                for offset, length, i in sorted(records):
+                    f.seek(offset)
+                    record = f.read(length)
+                    codec, size = HEADER.unpack_from(record)
+                    bodies[i] = _decompress(codec, record[HEADER.size:], size).decode('utf-8')
+        return bodies
+
+    def get_by_id(self, article_id):
+        known = self.index.get(article_id)
+        return self.get(known[0]) if known else None
+
+
+def externalize_content(df, crawl_date, blob_dir=BLOB_DIR):
+    """Replace an inline `content` column by `content_ref` (same position); other frames are returned as-is"""
+    if 'content' not in df.columns:
+        return df
+    article_ids, _ = article_keys(df)
+    refs = BlobStore(blob_dir).put_many(article_ids, df['content'].tolist(), crawl_date)
+    df = df.copy()
+    position = df.columns.get_loc('content')
+    df = df.drop(columns=['content'])
+    df.insert(position, 'content_ref', refs)
+    return df
+
+
+def load_content(df, blob_dir=BLOB_DIR):
+    """Frame with a `content` column, loading bodies from content_ref if it is not inline"""
+    if 'content' in df.columns or 'content_ref' not in df.columns:
+        return df
+    df = df.copy()
+    df['content'] = BlobStore(blob_dir).get_many(df['content_ref'].tolist())
+    return df
+
+
+def migrate_csv_dir(raw_dir=RAW_DATA_DIR, blob_dir=BLOB_DIR):
+    """Move inline bodies of existing articles_*.csv files into the blob store (files rewritten in place)"""
+    try:
+        from data_io import read_table, atomic_write_csv
+    except ImportError:
+        from scripts.data_io import read_table, atomic_write_csv
+    count = 0
+    for path in sorted(glob.glob(os.path.join(raw_dir, "articles_*.csv"))):
+        df = read_table(path, memo=False)
+        if 'content' not in df.columns:
+            continue
+        crawl_date = os.path.basename(path)[-12:-4]
+        atomic_write_csv(externalize_content(df, crawl_date, blob_dir), path)
+        count += 1
+    return count
+
+
+if __name__ == "__main__":
+    if "--migrate" in sys.argv:
+        print(f"[OK] Moved bodies of {migrate_csv_dir()} CSV files into {BLOB_DIR}")
+    else:
+        store = BlobStore()
+        packs = glob.glob(os.path.join(BLOB_DIR, "*.pack"))
+        size = sum(os.path.getsize(p) for p in packs)
+        print(f"{len(store.index)} bodies in {len(packs)} packs ({size / 1024:.1f} KB, codec {'zstd' if HAS_ZSTD else 'zlib'})")
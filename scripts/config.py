@@ -81,3 +81,16 @@ def should_exclude_article(article, excluded_keywords):
             return True
     
     return False
+
+def load_pipeline_config():
+    """
+    파이프라인 설정 로딩 함수 (config/pipeline.yaml)
+    
+    Returns:
+        Dict of settings (파일이 없으면 빈 dict)
+    """
+    config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'pipeline.yaml')
+    if not os.path.exists(config_path):
+        return {}
+    with open(config_path, encoding='utf-8') as f:
+        return yaml.safe_load(f) or {}
@@ -26,6 +26,16 @@ from crawl_naver_news_api import (
     NAVER_CLIENT_SECRET
 )
 
+# Columnar article store (Parquet partitions next to the CSV output)
+try:
+    from article_store import write_csv_output
+    HAS_ARTICLE_STORE = True
+except ImportError:
+    HAS_ARTICLE_STORE = False
+    print("[WARNING] pyarrow not found. Article store (Parquet) disabled.")
+from article_catalog import index_output
+from data_io import atomic_write_csv
+
 # Load daily keywords from config
 def load_daily_keywords():
     """Load daily keywords from config/keywords.yaml"""
@@ -199,7 +209,10 @@ def main():
         filename = f"articles_daily_{yesterday_str}.csv"
         filepath = os.path.join(DATA_DIR, filename)
         
-        df.to_csv(filepath, index=False, encoding='utf-8-sig')
+        atomic_write_csv(df, filepath)
+        if HAS_ARTICLE_STORE:
+            write_csv_output(df, filepath)
+        index_output(df, filepath)
         
         print(f"\n[SAVED] Daily output file: {filepath}")
         print(f"\nTop 10 articles:")
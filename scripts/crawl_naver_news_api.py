@@ -23,7 +23,6 @@ load_dotenv()
 import re
 import requests
 import time
-import torch
 import difflib  # For fuzzy matching
 import warnings
 import datetime
@@ -40,6 +39,17 @@ except ImportError:
     HAS_NLP = False
     print("[WARNING] nlp_utils not found. NLP features disabled.")
 
+# Columnar article store (Parquet partitions next to the CSV output)
+try:
+    from article_store import write_csv_output
+    HAS_ARTICLE_STORE = True
+except ImportError:
+    HAS_ARTICLE_STORE = False
+    print("[WARNING] pyarrow not found. Article store (Parquet) disabled.")
+from article_catalog import index_output
+from blob_store import externalize_content
+from data_io import atomic_write_csv
+
 # KoBART Model removed for speed optimization
 # Use heuristic summarizer (og:description extraction)
 HAS_SUMMARIZER = True  # Fetch full title + og:description (fast with parallel processing)
@@ -1055,7 +1065,12 @@ def main():
         filename = f"articles_naver_api_{today_str}.csv"
         filepath = os.path.join(DATA_DIR, filename)
         
-        df.to_csv(filepath, index=False, encoding='utf-8-sig')
+        # Full bodies go to the compressed blob store; the CSV keeps a content_ref
+        df = externalize_content(df, today_str)
+        atomic_write_csv(df, filepath)
+        if HAS_ARTICLE_STORE:
+            write_csv_output(df, filepath)
+        index_output(df, filepath)
         
         print(f"\n[SAVED] Output file: {filepath}")
         print(f"\nTop 10 articles by score:")
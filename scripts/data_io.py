@@ -0,0 +1,197 @@
+"""
+Data I/O helpers shared by the pipeline scripts and dashboards
+
+Reads:  read_table() - the encoding of each CSV is decided once (sidecar lookup, else
+        sniffed from a small prefix) and recorded in a per-directory sidecar
+        (.encodings.json), so a file is parsed once instead of once per failed encoding.
+        Per-schema dtypes (text columns as str, numeric columns coerced), usecols for the
+        requested columns, canonical names for known aliases (reward_label -> reward), and
+        frames memoized by (path, mtime, size, schema, columns).
+Writes: atomic_write_csv() - temp file + rename, so dashboards never read a half-written
+        ranked file; the encoding written is recorded in the sidecar.
+"""
+import os
+import json
+import codecs
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+SIDECAR_FILE = ".encodings.json"
+SNIFF_BYTES = 64 * 1024
+MAX_MEMO_FRAMES = 32
+
+# Column types per table kind; columns not listed are left to pandas inference
+_ARTICLE_TEXT = ['date', 'category', 'published_date', 'site_name', 'url', 'title', 'summary',
+                 'content', 'content_ref', 'region', 'keywords']
+SCHEMAS = {
+    # crawler output: articles_naver_api_* / articles_daily_*
+    'articles': {'text': _ARTICLE_TEXT, 'numeric': ['score_ag']},
+    # ranker output: articles_ranked_*
+    'ranked': {'text': _ARTICLE_TEXT,
+               'numeric': ['score_ag', 'lgbm_score', 'score_ag_norm', 'lgbm_score_norm', 'final_score',
+                           'strategic_score', 'lgbm_component']},
+    # labels_master.csv / articles_to_label_*.csv
+    'labels': {'text': _ARTICLE_TEXT, 'numeric': ['score_ag', 'reward', 'rl_score']},
+    # feedback_log.csv
+    'feedback': {'text': ['feedback_date', 'url', 'title', 'category', 'keywords'], 'numeric': ['score_ag', 'reward']},
+}
+# canonical column -> older names it may appear under (first present one wins)
+COLUMN_ALIASES = {
+    'reward': ('reward_label', 'reward_raw'),
+}
+
+_sidecar_lock = threading.Lock()
+_memo_lock = threading.Lock()
+_memo = OrderedDict()
+
+
+def sniff_encoding(data, complete=True):
+    """utf-8-sig (BOM), utf-8, or cp949 - from a file's bytes (complete=False for a prefix)"""
+    if data.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        # A prefix may end inside a multi-byte character; the incremental decoder allows that
+        codecs.getincrementaldecoder('utf-8')().decode(data, final=complete)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'cp949'
+
+
+def _sidecar_path(path):
+    return os.path.join(os.path.dirname(os.path.abspath(path)), SIDECAR_FILE)
+
+
+def _read_sidecar(sidecar):
+    try:
+        with open(sidecar, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _signature(stat):
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def record_encoding(path, encoding):
+    """Remember a file's encoding in its directory's sidecar (best effort)"""
+    sidecar = _sidecar_path(path)
+    try:
+        stat = os.stat(path)
+        with _sidecar_lock:
+            entries = _read_sidecar(sidecar)
+            entries[os.path.basename(path)] = {'encoding': encoding, 'signature': _signature(stat)}
+            tmp_path = f"{sidecar}.tmp.{os.getpid()}"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False, indent=0, sort_keys=True)
+            os.replace(tmp_path, sidecar)
+    except OSError:
+        pass
+
+
+def detect_encoding(path):
+    """Encoding of a CSV: from the sidecar if the file is unchanged, else sniffed once and recorded"""
+    stat = os.stat(path)
+    entry = _read_sidecar(_sidecar_path(path)).get(os.path.basename(path))
+    if entry and entry.get('signature') == _signature(stat):
+        return entry['encoding']
+    with open(path, 'rb') as f:
+        prefix = f.read(SNIFF_BYTES)
+    encoding = sniff_encoding(prefix, complete=len(prefix) < SNIFF_BYTES)
+    record_encoding(path, encoding)
+    return encoding
+
+
+def canonical_columns(df):
+    """Rename known aliases (e.g. reward_label) to their canonical column if it is absent"""
+    for canonical, aliases in COLUMN_ALIASES.items():
+        if canonical in df.columns:
+            continue
+        for alias in aliases:
+            if alias in df.columns:
+                df = df.rename(columns={alias: canonical})
+                break
+    return df
+
+
+def apply_schema(df, schema):
+    """Give a frame read from elsewhere (e.g. the Parquet article store) the dtypes read_table would"""
+    spec = SCHEMAS[schema]
+    df = canonical_columns(df)
+    for col in spec['text']:
+        if col in df.columns:
+            df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v))
+    for col in spec['numeric']:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def read_table(path, schema=None, columns=None, memo=True):
+    """
+    Read a CSV with its detected encoding.
+    schema:  key of SCHEMAS - text columns read as str, numeric columns coerced (bad values -> NaN);
+             None keeps pandas' inference (exact round trips, e.g. into the article store)
+    columns: only these columns are parsed (aliases included); absent ones come back as NaN
+    memo:    reuse the frame of an unchanged file read the same way (a copy is returned)
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, schema, tuple(columns) if columns else None)
+    if memo:
+        with _memo_lock:
+            if key in _memo:
+                _memo.move_to_end(key)
+                return _memo[key].copy()
+
+    spec = SCHEMAS[schema] if schema else {'text': [], 'numeric': []}
+    usecols = None
+    if columns is not None:
+        wanted = set(columns)
+        for canonical, aliases in COLUMN_ALIASES.items():
+            if canonical in wanted:
+                wanted.update(aliases)
+        usecols = wanted.__contains__
+    kwargs = {'usecols': usecols, 'dtype': {c: str for c in spec['text']}}
+
+    encoding = detect_encoding(path)
+    try:
+        df = pd.read_csv(path, encoding=encoding, **kwargs)
+    except UnicodeDecodeError:
+        # Non-UTF-8 bytes beyond the sniffed prefix
+        encoding = 'cp949' if encoding != 'cp949' else 'utf-8'
+        df = pd.read_csv(path, encoding=encoding, **kwargs)
+        record_encoding(path, encoding)
+
+    df = canonical_columns(df)
+    for col in spec['numeric']:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    if columns is not None:
+        df = df.reindex(columns=columns)
+
+    if memo:
+        with _memo_lock:
+            _memo[key] = df
+            while len(_memo) > MAX_MEMO_FRAMES:
+                _memo.popitem(last=False)
+        return df.copy()
+    return df
+
+
+def atomic_write_csv(df, path, encoding='utf-8-sig', **kwargs):
+    """Write df to path via a temp file in the same directory, then rename over the target"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    kwargs.setdefault('index', False)
+    try:
+        df.to_csv(tmp_path, encoding=encoding, **kwargs)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    record_encoding(path, encoding)
+    return path
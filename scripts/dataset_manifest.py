@@ -0,0 +1,168 @@
+"""
+Dataset Manifest for data/articles_raw
+Lists each canonical article file (crawler output, not derived articles_ranked_*)
+with its schema, row count, encoding and content hash, so loaders read every
+article exactly once, with one known encoding, only the columns they need.
+Files retired by retention.py stay listed (same name and hash, 'source': 'store')
+and are read from their compacted month in the article store.
+
+    python scripts/dataset_manifest.py     # refresh and print the manifest
+"""
+import io
+import os
+import re
+import sys
+import glob
+import json
+import hashlib
+
+import pandas as pd
+
+try:
+    from data_io import sniff_encoding, record_encoding, apply_schema, SCHEMAS
+    from article_store import partition_files, month_index, read_articles, csv_filename, parse_filename, STORE_DIR
+except ImportError:
+    from scripts.data_io import sniff_encoding, record_encoding, apply_schema, SCHEMAS
+    from scripts.article_store import partition_files, month_index, read_articles, csv_filename, parse_filename, STORE_DIR
+
+RAW_DATA_DIR = "data/articles_raw"
+MANIFEST_PATH = os.path.join("data", "cache", "dataset_manifest.json")
+
+# Derived files are regenerated from canonical ones (rank_articles.py) and never re-read for training
+DERIVED_PREFIXES = ("articles_ranked_",)
+
+# Explicit dtypes for the crawler schema (score_ag is coerced with to_numeric after reading)
+TEXT_COLUMNS = SCHEMAS['articles']['text']
+DEFAULT_COLUMNS = ['url', 'title', 'summary', 'published_date', 'category', 'score_ag', 'keywords']
+
+
+def is_canonical(filename):
+    return filename.startswith("articles_") and filename.endswith(".csv") and not filename.startswith(DERIVED_PREFIXES)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def describe_file(path):
+    """Manifest entry for one CSV (reads the file once)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    encoding = sniff_encoding(data)
+    record_encoding(path, encoding)
+    header = pd.read_csv(io.BytesIO(data), encoding=encoding, nrows=0)
+    columns = header.columns.tolist()
+    rows = len(pd.read_csv(io.BytesIO(data), encoding=encoding, usecols=[columns[0]])) if columns else 0
+    stat = os.stat(path)
+    match = re.search(r'_(\d{8})\.csv$', os.path.basename(path))
+    return {
+        'file': os.path.basename(path),
+        'kind': re.sub(r'^articles_|_?\d{8}\.csv$', '', os.path.basename(path)) or 'weekly',
+        'date': match.group(1) if match else None,
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'sha256': hashlib.sha256(data).hexdigest(),
+        'encoding': encoding,
+        'columns': columns,
+        'rows': rows,
+    }
+
+
+def store_entries(store_dir=STORE_DIR):
+    """Manifest entries of canonical files that only exist in compacted months of the article store"""
+    entries = {}
+    for (kind, crawl_date), path in partition_files(store_dir).items():
+        if 'crawl_month=' not in path or kind.startswith('ranked'):
+            continue
+        info = month_index(path)[crawl_date]
+        if 'sha256' not in info:
+            continue
+        name = csv_filename(kind, crawl_date)
+        entries[name] = {
+            'file': name,
+            'kind': re.sub(r'^articles_|_?\d{8}\.csv$', '', name) or 'weekly',
+            'date': crawl_date,
+            'size': info.get('size'),
+            'mtime': None,
+            'sha256': info['sha256'],
+            'encoding': info.get('encoding'),
+            'columns': info['columns'],
+            'rows': info['rows'],
+            'source': 'store',
+        }
+    return entries
+
+
+def build_manifest(raw_dir=RAW_DATA_DIR, path=MANIFEST_PATH, store_dir=STORE_DIR):
+    """Refresh the manifest; unchanged files (same size + mtime, or same content hash) are not re-parsed"""
+    previous = {}
+    if os.path.exists(path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                previous = json.load(f).get('files', {})
+        except Exception as e:
+            print(f"[WARNING] Could not read dataset manifest ({e}), rebuilding")
+
+    files = {}
+    for file_path in sorted(glob.glob(os.path.join(raw_dir, "articles_*.csv"))):
+        name = os.path.basename(file_path)
+        if not is_canonical(name):
+            continue
+        stat = os.stat(file_path)
+        entry = previous.get(name)
+        if entry is None or entry['size'] != stat.st_size:
+            entry = describe_file(file_path)
+        elif entry['mtime'] != stat.st_mtime:
+            # A fresh checkout resets every mtime: identical bytes keep their entry (only re-hashed)
+            if file_sha256(file_path) == entry['sha256']:
+                entry = dict(entry, mtime=stat.st_mtime)
+            else:
+                entry = describe_file(file_path)
+        files[name] = entry
+    # Retired CSVs keep their entry (and hash, so caches keyed on it stay valid)
+    for name, entry in store_entries(store_dir).items():
+        files.setdefault(name, entry)
+    files = dict(sorted(files.items()))
+
+    manifest = {
+        'raw_dir': raw_dir,
+        'hash': hashlib.sha256("".join(f"{n}:{e['sha256']}" for n, e in files.items()).encode()).hexdigest(),
+        'files': files,
+    }
+    if files != previous:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    return manifest
+
+
+def read_entry(entry, columns=DEFAULT_COLUMNS, raw_dir=RAW_DATA_DIR, store_dir=STORE_DIR):
+    """Read only `columns` of one manifest file with its known encoding; absent columns come back as NaN"""
+    usecols = [c for c in columns if c in entry['columns']]
+    if entry.get('source') == 'store':
+        kind, crawl_date = parse_filename(entry['file'])
+        df = read_articles(kind, crawl_date, crawl_date, columns=usecols, store_dir=store_dir)
+        return apply_schema(df, 'articles').reindex(columns=columns)
+    df = pd.read_csv(
+        os.path.join(raw_dir, entry['file']),
+        encoding=entry['encoding'],
+        usecols=usecols,
+        dtype={c: str for c in usecols if c in TEXT_COLUMNS}
+    )
+    if 'score_ag' in df.columns:
+        df['score_ag'] = pd.to_numeric(df['score_ag'], errors='coerce')
+    return df.reindex(columns=columns)
+
+
+if __name__ == "__main__":
+    manifest = build_manifest(sys.argv[1] if len(sys.argv) > 1 else RAW_DATA_DIR)
+    total = sum(e['rows'] for e in manifest['files'].values())
+    for entry in manifest['files'].values():
+        print(f"  {entry['file']}: {entry['rows']} rows, {entry['encoding']}, {len(entry['columns'])} columns")
+    print(f"[OK] {len(manifest['files'])} canonical files, {total} rows (manifest {manifest['hash'][:12]})")
@@ -0,0 +1,220 @@
+"""
+Embedding Backends for ko-sroberta text features
+Provides a common encode() interface over sentence-transformers (torch)
+and ONNX Runtime (CPU only, no torch import needed at rank time)
+"""
+import os
+import sys
+import numpy as np
+
+try:
+    from config import load_pipeline_config
+except ImportError:
+    from scripts.config import load_pipeline_config
+
+DEFAULT_MODEL_NAME = 'jhgan/ko-sroberta-multitask'
+DEFAULT_ONNX_DIR = os.path.join("model", "onnx")
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_TOKENIZER_FILE = "tokenizer.json"
+
+# Process-wide backend cache (loading the encoder is the slow part)
+_backends = {}
+
+
+def load_embedding_settings():
+    """Embedding settings from config/pipeline.yaml, overridable by environment variables"""
+    settings = {
+        'backend': 'sentence-transformers',
+        'model_name': DEFAULT_MODEL_NAME,
+        'onnx_dir': DEFAULT_ONNX_DIR,
+        'max_seq_length': 128,
+        'batch_size': 32,
+    }
+    try:
+        settings.update(load_pipeline_config().get('embedding', {}) or {})
+    except Exception as e:
+        print(f"[WARNING] Could not read pipeline config: {e}")
+
+    settings['backend'] = os.getenv('EMBEDDING_BACKEND', settings['backend'])
+    settings['onnx_dir'] = os.getenv('EMBEDDING_ONNX_DIR', settings['onnx_dir'])
+    return settings
+
+
+class SentenceTransformerBackend:
+    """Reference backend: sentence-transformers on torch"""
+    name = 'sentence-transformers'
+
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, batch_size=32):
+        from sentence_transformers import SentenceTransformer
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._model = SentenceTransformer(model_name)
+
+    def encode(self, texts, show_progress_bar=False):
+        single = isinstance(texts, str)
+        embeddings = self._model.encode(
+            [texts] if single else list(texts),
+            batch_size=self.batch_size,
+            show_progress_bar=show_progress_bar
+        )
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        return embeddings[0] if single else embeddings
+
+
+class OnnxBackend:
+    """
+    ONNX Runtime CPU backend exported from the same ko-sroberta weights.
+    Reproduces sentence-transformers mean pooling over the attention mask.
+    """
+    name = 'onnx'
+
+    def __init__(self, onnx_dir=DEFAULT_ONNX_DIR, model_name=DEFAULT_MODEL_NAME,
+                 max_seq_length=128, batch_size=32):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = os.path.join(onnx_dir, ONNX_MODEL_FILE)
+        tokenizer_path = os.path.join(onnx_dir, ONNX_TOKENIZER_FILE)
+        if not os.path.exists(model_path) or not os.path.exists(tokenizer_path):
+            raise FileNotFoundError(
+                f"ONNX encoder not found in {onnx_dir}. "
+                "Export it first: python scripts/embedding_backend.py --export"
+            )
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+
+        self._tokenizer = Tokenizer.from_file(tokenizer_path)
+        self._tokenizer.enable_truncation(max_length=max_seq_length)
+        self._tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self._input_names = [i.name for i in self._session.get_inputs()]
+
+    def _encode_batch(self, texts):
+        encodings = self._tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        feeds = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        if 'token_type_ids' in self._input_names:
+            feeds['token_type_ids'] = np.zeros_like(input_ids)
+        feeds = {k: v for k, v in feeds.items() if k in self._input_names}
+
+        token_embeddings = self._session.run(None, feeds)[0]
+
+        # Mean pooling (same as the sentence-transformers pooling config of ko-sroberta)
+        mask = attention_mask[:, :, None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        counts = np.clip(mask.sum(axis=1), 1e-9, None)
+        return (summed / counts).astype(np.float32)
+
+    def encode(self, texts, show_progress_bar=False):
+        single = isinstance(texts, str)
+        texts = [texts] if single else [str(t) for t in texts]
+        if not texts:
+            return np.zeros((0, 768), dtype=np.float32)
+
+        # Sort by length so each batch pads to a similar size
+        order = np.argsort([len(t) for t in texts])
+        out = [None] * len(texts)
+        total = len(texts)
+        for start in range(0, total, self.batch_size):
+            idx = order[start:start + self.batch_size]
+            batch_emb = self._encode_batch([texts[i] for i in idx])
+            for i, emb in zip(idx, batch_emb):
+                out[i] = emb
+            if show_progress_bar:
+                print(f"   Encoding {min(start + self.batch_size, total)}/{total}...")
+
+        embeddings = np.vstack(out)
+        return embeddings[0] if single else embeddings
+
+
+def get_embedding_backend(name=None):
+    """
+    Return a (cached) embedding backend selected by config.
+    Falls back to sentence-transformers if the ONNX encoder is unavailable.
+    """
+    settings = load_embedding_settings()
+    name = name or settings['backend']
+
+    if name in _backends:
+        return _backends[name]
+
+    if name == 'onnx':
+        try:
+            backend = OnnxBackend(
+                onnx_dir=settings['onnx_dir'],
+                model_name=settings['model_name'],
+                max_seq_length=int(settings['max_seq_length']),
+                batch_size=int(settings['batch_size'])
+            )
+        except Exception as e:
+            print(f"[WARNING] ONNX backend unavailable ({e}). Falling back to sentence-transformers.")
+            backend = get_embedding_backend('sentence-transformers')
+    elif name == 'sentence-transformers':
+        backend = SentenceTransformerBackend(
+            model_name=settings['model_name'],
+            batch_size=int(settings['batch_size'])
+        )
+    else:
+        raise ValueError(f"Unknown embedding backend: {name}")
+
+    _backends[name] = backend
+    return backend
+
+
+def export_onnx(output_dir=None, model_name=None):
+    """
+    Export the ko-sroberta transformer to ONNX (one-off, needs torch + transformers).
+    Writes model.onnx and tokenizer.json into output_dir.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    settings = load_embedding_settings()
+    output_dir = output_dir or settings['onnx_dir']
+    model_name = model_name or settings['model_name']
+    os.makedirs(output_dir, exist_ok=True)
+
+    print(f">>> Exporting {model_name} to ONNX...")
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+
+    dummy = tokenizer(["의약품 유통 시장 동향"], return_tensors='pt', padding=True)
+    model_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    torch.onnx.export(
+        model,
+        (dummy['input_ids'], dummy['attention_mask']),
+        model_path,
+        input_names=['input_ids', 'attention_mask'],
+        output_names=['last_hidden_state'],
+        dynamic_axes={
+            'input_ids': {0: 'batch', 1: 'sequence'},
+            'attention_mask': {0: 'batch', 1: 'sequence'},
+            'last_hidden_state': {0: 'batch', 1: 'sequence'},
+        },
+        opset_version=14
+    )
+    tokenizer.backend_tokenizer.save(os.path.join(output_dir, ONNX_TOKENIZER_FILE))
+    print(f"[OK] ONNX encoder saved to {output_dir}")
+
+    # Parity check against sentence-transformers
+    texts = ["삼성바이오로직스 실적 급등", "지오영, 신규 물류센터 가동"]
+    reference = SentenceTransformerBackend(model_name).encode(texts)
+    exported = OnnxBackend(output_dir, model_name, int(settings['max_seq_length'])).encode(texts)
+    max_diff = float(np.abs(reference - exported).max())
+    print(f"[OK] Max abs difference vs sentence-transformers: {max_diff:.2e}")
+
+
+if __name__ == "__main__":
+    if "--export" in sys.argv:
+        export_onnx()
+    else:
+        backend = get_embedding_backend()
+        emb = backend.encode(["의약품유통 테스트 문장"])
+        print(f"Backend: {backend.name} | Embedding shape: {emb.shape}")
@@ -0,0 +1,125 @@
+"""
+On-disk Embedding Cache
+Maps a hash of the encoded text to its embedding, one cache per encoder
+(backend + model name), so re-ranking and backfills only encode new text.
+
+Layout under data/cache/embeddings/:
+    <encoder>.npy        float32 (n, dim), memory-mapped on load
+    <encoder>.keys.json  text hashes in row order
+"""
+import gc
+import os
+import re
+import json
+import hashlib
+import threading
+
+import numpy as np
+
+EMBEDDING_CACHE_DIR = os.path.join("data", "cache", "embeddings")
+
+
+def text_key(text):
+    return hashlib.sha1(str(text).encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """Thread-safe text -> embedding cache wrapping an embedding backend"""
+
+    def __init__(self, backend, cache_dir=EMBEDDING_CACHE_DIR):
+        self.backend = backend
+        namespace = re.sub(r'[^A-Za-z0-9_.-]+', '_', f"{backend.name}_{backend.model_name}")
+        self.array_path = os.path.join(cache_dir, f"{namespace}.npy")
+        self.keys_path = os.path.join(cache_dir, f"{namespace}.keys.json")
+
+        self._lock = threading.Lock()
+        self._encode_lock = threading.Lock()
+        self._base = None
+        self._index = {}
+        self._new_rows = []
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        if not (os.path.exists(self.array_path) and os.path.exists(self.keys_path)):
+            return
+        try:
+            with open(self.keys_path, encoding='utf-8') as f:
+                keys = json.load(f)
+            base = np.load(self.array_path, mmap_mode='r')
+            if len(keys) != len(base):
+                print(f"[WARNING] Embedding cache {self.array_path} is inconsistent, ignoring it")
+                return
+            self._base = base
+            self._index = {k: i for i, k in enumerate(keys)}
+        except Exception as e:
+            print(f"[WARNING] Could not load embedding cache: {e}")
+
+    def __len__(self):
+        return len(self._index)
+
+    def _row(self, i):
+        n_base = 0 if self._base is None else len(self._base)
+        return self._base[i] if i < n_base else self._new_rows[i - n_base]
+
+    def encode(self, texts, show_progress_bar=False):
+        """Same contract as backend.encode(list): float32 (n, dim), encoding only uncached texts"""
+        texts = [str(t) for t in texts]
+        keys = [text_key(t) for t in texts]
+
+        with self._lock:
+            missing = {}
+            for key, text in zip(keys, texts):
+                if key not in self._index and key not in missing:
+                    missing[key] = text
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            # One encoder call at a time (torch already uses every core)
+            with self._encode_lock:
+                embeddings = self.backend.encode(list(missing.values()), show_progress_bar=show_progress_bar)
+            with self._lock:
+                for key, emb in zip(missing.keys(), embeddings):
+                    if key not in self._index:
+                        self._index[key] = len(self._index)
+                        self._new_rows.append(np.asarray(emb, dtype=np.float32))
+
+        with self._lock:
+            rows = [self._row(self._index[k]) for k in keys]
+        if not rows:
+            return np.zeros((0, 768), dtype=np.float32)
+        return np.vstack(rows).astype(np.float32, copy=False)
+
+    def save(self):
+        """Persist new rows (rewrites the array; temp files + rename)"""
+        with self._lock:
+            if not self._new_rows:
+                return
+            keys = sorted(self._index, key=self._index.get)
+            parts = ([np.asarray(self._base)] if self._base is not None else []) + [np.vstack(self._new_rows)]
+            array = np.ascontiguousarray(np.vstack(parts), dtype=np.float32)
+            del parts
+
+            os.makedirs(os.path.dirname(self.array_path), exist_ok=True)
+            tmp_array = self.array_path + ".tmp.npy"
+            tmp_keys = self.keys_path + ".tmp"
+            np.save(tmp_array, array)
+            with open(tmp_keys, 'w', encoding='utf-8') as f:
+                json.dump(keys, f)
+
+            # Windows cannot replace a file that is still memory-mapped: release the mapping first
+            had_base = self._base is not None
+            self._base = None
+            gc.collect()
+            try:
+                os.replace(tmp_array, self.array_path)
+                os.replace(tmp_keys, self.keys_path)
+                had_base = True
+            finally:
+                # Re-map whatever array is on disk now (the old one if the replace failed)
+                if had_base:
+                    self._base = np.load(self.array_path, mmap_mode='r')
+            self._new_rows = []
+        print(f"[OK] Embedding cache saved ({len(keys)} texts, {self.hits} hits / {self.misses} misses)")
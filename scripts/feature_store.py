@@ -0,0 +1,172 @@
+"""
+Training Feature Store
+Keeps what train_lgbm_model.py needs per article so a weekly run only reads
+new/changed raw files and only encodes texts it has never seen.
+
+Layout under data/cache/features/:
+    files.json     content hash of each ingested canonical raw CSV (see dataset_manifest.py)
+    articles.csv   url, article_id, title, summary, published_date, category, score_ag
+                   (+ source_file, row_no so the latest file wins, like the old concat + dedup)
+    labels.csv     article_id, url, reward, labeled_at (first time this reward was seen)
+Raw embeddings live in the shared embedding cache (data/cache/embeddings), keyed by text,
+so articles already encoded by rank_articles.py are free here too.
+"""
+import os
+import json
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    from dataset_manifest import build_manifest, read_entry
+    from data_io import atomic_write_csv
+    from score_cache import article_keys
+    from embedding_cache import EmbeddingCache
+except ImportError:
+    from scripts.dataset_manifest import build_manifest, read_entry
+    from scripts.data_io import atomic_write_csv
+    from scripts.score_cache import article_keys
+    from scripts.embedding_cache import EmbeddingCache
+
+FEATURE_STORE_DIR = os.path.join("data", "cache", "features")
+RAW_DATA_DIR = "data/articles_raw"
+ARTICLE_COLUMNS = ['url', 'article_id', 'title', 'summary', 'published_date', 'category', 'score_ag',
+                   'source_file', 'row_no']
+SOURCE_COLUMNS = ['url', 'title', 'summary', 'published_date', 'category', 'score_ag']
+LABEL_COLUMNS = ['article_id', 'url', 'reward', 'labeled_at']
+
+
+def _reward_column(labels_df):
+    for col in ['reward', 'reward_label', 'reward_raw']:
+        if col in labels_df.columns:
+            return col
+    return None
+
+
+class FeatureStore:
+    def __init__(self, store_dir=FEATURE_STORE_DIR, raw_data_dir=RAW_DATA_DIR):
+        self.store_dir = store_dir
+        self.raw_data_dir = raw_data_dir
+        self.files_path = os.path.join(store_dir, "files.json")
+        self.articles_path = os.path.join(store_dir, "articles.csv")
+        self.labels_path = os.path.join(store_dir, "labels.csv")
+
+        self.files = {}
+        self.articles = pd.DataFrame(columns=ARTICLE_COLUMNS)
+        self.labels = pd.DataFrame(columns=LABEL_COLUMNS)
+        self._encoder = None
+        self._load()
+
+    def _load(self):
+        try:
+            if os.path.exists(self.files_path):
+                with open(self.files_path, encoding='utf-8') as f:
+                    self.files = json.load(f)
+            if os.path.exists(self.articles_path):
+                text_cols = ['url', 'article_id', 'title', 'summary', 'published_date', 'category', 'source_file']
+                self.articles = pd.read_csv(self.articles_path, encoding='utf-8', dtype={c: str for c in text_cols})
+            if os.path.exists(self.labels_path):
+                self.labels = pd.read_csv(self.labels_path, encoding='utf-8', dtype={'article_id': str, 'url': str})
+        except Exception as e:
+            print(f"[WARNING] Could not load feature store ({e}), rebuilding")
+            self.files = {}
+            self.articles = pd.DataFrame(columns=ARTICLE_COLUMNS)
+            self.labels = pd.DataFrame(columns=LABEL_COLUMNS)
+
+    def sync_articles(self):
+        """
+        Ingest new or modified canonical raw CSVs (derived articles_ranked_* files are skipped);
+        drop files that disappeared. Returns number of files read.
+        """
+        manifest = build_manifest(self.raw_data_dir)
+        current = {name: entry['sha256'] for name, entry in manifest['files'].items()}
+
+        changed = [name for name, sha in current.items() if self.files.get(name) != sha]
+        removed = [name for name in self.files if name not in current]
+
+        frames = []
+        for name in changed:
+            entry = manifest['files'][name]
+            if not entry['rows'] or 'url' not in entry['columns']:
+                continue
+            raw = read_entry(entry, SOURCE_COLUMNS, self.raw_data_dir)
+            raw['url'] = raw['url'].astype(str)
+            raw['article_id'], _ = article_keys(raw[['url']])
+            raw['source_file'] = name
+            raw['row_no'] = np.arange(len(raw))
+            frames.append(raw[ARTICLE_COLUMNS])
+
+        stale = set(changed) | set(removed)
+        if stale:
+            kept = self.articles[~self.articles['source_file'].isin(stale)]
+            parts = ([kept] if len(kept) else []) + frames
+            self.articles = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=ARTICLE_COLUMNS)
+        self.files = current
+        if changed or removed:
+            print(f"  - Feature store: ingested {len(changed)} raw files, removed {len(removed)}")
+        return len(changed)
+
+    def latest_articles(self):
+        """One row per url, latest raw file (and row) wins - same as concat(sorted files) + drop_duplicates(keep='last')"""
+        ordered = self.articles.sort_values(['source_file', 'row_no'], kind='mergesort')
+        return ordered.drop_duplicates(subset=['url'], keep='last')
+
+    def sync_labels(self, labels_df):
+        """Record labels with the time they were first seen. Returns number of new/changed labels."""
+        reward_col = _reward_column(labels_df)
+        if reward_col is None:
+            return 0
+        current = labels_df[['url', reward_col]].rename(columns={reward_col: 'reward'}).copy()
+        current['url'] = current['url'].astype(str)
+        current = current.drop_duplicates(subset=['url'], keep='last')
+        current['article_id'], _ = article_keys(current[['url']])
+
+        previous = self.labels.set_index('article_id') if not self.labels.empty else None
+        now = datetime.now().isoformat(timespec='seconds')
+        labeled_at, n_new = [], 0
+        for article_id, reward in zip(current['article_id'], current['reward']):
+            if previous is not None and article_id in previous.index and previous.at[article_id, 'reward'] == reward:
+                labeled_at.append(previous.at[article_id, 'labeled_at'])
+            else:
+                labeled_at.append(now)
+                n_new += 1
+        current['labeled_at'] = labeled_at
+        self.labels = current[LABEL_COLUMNS].reset_index(drop=True)
+        return n_new
+
+    def training_frame(self, labels_df):
+        """labels inner-joined with the latest raw article rows (raw title/summary/category/score_ag win)"""
+        raw_df = self.latest_articles().drop(columns=['article_id', 'source_file', 'row_no'])
+        labels_df = labels_df.copy()
+        labels_df['url'] = labels_df['url'].astype(str)
+        df = pd.merge(labels_df, raw_df, on='url', how='inner', suffixes=('_label', '_raw'))
+        for col in ['title', 'summary', 'published_date', 'category', 'score_ag']:
+            if f'{col}_raw' in df.columns:
+                df[col] = df[f'{col}_raw']
+        return df
+
+    def embeddings(self, texts, backend, verbose=True):
+        """Raw (768-d) embeddings for texts, encoding only those not cached yet"""
+        if self._encoder is None or self._encoder.backend is not backend:
+            self._encoder = EmbeddingCache(backend)
+        before = self._encoder.misses
+        embeddings = self._encoder.encode(texts, show_progress_bar=verbose)
+        if verbose:
+            print(f"  - Encoded {self._encoder.misses - before} new texts, {len(texts) - (self._encoder.misses - before)} from cache")
+        return embeddings
+
+    def encoder_stats(self):
+        """(hits, misses) of the embedding cache used by this store"""
+        return (self._encoder.hits, self._encoder.misses) if self._encoder is not None else (0, 0)
+
+    def save(self):
+        os.makedirs(self.store_dir, exist_ok=True)
+        atomic_write_csv(self.articles, self.articles_path, encoding='utf-8')
+        atomic_write_csv(self.labels, self.labels_path, encoding='utf-8')
+        tmp_path = self.files_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.files, f, indent=2)
+        os.replace(tmp_path, self.files_path)
+        if self._encoder is not None:
+            self._encoder.save()
@@ -0,0 +1,234 @@
+"""
+Buffered Feedback Sink for the dashboards
+A 👍 click only appends the event locally (feedback_log.csv + a pending spool)
+and queues it; a background thread commits the queued events to GitHub in one
+commit when flush_interval elapses or batch_size events are waiting.
+
+Each event is its own file, so concurrent writers never edit the same blob:
+    data/labels/feedback_events/<YYYYMMDD_HHMMSS>_<event_id>.json
+
+Commits go through the Git Data API (tree with all new event files -> commit ->
+fast-forward the branch ref); if the branch moved in the meantime the commit
+is rebuilt on the new head. Events stay in the spool (data/cache/) until their
+commit lands, so a failed flush or a restart does not lose them.
+scripts/merge_feedback.py folds the event files into the label store (data/labels/labels.db).
+"""
+import os
+import csv
+import json
+import uuid
+import atexit
+import threading
+from datetime import datetime
+
+import pytz
+import requests
+
+try:
+    from config import load_pipeline_config
+except ImportError:
+    from scripts.config import load_pipeline_config
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FEEDBACK_LOG = os.path.join("data", "labels", "feedback_log.csv")
+EVENTS_DIR = "data/labels/feedback_events"  # repo path (also the local path under BASE_DIR)
+SPOOL_FILE = os.path.join("data", "cache", "feedback_spool.jsonl")
+FEEDBACK_COLUMNS = ['feedback_date', 'url', 'title', 'category', 'keywords', 'score_ag', 'reward']
+GITHUB_API = "https://api.github.com"
+MAX_REF_RETRIES = 3
+
+DEFAULT_SETTINGS = {
+    'branch': 'main',
+    'flush_interval': 30,
+    'batch_size': 20,
+    'timeout': 10,
+}
+KST = pytz.timezone('Asia/Seoul')
+
+
+def load_settings():
+    """Feedback sink settings from config/pipeline.yaml (defaults if absent)"""
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        settings.update(load_pipeline_config().get('feedback', {}) or {})
+    except Exception as e:
+        print(f"[WARNING] Could not read pipeline config: {e}")
+    return settings
+
+
+def make_event(row, label):
+    """Feedback event dict (feedback_log.csv columns + event_id) for an article row"""
+    now = datetime.now(KST)
+    return {
+        'event_id': uuid.uuid4().hex[:12],
+        'event_time': now.strftime("%Y%m%d_%H%M%S"),
+        'feedback_date': now.strftime("%Y-%m-%d %H:%M"),
+        'url': str(row.get('url', '')).strip(),
+        'title': str(row.get('title', '')).replace("\n", " ").strip(),
+        'category': str(row.get('category', '')).strip(),
+        'keywords': str(row.get('keywords', '')).strip(),
+        'score_ag': str(row.get('score_ag', '')).strip(),
+        'reward': label,
+    }
+
+
+def event_path(event):
+    return f"{EVENTS_DIR}/{event['event_time']}_{event['event_id']}.json"
+
+
+def event_json(event):
+    return json.dumps(event, ensure_ascii=False, sort_keys=True) + "\n"
+
+
+class FeedbackSink:
+    """
+    One per server process (the dashboards hold it in st.cache_resource).
+    Without a token it only writes the local feedback_log.csv, as before.
+    """
+
+    def __init__(self, repo=None, token=None, base_dir=BASE_DIR, settings=None):
+        self.repo = repo
+        self.token = token or None
+        self.settings = settings or load_settings()
+        self.log_path = os.path.join(base_dir, FEEDBACK_LOG)
+        self.spool_path = os.path.join(base_dir, SPOOL_FILE)
+        self.committed = 0
+        self.last_error = None
+
+        self._lock = threading.Lock()        # pending list + local files
+        self._flush_lock = threading.Lock()  # one commit at a time
+        self._wake = threading.Event()
+        self._pending = self._read_spool() if self.token else []
+        self._thread = None
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bearer {self.token}",
+            "Accept": "application/vnd.github+json",
+        })
+        if self.token:
+            atexit.register(self.flush)
+            if self._pending:
+                print(f"[INFO] {len(self._pending)} feedback events from a previous run waiting to be committed")
+                self._start()
+
+    # -- click path ------------------------------------------------------------
+
+    def record(self, row, label):
+        """Append one feedback event locally and queue it for the next commit. Returns the event."""
+        event = make_event(row, label)
+        with self._lock:
+            self._append_log(event)
+            if self.token:
+                self._append_spool(event)
+                self._pending.append(event)
+                if len(self._pending) >= self.settings['batch_size']:
+                    self._wake.set()
+        if self.token:
+            self._start()
+        return event
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _append_log(self, event):
+        try:
+            os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+            is_new = not os.path.exists(self.log_path)
+            with open(self.log_path, "a", encoding="utf-8-sig", newline="") as f:
+                writer = csv.writer(f, quoting=csv.QUOTE_MINIMAL, lineterminator="\n")
+                if is_new:
+                    writer.writerow(FEEDBACK_COLUMNS)
+                writer.writerow([event[c] for c in FEEDBACK_COLUMNS])
+            print(f"[OK] Feedback saved locally: {event['title'][:40]}...")
+        except Exception as e:
+            print(f"[WARNING] Could not save feedback locally: {e}")
+
+    def _append_spool(self, event):
+        try:
+            os.makedirs(os.path.dirname(self.spool_path), exist_ok=True)
+            with open(self.spool_path, "a", encoding="utf-8") as f:
+                f.write(event_json(event))
+        except Exception as e:
+            print(f"[WARNING] Could not spool feedback event: {e}")
+
+    def _read_spool(self):
+        if not os.path.exists(self.spool_path):
+            return []
+        events = []
+        with open(self.spool_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue  # torn last line
+        return events
+
+    def _rewrite_spool(self):
+        tmp_path = self.spool_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(event_json(e) for e in self._pending)
+        os.replace(tmp_path, self.spool_path)
+
+    # -- background flush ------------------------------------------------------
+
+    def _start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="feedback-sink", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.settings['flush_interval'])
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Commit all queued events to GitHub as one commit. Returns the number committed."""
+        if not self.token:
+            return 0
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._pending)
+            if not batch:
+                return 0
+            try:
+                sha = self._commit(batch)
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"[WARNING] Feedback commit failed, {len(batch)} events kept for retry: {e}")
+                return 0
+            flushed = {e['event_id'] for e in batch}
+            with self._lock:
+                self._pending = [e for e in self._pending if e['event_id'] not in flushed]
+                self._rewrite_spool()
+            self.committed += len(batch)
+            self.last_error = None
+            print(f"[OK] Committed {len(batch)} feedback events to GitHub ({sha[:7]})")
+            return len(batch)
+
+    def _api(self, method, path, **kwargs):
+        response = self.session.request(method, f"{GITHUB_API}/repos/{self.repo}/{path}",
+                                        timeout=self.settings['timeout'], **kwargs)
+        if response.status_code >= 400 and not (method == 'PATCH' and response.status_code == 422):
+            raise RuntimeError(f"GitHub API {method} {path}: {response.status_code} {response.text[:300]}")
+        return response
+
+    def _commit(self, events):
+        """Git Data API: new tree (base = branch head) + commit, then fast-forward the ref"""
+        branch = self.settings['branch']
+        entries = [{"path": event_path(e), "mode": "100644", "type": "blob", "content": event_json(e)}
+                   for e in events]
+        message = f"Feedback: {len(events)} events ({events[0]['feedback_date']} ~ {events[-1]['feedback_date']})"
+        for _ in range(MAX_REF_RETRIES):
+            head = self._api('GET', f"git/ref/heads/{branch}").json()['object']['sha']
+            base_tree = self._api('GET', f"git/commits/{head}").json()['tree']['sha']
+            tree = self._api('POST', "git/trees", json={"base_tree": base_tree, "tree": entries}).json()['sha']
+            commit = self._api('POST', "git/commits",
+                               json={"message": message, "tree": tree, "parents": [head]}).json()['sha']
+            response = self._api('PATCH', f"git/refs/heads/{branch}", json={"sha": commit, "force": False})
+            if response.status_code == 200:
+                return commit
+            # 422: branch moved since we read it (another writer / the weekly workflow) - rebuild on the new head
+        raise RuntimeError(f"branch {branch} kept moving ({MAX_REF_RETRIES} attempts)")
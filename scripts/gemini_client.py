@@ -0,0 +1,173 @@
+"""
+Gemini Client with an Adaptive Rate Limiter
+Runs generateContent requests concurrently (thread pool) under one shared limiter
+instead of fixed sleeps between batches:
+
+    - at most `limit` requests in flight; the limit grows by ~1 per `limit` successes
+      (additive increase) and halves on a 429 / 503 (multiplicative decrease)
+    - a 429 pauses every worker until its Retry-After (header, or the retryDelay in the
+      error body; exponential backoff if neither is given), then requests resume
+    - results of generate_many() come back in the order of the prompts
+
+Settings: config/pipeline.yaml `gemini`; GEMINI_BASE_URL / GEMINI_MODEL override them,
+e.g. GEMINI_BASE_URL=http://127.0.0.1:9000/v1beta to run against a local mock endpoint.
+"""
+import os
+import re
+import time
+import threading
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+try:
+    from config import load_pipeline_config
+except ImportError:
+    from scripts.config import load_pipeline_config
+
+DEFAULT_SETTINGS = {
+    'model': 'gemini-2.0-flash',
+    'base_url': 'https://generativelanguage.googleapis.com/v1beta',
+    'initial_concurrency': 2,
+    'max_concurrency': 8,
+    'max_retries': 5,
+    'timeout': 60,
+    'max_backoff': 60,
+    # Articles missing from a batch response are re-requested in sub-batches of at most this size
+    'missing_retry_rounds': 2,
+    'missing_retry_batch_size': 10,
+}
+DEFAULT_GENERATION_CONFIG = {"temperature": 0.2, "maxOutputTokens": 8192}
+THROTTLE_STATUSES = (429, 503)
+
+
+def load_settings():
+    """Gemini client settings from config/pipeline.yaml, overridable by environment variables"""
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        settings.update(load_pipeline_config().get('gemini', {}) or {})
+    except Exception as e:
+        print(f"[WARNING] Could not read pipeline config: {e}")
+    settings['base_url'] = os.getenv('GEMINI_BASE_URL', settings['base_url'])
+    settings['model'] = os.getenv('GEMINI_MODEL', settings['model'])
+    return settings
+
+
+def retry_after_seconds(response):
+    """Seconds to wait from a throttled response (Retry-After header or Gemini's retryDelay), or None"""
+    header = response.headers.get('Retry-After')
+    if header:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(header).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    match = re.search(r'"retryDelay"\s*:\s*"([\d.]+)s"', response.text or '')
+    return float(match.group(1)) if match else None
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit plus a shared pause after throttling; one instance per client"""
+
+    def __init__(self, initial=2, maximum=8, minimum=1, max_backoff=60):
+        self.limit = float(initial)
+        self.maximum = maximum
+        self.minimum = minimum
+        self.max_backoff = max_backoff
+        self.in_flight = 0
+        self.resume_at = 0.0
+        self.throttled = 0
+        self._streak = 0  # consecutive throttles, for the backoff without Retry-After
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                wait = self.resume_at - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    break
+                self._cond.wait(timeout=wait if wait > 0 else None)
+            self.in_flight += 1
+
+    def release(self, success=True, throttled=False, retry_after=None):
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.throttled += 1
+                self._streak += 1
+                self.limit = max(self.minimum, self.limit / 2)
+                pause = retry_after if retry_after is not None else min(self.max_backoff, 2 ** self._streak)
+                self.resume_at = max(self.resume_at, time.monotonic() + pause)
+            elif success:
+                self._streak = 0
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+class GeminiClient:
+    def __init__(self, api_key=None, settings=None, limiter=None):
+        self.api_key = api_key if api_key is not None else os.getenv('GENAI_API_KEY')
+        self.settings = settings or load_settings()
+        self.limiter = limiter or AdaptiveLimiter(
+            self.settings['initial_concurrency'], self.settings['max_concurrency'],
+            max_backoff=self.settings['max_backoff'])
+        self.session = requests.Session()
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def url(self):
+        return f"{self.settings['base_url'].rstrip('/')}/models/{self.settings['model']}:generateContent"
+
+    def generate(self, prompt, generation_config=None, system_instruction=None):
+        """Text of one generateContent call, or None after max_retries"""
+        payload = {
+            "contents": [{"parts": [{"text": prompt}]}],
+            "generationConfig": generation_config or DEFAULT_GENERATION_CONFIG,
+        }
+        if system_instruction:
+            # Instructions shared by every request go in the system turn, articles in the user turn
+            payload["systemInstruction"] = {"parts": [{"text": system_instruction}]}
+        for attempt in range(self.settings['max_retries']):
+            self.limiter.acquire()
+            try:
+                response = self.session.post(self.url, params={'key': self.api_key}, json=payload,
+                                             timeout=self.settings['timeout'])
+            except requests.RequestException as e:
+                print(f"  [WARNING] Gemini API exception (attempt {attempt+1}): {str(e)}")
+                self.limiter.release(success=False, throttled=True)
+                continue
+            self.requests += 1
+
+            if response.status_code == 200:
+                self.limiter.release()
+                try:
+                    return response.json()['candidates'][0]['content']['parts'][0]['text']
+                except (ValueError, KeyError, IndexError) as e:
+                    print(f"  [WARNING] Unexpected Gemini response: {e}")
+                    self.failures += 1
+                    return None
+            if response.status_code in THROTTLE_STATUSES:
+                wait = retry_after_seconds(response)
+                self.limiter.release(success=False, throttled=True, retry_after=wait)
+                print(f"  [WARNING] Gemini API throttled ({response.status_code}, attempt {attempt+1}), "
+                      f"concurrency -> {int(self.limiter.limit)}"
+                      + (f", retry after {wait:.0f}s" if wait is not None else ""))
+                continue
+            self.limiter.release(success=False, throttled=response.status_code >= 500)
+            print(f"  [WARNING] Gemini API error (attempt {attempt+1}): {response.status_code} {response.text[:300]}")
+            if response.status_code < 500:
+                break  # bad request / auth: retrying will not help
+        self.failures += 1
+        return None
+
+    def generate_many(self, prompts, generation_config=None, system_instruction=None):
+        """generate() for every prompt, concurrently under the limiter; results in prompt order"""
+        if not prompts:
+            return []
+        workers = min(len(prompts), self.settings['max_concurrency'])
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda prompt: self.generate(prompt, generation_config, system_instruction), prompts))
@@ -1,14 +1,41 @@
 import os
 import json
 import time
-import requests
 from dotenv import load_dotenv
 
+try:
+    from gemini_client import GeminiClient
+    from llm_cache import LLMCache, content_hash, prompt_hash
+    from article_clusters import (load_settings as load_cluster_settings, embed_articles, leader_clusters,
+                                  group_by_label, representative, propagate)
+    from prompt_packer import PromptPacker, estimate_tokens, load_settings as load_packer_settings
+    from llm_json import salvage_objects
+except ImportError:
+    from scripts.gemini_client import GeminiClient
+    from scripts.llm_cache import LLMCache, content_hash, prompt_hash
+    from scripts.article_clusters import (load_settings as load_cluster_settings, embed_articles, leader_clusters,
+                                          group_by_label, representative, propagate)
+    from scripts.prompt_packer import PromptPacker, estimate_tokens, load_settings as load_packer_settings
+    from scripts.llm_json import salvage_objects
+
 # Load environment variables from .env file (for local development)
 load_dotenv()
 
 GEMINI_API_KEY = os.getenv('GENAI_API_KEY')
-GEMINI_API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={GEMINI_API_KEY}"
+# Estimated output per article: one result object with a one-sentence insight
+OUTPUT_TOKENS_PER_ARTICLE = 100
+# Already scored (cached) articles sent for dedup only: id + duplicate flags
+OUTPUT_TOKENS_PER_CONTEXT = 30
+
+_client = None
+
+
+def get_client():
+    """Process-wide Gemini client, so every caller shares one rate limiter"""
+    global _client
+    if _client is None:
+        _client = GeminiClient(GEMINI_API_KEY)
+    return _client
 
 # BD Manager Persona Prompt - Focused on Commercialized Products
 # BD Manager Persona Prompt - Focused on Commercialized Products
@@ -54,36 +81,84 @@ BD_PERSONA_PROMPT = """
 - "판매 파트너", "유통 계약", "공동판매", "품목 인수", "한국 출시" → 7-10점
 """
 
-def call_gemini_api(prompt, max_retries=3):
-    """Call Gemini API with retry logic"""
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(
-                GEMINI_API_URL,
-                headers={'Content-Type': 'application/json'},
-                json={
-                    "contents": [{
-                        "parts": [{"text": prompt}]
-                    }],
-                    "generationConfig": {
-                        "temperature": 0.2,
-                        "maxOutputTokens": 8192
-                    }
-                },
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result['candidates'][0]['content']['parts'][0]['text']
-            else:
-                print(f"  [WARNING] Gemini API error (attempt {attempt+1}): {response.status_code} {response.text}")
-                time.sleep(2 ** attempt)  # Exponential backoff
-        except Exception as e:
-            print(f"  [WARNING] Gemini API exception (attempt {attempt+1}): {str(e)}")
-            time.sleep(2 ** attempt)
-    
-    return None
+def call_gemini_api(prompt):
+    """Call Gemini API (retries and throttling handled by the shared client)"""
+    return get_client().generate(prompt)
+
+# Instructions shared by every batch (sent once per request as the system instruction)
+BATCH_INSTRUCTIONS = f"""{BD_PERSONA_PROMPT}
+
+[Deduplication Task]
+1. 제공된 기사 리스트 중 동일한 사건(Event)이나 이슈를 다루고 있는 중복 기사들을 그룹화하라.
+2. 중복 그룹 중에서는 가장 정보량이 많고 구체적인(수치, 날짜, 파트너명 포함) 기사 하나만 남기고 나머지는 제거하라.
+3. 제목은 다르더라도 본질적인 비즈니스 임팩트가 같다면 동일 기사로 간주하라.
+4. "scored": true인 기사는 이미 점수가 매겨진 기사(제목만 제공)다. 중복 판단에만 사용하고,
+   결과에는 id, is_duplicate, duplicate_of만 포함하라.
+
+[Scoring Task]
+중복 제거 후 남은 각 기사에 대해:
+- score: 1-10 (우리 비즈니스에 미치는 영향도)
+- strategic_insight: BD 관점에서 왜 중요한지 1문장으로 기술
+- is_high_priority: true (8점 이상) or false
+
+[Output Format]
+반드시 아래 JSON 형식으로 응답하라. 중복 기사는 "is_duplicate": true로 표시하되 리스트에 포함시켜라.
+
+{{
+  "results": [
+    {{
+      "id": 기사 ID,
+      "score": 1-10,
+      "is_duplicate": true/false,
+      "duplicate_of": 중복이면 원본 기사 ID (선택),
+      "strategic_insight": "BD 관점 인사이트",
+      "is_high_priority": true/false
+    }}
+  ]
+}}
+"""
+
+def context_entry(article):
+    """Title-only entry for an article whose score is cached: sent so dedup still sees it"""
+    return {"id": article['id'], "title": article['title'], "category": article.get('category', ''), "scored": True}
+
+def article_payload(article):
+    return json.dumps(article, ensure_ascii=False, indent=2)
+
+def build_batch_prompt(batch):
+    """Per-request part of the prompt: one batch of {id, title, summary, category} dicts"""
+    return f"""[Input Articles]
+{json.dumps(batch, ensure_ascii=False, indent=2)}
+"""
+
+def parse_batch_response(response_text, batch, prefix="    "):
+    """
+    (results, missing new articles) of one batch: every complete result object is kept even
+    when the JSON is truncated or malformed; results for IDs not in the batch are dropped.
+    Context entries of cached articles are never missing (no dedup verdict = not a duplicate).
+    """
+    new_articles = [article for article in batch if not article.get('scored')]
+    if not response_text:
+        print(f"{prefix}-> Error: No response for this batch.")
+        return [], new_articles
+    ids = {article['id'] for article in batch}
+    results, complete = salvage_objects(response_text, 'results', required='id')
+    results = list({r['id']: r for r in results if r['id'] in ids}.values())
+    returned = {r['id'] for r in results}
+    missing = [article for article in new_articles if article['id'] not in returned]
+    if complete and not missing:
+        print(f"{prefix}-> Success: Received {len(results)} results.")
+    else:
+        print(f"{prefix}-> {'Recovered' if not complete else 'Received'} {len(results)}/{len(batch)} results"
+              f"{' from malformed JSON' if not complete else ''}, {len(missing)} missing.")
+    return results, missing
+
+def split_missing(batch, missing, max_size):
+    """Missing articles in sub-batches of at most half the failed batch (and max_size)"""
+    if not missing:
+        return []
+    size = max(1, min(max_size, len(batch) // 2))
+    return [missing[i:i + size] for i in range(0, len(missing), size)]
 
 def gemini_batch_deduplicate_and_score(articles_df):
     """
@@ -120,77 +195,113 @@ def gemini_batch_deduplicate_and_score(articles_df):
             "category": row.get('category', '')
         })
     
-    # Process in batches of 20 (Gemini 2.0 Flash easily handles 20 items per prompt)
-    BATCH_SIZE = 20
-    total_articles = len(all_articles_list)
-    all_gemini_results = []
-    
-    print(f"  [Info] Processing {total_articles} articles in batches of {BATCH_SIZE}...")
-    
-    for i in range(0, total_articles, BATCH_SIZE):
-        batch = all_articles_list[i:i+BATCH_SIZE]
-        print(f"  [Batch {i//BATCH_SIZE + 1}] Processing articles {i+1} to {min(i+BATCH_SIZE, total_articles)}...")
+    # Per-article verdicts (score, insight, priority) already made for the same text, prompt and model
+    # are reused. is_duplicate depends on the rest of the batch, so it is never cached: cached articles
+    # still take part in dedup as title-only context entries of batches that contain new articles.
+    client = get_client()
+    model, prompt_key = client.settings['model'], prompt_hash(BATCH_INSTRUCTIONS)
+    cache = LLMCache()
+    hashes = {article['id']: content_hash(article) for article in all_articles_list}
+    cached = cache.get_many(model, prompt_key, list(hashes.values()))
+    cached = {a['id']: cached[hashes[a['id']]] for a in all_articles_list if hashes[a['id']] in cached}
+    print(f"  [Gemini cache] {cache.hits} hits, {cache.misses} misses (prompt {prompt_key}, {model})")
 
-        # Construct batch prompt
-        prompt = f"""{BD_PERSONA_PROMPT}
+    # Near-identical articles (embedding similarity) are packed into the same batch,
+    # so duplicates that the sort above scatters still meet; optionally one per cluster is sent
+    dedup = load_cluster_settings()
+    clusters = [[a] for a in all_articles_list]
+    clustered = False
+    if dedup['precluster'] and len(all_articles_list) > 1:
+        try:
+            labels = leader_clusters(embed_articles(all_articles_list), dedup['similarity_threshold'])
+            clusters = group_by_label(all_articles_list, labels)
+            clustered = True
+            print(f"  [Cluster] {len(all_articles_list)} articles in {len(clusters)} clusters "
+                  f"({sum(len(c) > 1 for c in clusters)} with near-duplicates)")
+        except Exception as e:
+            print(f"  [WARNING] Pre-clustering unavailable ({e}), batching in sorted order")
+    members = {}
+    if dedup['representatives_only']:
+        for cluster in clusters:
+            rep = representative(cluster)
+            members[rep['id']] = [a['id'] for a in cluster if a is not rep]
+        clusters = [[representative(cluster)] for cluster in clusters]
 
-[Deduplication Task]
-1. 제공된 기사 리스트 중 동일한 사건(Event)이나 이슈를 다루고 있는 중복 기사들을 그룹화하라.
-2. 중복 그룹 중에서는 가장 정보량이 많고 구체적인(수치, 날짜, 파트너명 포함) 기사 하나만 남기고 나머지는 제거하라.
-3. 제목은 다르더라도 본질적인 비즈니스 임팩트가 같다면 동일 기사로 간주하라.
+    # A batch is sent when it holds a new article or cached near-duplicates (dedup has to be redone);
+    # without clusters nothing is known about cached articles, so every batch is sent
+    needs_dedup = {a['id'] for cluster in clusters for a in cluster
+                   if a['id'] not in cached or len(cluster) > 1 or not clustered}
+    clusters = [[context_entry(a) if a['id'] in cached else a for a in cluster] for cluster in clusters]
 
-[Scoring Task]
-중복 제거 후 남은 각 기사에 대해:
-- score: 1-10 (우리 비즈니스에 미치는 영향도)
-- strategic_insight: BD 관점에서 왜 중요한지 1문장으로 기술
-- is_high_priority: true (8점 이상) or false
+    # Requests are filled up to the input/output token budget rather than a fixed article count
+    packer_settings = load_packer_settings('gemini')
+    packer = PromptPacker(
+        fixed_tokens=estimate_tokens(BATCH_INSTRUCTIONS, packer_settings) + estimate_tokens(build_batch_prompt([]), packer_settings),
+        input_cost=lambda article: estimate_tokens(article_payload(article), packer_settings),
+        output_cost=lambda article: OUTPUT_TOKENS_PER_CONTEXT if article.get('scored') else OUTPUT_TOKENS_PER_ARTICLE,
+        settings=packer_settings,
+    )
+    packs = [pack for pack in packer.pack_groups(clusters) if any(a['id'] in needs_dedup for a in pack.items)]
+    batches = [pack.items for pack in packs]
+    total_articles = sum(len(batch) for batch in batches)
 
-[Input Articles]
-{json.dumps(batch, ensure_ascii=False, indent=2)}
+    print(f"  [Info] Processing {total_articles} articles in {len(batches)} token-budgeted batches (concurrent)...")
+    packer.report(packs, prefix="    ")
 
-[Output Format]
-반드시 아래 JSON 형식으로 응답하라. 중복 기사는 "is_duplicate": true로 표시하되 리스트에 포함시켜라.
+    # All batches go out concurrently under the client's adaptive rate limiter; responses come back in batch order
+    started = time.time()
+    fresh_results = []
+    responses = client.generate_many([build_batch_prompt(batch) for batch in batches],
+                                     system_instruction=BATCH_INSTRUCTIONS)
 
-{{
-  "results": [
-    {{
-      "id": 기사 ID,
-      "score": 1-10,
-      "is_duplicate": true/false,
-      "duplicate_of": 중복이면 원본 기사 ID (선택),
-      "strategic_insight": "BD 관점 인사이트",
-      "is_high_priority": true/false
-    }}
-  ]
-}}
-"""
-        # Call Gemini API
-        response_text = call_gemini_api(prompt)
-        
-        if response_text:
-             try:
-                # Extract JSON
-                json_text = response_text
-                if "```json" in response_text:
-                    json_text = response_text.split("```json")[1].split("```")[0].strip()
-                elif "```" in response_text:
-                    json_text = response_text.split("```")[1].split("```")[0].strip()
-                
-                batch_results = json.loads(json_text)
-                if 'results' in batch_results:
-                    all_gemini_results.extend(batch_results['results'])
-                    print(f"    -> Success: Received {len(batch_results['results'])} results.")
-                else:
-                    print(f"    -> Warning: Unexpected JSON structure.")
-             except Exception as e:
-                print(f"    -> Error parsing JSON: {e}")
-        else:
-             print(f"    -> Error: No response for this batch.")
-
-        # Sleep between batches if not the last one
-        if i + BATCH_SIZE < total_articles:
-            print("    -> Sleeping 10 seconds to respect rate limits...")
-            time.sleep(10)
+    retry = []
+    for b, (batch, response_text) in enumerate(zip(batches, responses)):
+        print(f"  [Batch {b + 1}] {len(batch)} articles:")
+        results, missing = parse_batch_response(response_text, batch)
+        fresh_results.extend(results)
+        retry.extend(split_missing(batch, missing, client.settings['missing_retry_batch_size']))
+
+    # Only the new articles missing from a response are sent again, in smaller sub-batches
+    for round_no in range(1, client.settings['missing_retry_rounds'] + 1):
+        if not retry:
+            break
+        print(f"  [Retry {round_no}] {sum(len(batch) for batch in retry)} missing articles "
+              f"in {len(retry)} sub-batches...")
+        responses = client.generate_many([build_batch_prompt(batch) for batch in retry],
+                                         system_instruction=BATCH_INSTRUCTIONS)
+        batches, retry = retry, []
+        for batch, response_text in zip(batches, responses):
+            results, missing = parse_batch_response(response_text, batch, prefix="    ")
+            fresh_results.extend(results)
+            retry.extend(split_missing(batch, missing, client.settings['missing_retry_batch_size']))
+    if retry:
+        print(f"  [WARNING] No Gemini result for {sum(len(batch) for batch in retry)} articles "
+              f"after {client.settings['missing_retry_rounds']} retry rounds (kept without a Gemini score)")
+
+    print(f"  [Gemini] {client.requests} requests in {time.time() - started:.1f}s "
+          f"({client.limiter.throttled} throttled, concurrency now {int(client.limiter.limit)})")
+
+    # Only the model's own per-article fields of new articles are cached
+    cache.put_many(model, prompt_key, {hashes[r['id']]: r for r in fresh_results
+                                       if r['id'] in hashes and r['id'] not in cached})
+    cache.evict()
+
+    # Cached articles: cached fields plus this run's dedup verdict (not a duplicate if they were not sent)
+    verdicts = {r['id']: r for r in fresh_results}
+    all_gemini_results = [r for r in fresh_results if r['id'] not in cached]
+    propagated = {member_id for member_ids in members.values() for member_id in member_ids}
+    for article_id, result in cached.items():
+        if article_id in propagated:
+            continue
+        verdict = verdicts.get(article_id, {})
+        all_gemini_results.append(dict(result, id=article_id,
+                                       is_duplicate=bool(verdict.get('is_duplicate', False)),
+                                       duplicate_of=verdict.get('duplicate_of')))
+
+    # Cluster members not sent inherit their representative's verdict
+    for result in list(all_gemini_results):
+        for member_id in members.get(result.get('id'), []):
+            all_gemini_results.append(propagate(result, member_id, result['id']))
 
     # Apply results to DataFrame
     print(f"  [Gemini] Aggregated results for {len(all_gemini_results)} articles.")
@@ -203,13 +314,19 @@ def gemini_batch_deduplicate_and_score(articles_df):
             articles_df.at[idx, 'strategic_insight'] = result.get('strategic_insight', '')
             articles_df.at[idx, 'is_high_priority'] = result.get('is_high_priority', False)
     
+    # Articles left without a result (unresolved after the retries) are kept, unscored - not duplicates
+    unscored = 0
+    if 'is_duplicate' in articles_df.columns:
+        unscored = int(articles_df['is_duplicate'].isna().sum())
+        articles_df['is_duplicate'] = articles_df['is_duplicate'].fillna(False).astype(bool)
+
     # Filter out duplicates
     deduplicated = articles_df[articles_df.get('is_duplicate', False) == False].copy()
     
     print(f"  [OK] Gemini filter complete:")
     print(f"       - Original: {len(articles_df)} articles")
     print(f"       - Removed: {len(articles_df) - len(deduplicated)} duplicates")
-    print(f"       - Final: {len(deduplicated)} articles")
+    print(f"       - Final: {len(deduplicated)} articles" + (f" ({unscored} without a Gemini score)" if unscored else ""))
     
     high_priority_count = len(deduplicated[deduplicated.get('is_high_priority', False) == True])
     print(f"       - High priority (8+ score): {high_priority_count} articles")
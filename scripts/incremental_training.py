@@ -0,0 +1,233 @@
+"""
+Warm-Start Incremental LightGBM Updates (train_lgbm_model.py --incremental / --benchmark)
+Updates the current bundle's booster in its existing feature space (same fused
+PCA + scaler projection) instead of refitting PCA, the scaler and 100 rounds:
+
+  continue  add a few boosting rounds with init_model (decayed learning rate)
+  refit     keep the tree structure, refit leaf values on the new labels
+
+Guard: if validation AUC drops more than AUC_TOLERANCE below the current booster,
+fall back to a full retrain. Both boosters are scored on rows the current booster
+never trained on: the held-out articles full training records in the manifest
+(validation_ids) plus a stratified 30% of the labels it has not seen at all.
+"""
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import lightgbm as lgb
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import roc_auc_score, accuracy_score
+
+from embedding_backend import get_embedding_backend
+from model_bundle import load_model, save_updated_bundle, update_manifest, BUNDLE_DIR
+from feature_store import FeatureStore
+from score_cache import article_keys
+from label_store import LabelStore, LABEL_DB, normalize_timestamp
+from train_lgbm_model import (load_data, extract_features, get_labels_and_weights, get_lgbm_params,
+                              train_model, RAW_DATA_DIR, MODEL_DIR, LOG_DIR)
+
+INCREMENTAL_ROUNDS = 30
+LEARNING_RATE_DECAY = 0.5   # continue mode: learning_rate * decay for the added rounds
+REFIT_DECAY_RATE = 0.9      # refit mode: new leaf = decay * old + (1 - decay) * refit
+AUC_TOLERANCE = 0.005
+TOP_K = 5
+
+
+def evaluate(booster, X, y):
+    pred = booster.predict(X)
+    return {
+        'auc': float(roc_auc_score(y, pred)),
+        'accuracy': float(accuracy_score(y, (pred >= 0.5).astype(int))),
+        f'reward_at_top{TOP_K}': float(np.mean(y[np.argsort(-pred)[:TOP_K]])),
+    }
+
+
+def prepare(store, bundle):
+    """Labeled data in the bundle's feature space + train/valid split + new-label mask"""
+    df = load_data(store)
+    if df is None or len(df) == 0:
+        return None
+
+    backend = get_embedding_backend()
+    embeddings = store.embeddings((df['title'] + " " + df['summary'].fillna('')).tolist(), backend)
+    df['score_ag'] = pd.to_numeric(df['score_ag'], errors='coerce').fillna(0)
+    X = bundle.transform(embeddings, bundle.meta_features(df))
+    y, weights = get_labels_and_weights(df)
+
+    # Labels written to the label store after the bundle's label snapshot (its creation time for
+    # older bundles); the store is committed to git, so this holds on fresh clones and in CI
+    labels_as_of = df.attrs.get('labels_as_of')
+    since = bundle.manifest.get('labels_as_of') or normalize_timestamp(bundle.manifest.get('created_at', '1970-01-01'))
+    article_ids, _ = article_keys(df)
+    if labels_as_of and os.path.exists(LABEL_DB):
+        labels = LabelStore(LABEL_DB)
+        is_new = np.isin(article_ids, list(labels.updated_between(since, labels_as_of)))
+        # Labelled at the bundle's snapshot: possibly in its training rows (relabelled ones included)
+        previous_ids, _ = article_keys(labels.snapshot(since))
+        labeled_before = np.isin(article_ids, previous_ids)
+    else:
+        print("[WARNING] No label store: every label counts as new")
+        is_new = np.ones(len(df), dtype=bool)
+        labeled_before = np.ones(len(df), dtype=bool)
+
+    # Validation: the bundle's held-out articles (absent for bundles from before they were recorded)
+    # plus a stratified 30% of the labels the current booster never saw; everything else trains
+    is_valid = np.isin(article_ids, bundle.manifest.get('validation_ids') or [])
+    unseen = np.flatnonzero(is_new & ~labeled_before & ~is_valid)
+    if len(unseen) >= 2:
+        _, counts = np.unique(y[unseen], return_counts=True)
+        stratify = y[unseen] if len(counts) > 1 and counts.min() >= 2 else None
+        _, unseen_valid = train_test_split(unseen, test_size=0.3, stratify=stratify, random_state=42)
+        is_valid[unseen_valid] = True
+    train_idx, valid_idx = np.flatnonzero(~is_valid), np.flatnonzero(is_valid)
+    return {'df': df, 'X': X, 'y': y, 'w': weights, 'is_new': is_new, 'labels_as_of': labels_as_of,
+            'train_idx': train_idx, 'valid_idx': valid_idx,
+            'validation_ids': sorted(set(article_ids[valid_idx]))}
+
+
+def can_validate(data):
+    """Both classes among the held-out rows (AUC is undefined otherwise)"""
+    return len(np.unique(data['y'][data['valid_idx']])) > 1
+
+
+def update_booster(bundle, data, params, mode='continue'):
+    """Warm-started booster (continue) or leaf-refit booster (refit) on the training split"""
+    X, y, w = data['X'], data['y'], data['w']
+    train_idx, valid_idx = data['train_idx'], data['valid_idx']
+
+    if mode == 'refit':
+        # Leaf values only, from the new labels (all training rows if none are new)
+        new_train = train_idx[data['is_new'][train_idx]]
+        idx = new_train if len(new_train) else train_idx
+        return bundle.booster.refit(X[idx], y[idx], decay_rate=REFIT_DECAY_RATE, weight=w[idx])
+
+    # Continue boosting: new labels plus the earlier training rows as replay
+    params = dict(params, learning_rate=params.get('learning_rate', 0.05) * LEARNING_RATE_DECAY)
+    train_data = lgb.Dataset(X[train_idx], label=y[train_idx], weight=w[train_idx])
+    valid_data = lgb.Dataset(X[valid_idx], label=y[valid_idx], weight=w[valid_idx], reference=train_data)
+    return lgb.train(
+        params, train_data,
+        num_boost_round=INCREMENTAL_ROUNDS,
+        init_model=bundle.booster,
+        valid_sets=[valid_data],
+        callbacks=[lgb.early_stopping(stopping_rounds=10, verbose=False)]
+    )
+
+
+def train_incremental(mode='continue'):
+    """Update the current bundle from new feedback; full retrain if there is no bundle or AUC regresses"""
+    print("="*70)
+    print(f">>> Incremental LightGBM Update ({mode})...")
+    print("="*70)
+
+    try:
+        bundle = load_model(MODEL_DIR)
+    except Exception as e:
+        print(f"[WARNING] No usable model bundle ({e}). Running full training instead.")
+        return train_model()
+
+    started = time.time()
+    store = FeatureStore(raw_data_dir=RAW_DATA_DIR)
+    data = prepare(store, bundle)
+    store.save()
+    if data is None:
+        print("No data available for training.")
+        return
+
+    n_new = int(data['is_new'].sum())
+    print(f"  - {n_new} labels newer than bundle {bundle.version}")
+    if n_new == 0:
+        print("[OK] Nothing new to learn - bundle unchanged")
+        return
+    if not can_validate(data):
+        print("[WARNING] Too few held-out labels the current booster never saw. Running full training instead.")
+        return train_model()
+
+    params, tuning = get_lgbm_params()
+    X_valid, y_valid = data['X'][data['valid_idx']], data['y'][data['valid_idx']]
+    before = evaluate(bundle.booster, X_valid, y_valid)
+    booster = update_booster(bundle, data, params, mode)
+    after = evaluate(booster, X_valid, y_valid)
+    elapsed = time.time() - started
+
+    print(f"  - Validation AUC: {before['auc']:.4f} -> {after['auc']:.4f} | "
+          f"Reward@{TOP_K}: {before[f'reward_at_top{TOP_K}']:.3f} -> {after[f'reward_at_top{TOP_K}']:.3f} "
+          f"({elapsed:.1f}s)")
+
+    if after['auc'] < before['auc'] - AUC_TOLERANCE:
+        print(f"[WARNING] Validation AUC regressed by more than {AUC_TOLERANCE}. Falling back to full retrain.")
+        return train_model()
+
+    save_updated_bundle(
+        booster, bundle,
+        bundle_dir=BUNDLE_DIR,
+        params=params,
+        tuning=tuning,
+        metrics={
+            'test_auc': after['auc'],
+            'test_accuracy': after['accuracy'],
+            f'test_reward_at_top{TOP_K}': after[f'reward_at_top{TOP_K}'],
+            'best_iteration': int(booster.best_iteration or booster.current_iteration()),
+            'n_train': int(len(data['train_idx'])),
+            'n_test': int(len(data['valid_idx'])),
+        },
+        training={'mode': mode, 'n_new_labels': n_new, 'previous_test_auc': before['auc'],
+                  'seconds': round(elapsed, 2)}
+    )
+    # The next incremental run validates on the same held-out articles and counts new labels from this snapshot
+    updates = {'validation_ids': data['validation_ids']}
+    if data['labels_as_of']:
+        updates['labels_as_of'] = data['labels_as_of']
+    update_manifest(updates, BUNDLE_DIR)
+
+
+def benchmark():
+    """Time and validation quality of continue / refit vs a full retrain on the same held-out rows (nothing is saved)"""
+    print("="*70)
+    print(">>> Benchmark: incremental update vs full retrain...")
+    print("="*70)
+
+    bundle = load_model(MODEL_DIR)
+    store = FeatureStore(raw_data_dir=RAW_DATA_DIR)
+    data = prepare(store, bundle)
+    store.save()
+    if data is None:
+        print("No data available.")
+        return
+    if not can_validate(data):
+        print("Too few held-out labels the current booster never saw.")
+        return
+    params, _ = get_lgbm_params()
+    X_valid, y_valid = data['X'][data['valid_idx']], data['y'][data['valid_idx']]
+    rows = [{'mode': 'current bundle', 'seconds': 0.0, **evaluate(bundle.booster, X_valid, y_valid)}]
+
+    for mode in ['continue', 'refit']:
+        started = time.time()
+        booster = update_booster(bundle, data, params, mode)
+        rows.append({'mode': mode, 'seconds': time.time() - started, **evaluate(booster, X_valid, y_valid)})
+
+    # Full retrain: PCA + scaler + 100 rounds (embeddings come from the cache, as in a weekly run)
+    from sklearn.preprocessing import StandardScaler
+    started = time.time()
+    X_full, y_full, w_full, _, _, _ = extract_features(load_data(store), store)
+    train_idx, valid_idx = data['train_idx'], data['valid_idx']
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(X_full[train_idx])
+    X_test = scaler.transform(X_full[valid_idx])
+    train_data = lgb.Dataset(X_train, label=y_full[train_idx], weight=w_full[train_idx])
+    test_data = lgb.Dataset(X_test, label=y_full[valid_idx], weight=w_full[valid_idx], reference=train_data)
+    full = lgb.train(params, train_data, num_boost_round=100, valid_sets=[test_data],
+                     callbacks=[lgb.early_stopping(stopping_rounds=10, verbose=False)])
+    rows.append({'mode': 'full retrain', 'seconds': time.time() - started, **evaluate(full, X_test, y_full[valid_idx])})
+
+    result = pd.DataFrame(rows)
+    result['seconds'] = result['seconds'].round(2)
+    print(f"\n  New labels since bundle {bundle.version}: {int(data['is_new'].sum())}")
+    print(result.to_string(index=False))
+
+    log_file = os.path.join(LOG_DIR, f"incremental_benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+    result.to_csv(log_file, index=False, encoding='utf-8-sig')
+    print(f"[OK] Benchmark saved to {log_file}")
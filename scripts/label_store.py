@@ -0,0 +1,343 @@
+"""
+Keyed Label Store (SQLite)
+Training labels keyed by article_id (sha1 of the url, as in score_cache), so the
+merge scripts upsert only the rows they bring instead of reading, de-duplicating
+and rewriting the whole labels_master.csv.
+
+    labels      current label per article_id: reward, updated_at, source + the log entry holding its row
+    label_log   append-only upsert log, full row as JSON per entry -> point-in-time snapshots
+    meta        compacted_before, imported_from, ...
+
+Last writer wins by updated_at (KST, 'YYYY-MM-DD HH:MM:SS'): an upsert older than
+the stored row is logged but does not change the current label.
+snapshot(as_of) rebuilds the labels as they were at any time after the compaction
+horizon, so a training run can be reproduced from the as-of time in its bundle manifest.
+Compaction drops log entries superseded before the horizon (retention_days) and runs
+in a background thread after a merge.
+
+data/labels/labels.db is the source of truth (committed by the weekly workflow);
+labels_master.csv is imported once when the store is created and can be exported again:
+
+    python scripts/label_store.py                          # summary
+    python scripts/label_store.py --export [--as-of "2026-03-01 00:00:00"]
+    python scripts/label_store.py --compact
+"""
+import io
+import os
+import json
+import sqlite3
+import argparse
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytz
+
+try:
+    from score_cache import article_keys
+    from data_io import read_table, detect_encoding, atomic_write_csv
+except ImportError:
+    from scripts.score_cache import article_keys
+    from scripts.data_io import read_table, detect_encoding, atomic_write_csv
+
+LABEL_DB = os.path.join("data", "labels", "labels.db")
+LABELS_CSV = os.path.join("data", "labels", "labels_master.csv")
+RETENTION_DAYS = 180   # snapshots are exact for as_of within this window
+COMPACT_RATIO = 2.0    # compact once the log holds this many entries per current label
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+KST = pytz.timezone('Asia/Seoul')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS labels (
+    article_id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    reward REAL,
+    updated_at TEXT NOT NULL,
+    source TEXT,
+    seq INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_labels_url ON labels(url);
+
+CREATE TABLE IF NOT EXISTS label_log (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    article_id TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    source TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_label_log_article ON label_log(article_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_label_log_time ON label_log(updated_at);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Latest log entry per article at or before :as_of, in first-labelled order
+SNAPSHOT_QUERY = """
+SELECT latest.data FROM (
+    SELECT article_id, data,
+           ROW_NUMBER() OVER (PARTITION BY article_id ORDER BY updated_at DESC, seq DESC) AS rn
+    FROM label_log WHERE updated_at <= :as_of
+) AS latest JOIN labels USING (article_id)
+WHERE rn = 1 ORDER BY labels.position
+"""
+
+COMPACT_QUERY = """
+DELETE FROM label_log WHERE updated_at < :horizon AND seq NOT IN (SELECT seq FROM labels) AND seq NOT IN (
+    SELECT seq FROM (
+        SELECT seq, ROW_NUMBER() OVER (PARTITION BY article_id ORDER BY updated_at DESC, seq DESC) AS rn
+        FROM label_log WHERE updated_at < :horizon
+    ) WHERE rn = 1
+)
+"""
+
+
+def now_timestamp():
+    return datetime.now(KST).strftime(TIMESTAMP_FORMAT)
+
+
+def normalize_timestamp(value):
+    """Any parseable date / datetime -> 'YYYY-MM-DD HH:MM:SS' (naive values are taken as KST)"""
+    return pd.Timestamp(value).strftime(TIMESTAMP_FORMAT)
+
+
+def _clean(value):
+    """JSON-safe cell value (NaN -> None, numpy scalars -> Python)"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _reward(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _frame(rows):
+    """Rows (dicts) -> DataFrame typed exactly as reading labels_master.csv would type it"""
+    if not rows:
+        return pd.DataFrame()
+    return pd.read_csv(io.StringIO(pd.DataFrame(rows).to_csv(index=False)))
+
+
+class LabelStore:
+    def __init__(self, path=LABEL_DB, import_csv=LABELS_CSV):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        is_new = not os.path.exists(path)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+        if is_new and import_csv and os.path.exists(import_csv):
+            self.import_csv(import_csv)
+
+    @contextmanager
+    def _connect(self):
+        """Connection committed on success, rolled back on error, always closed"""
+        # Default rollback journal (not WAL): the database file is committed to git as-is
+        conn = sqlite3.connect(self.path, timeout=60)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ---------------------------------------------------------------- writing
+    def upsert(self, df, source, updated_at=None, update_columns=None):
+        """
+        Upsert labelled rows keyed by url -> article_id.
+        updated_at: one timestamp or a per-row sequence (default: now).
+        update_columns: for articles already in the store, only overwrite these columns
+                        (e.g. ['reward'] for feedback); new articles are stored with the full row.
+        Returns (inserted, updated, stale) counts; stale rows are older than the stored label.
+        """
+        if df is None or df.empty or 'url' not in df.columns:
+            return 0, 0, 0
+        df = df[df['url'].notna()].reset_index(drop=True)
+        df['url'] = df['url'].astype(str)
+        article_ids, _ = article_keys(df[['url']])
+        if updated_at is None or isinstance(updated_at, str):
+            timestamps = [normalize_timestamp(updated_at) if updated_at else now_timestamp()] * len(df)
+        else:
+            timestamps = [normalize_timestamp(t) if _clean(t) is not None else now_timestamp() for t in updated_at]
+        records = [{k: _clean(v) for k, v in row.items()} for row in df.to_dict('records')]
+
+        inserted = updated = stale = 0
+        with self._connect() as conn:
+            current = {}
+            ids = list(dict.fromkeys(article_ids))
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                current.update((a, (t, json.loads(d))) for a, t, d in conn.execute(
+                    "SELECT labels.article_id, labels.updated_at, data FROM labels JOIN label_log USING (seq) "
+                    f"WHERE labels.article_id IN ({','.join('?' * len(chunk))})", chunk))
+            position = conn.execute("SELECT COALESCE(MAX(position), 0) FROM labels").fetchone()[0]
+
+            for article_id, timestamp, record in zip(article_ids, timestamps, records):
+                if article_id in current and update_columns is not None:
+                    row = dict(current[article_id][1])
+                    row.update({k: v for k, v in record.items() if k in update_columns})
+                else:
+                    row = record
+                seq = conn.execute("INSERT INTO label_log (article_id, updated_at, source, data) VALUES (?, ?, ?, ?)",
+                                   (article_id, timestamp, source, json.dumps(row, ensure_ascii=False))).lastrowid
+                if article_id in current and timestamp < current[article_id][0]:
+                    stale += 1
+                    continue
+                if article_id in current:
+                    conn.execute("UPDATE labels SET url = ?, reward = ?, updated_at = ?, source = ?, seq = ? "
+                                 "WHERE article_id = ?",
+                                 (row['url'], _reward(row.get('reward')), timestamp, source, seq, article_id))
+                    updated += 1
+                else:
+                    position += 1
+                    conn.execute("INSERT INTO labels VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                 (article_id, position, row['url'], _reward(row.get('reward')), timestamp, source, seq))
+                    inserted += 1
+                current[article_id] = (timestamp, row)
+        return inserted, updated, stale
+
+    def import_csv(self, path=LABELS_CSV):
+        """Load a labels_master.csv style file (one-time migration); returns rows imported"""
+        df, encoding = read_table(path), detect_encoding(path)
+        df = df.drop_duplicates(subset=['url'], keep='last').reset_index(drop=True)
+        # Rows date from their labelling week, so older feedback merged later still wins over them
+        modified = datetime.fromtimestamp(os.path.getmtime(path), KST).strftime(TIMESTAMP_FORMAT)
+        dates = pd.to_datetime(df['date'], errors='coerce') if 'date' in df.columns else pd.Series(pd.NaT, index=df.index)
+        updated_at = [modified if pd.isna(d) else d.strftime(TIMESTAMP_FORMAT) for d in dates]
+        inserted, updated, _ = self.upsert(df, source=os.path.basename(path), updated_at=updated_at)
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('imported_from', ?)",
+                         (f"{os.path.basename(path)} ({encoding}) at {now_timestamp()}",))
+        print(f"[OK] Imported {inserted + updated} labels from {path} into {self.path}")
+        return inserted + updated
+
+    # ---------------------------------------------------------------- reading
+    def snapshot(self, as_of=None):
+        """Labels as a labels_master.csv-shaped DataFrame: current, or as they were at `as_of`"""
+        with self._connect() as conn:
+            if as_of is None:
+                rows = conn.execute("SELECT data FROM labels JOIN label_log USING (seq) "
+                                    "ORDER BY position").fetchall()
+            else:
+                as_of = normalize_timestamp(as_of)
+                horizon = self.meta('compacted_before', conn)
+                if horizon and as_of < horizon:
+                    print(f"[WARNING] Label log was compacted before {horizon}; snapshot at {as_of} is approximate")
+                rows = conn.execute(SNAPSHOT_QUERY, {'as_of': as_of}).fetchall()
+        return _frame([json.loads(d) for (d,) in rows])
+
+    def updated_between(self, since, until=None):
+        """article_ids whose label was written after `since` (and at or before `until`, default now)"""
+        since = normalize_timestamp(since)
+        until = normalize_timestamp(until) if until else now_timestamp()
+        with self._connect() as conn:
+            rows = conn.execute("SELECT DISTINCT article_id FROM label_log WHERE updated_at > ? AND updated_at <= ?",
+                                (since, until)).fetchall()
+        return {article_id for (article_id,) in rows}
+
+    def existing(self, urls):
+        """Number of these urls already labelled"""
+        article_ids, _ = article_keys(pd.DataFrame({'url': list(urls)}).astype(str))
+        ids = list(dict.fromkeys(article_ids))
+        count = 0
+        with self._connect() as conn:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                count += conn.execute(f"SELECT COUNT(*) FROM labels WHERE article_id IN ({','.join('?' * len(chunk))})",
+                                      chunk).fetchone()[0]
+        return count
+
+    def distribution(self, column):
+        """{value: count} of one row column over the current labels"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT json_extract(data, ?) AS v, COUNT(*) FROM labels JOIN label_log USING (seq) "
+                                "GROUP BY v ORDER BY v",
+                                (f"$.{column}",)).fetchall()
+        return dict(rows)
+
+    def meta(self, key, conn=None):
+        if conn is None:
+            with self._connect() as conn:
+                return self.meta(key, conn)
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def summary(self):
+        with self._connect() as conn:
+            labels, latest = conn.execute("SELECT COUNT(*), MAX(updated_at) FROM labels").fetchone()
+            log = conn.execute("SELECT COUNT(*) FROM label_log").fetchone()[0]
+        return {'labels': labels, 'log_entries': log, 'updated_at': latest,
+                'compacted_before': self.meta('compacted_before')}
+
+    # ------------------------------------------------------------- compaction
+    def compact(self, retention_days=RETENTION_DAYS, force=False):
+        """Drop log entries superseded before now - retention_days. Returns entries removed."""
+        with self._connect() as conn:
+            labels = conn.execute("SELECT COUNT(*) FROM labels").fetchone()[0]
+            log = conn.execute("SELECT COUNT(*) FROM label_log").fetchone()[0]
+            if not force and log <= max(labels, 1) * COMPACT_RATIO:
+                return 0
+            horizon = (datetime.now(KST) - timedelta(days=retention_days)).strftime(TIMESTAMP_FORMAT)
+            removed = conn.execute(COMPACT_QUERY, {'horizon': horizon}).rowcount
+            previous = self.meta('compacted_before', conn)
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('compacted_before', ?)", (max(horizon, previous or ''),))
+        if removed:
+            conn = sqlite3.connect(self.path, timeout=60)
+            try:
+                conn.execute("VACUUM")
+            finally:
+                conn.close()
+            print(f"[OK] Compacted label log: {removed} superseded entries before {horizon} removed")
+        return removed
+
+    def compact_in_background(self, retention_days=RETENTION_DAYS):
+        """Start compaction in a (non-daemon) thread; the process waits for it before exiting"""
+        def run():
+            try:
+                self.compact(retention_days)
+            except Exception as e:
+                print(f"[WARNING] Label log compaction failed: {e}")
+        thread = threading.Thread(target=run, name="label-compaction")
+        thread.start()
+        return thread
+
+    def export_csv(self, path=LABELS_CSV, as_of=None):
+        return atomic_write_csv(self.snapshot(as_of), path)
+
+
+def load_labels_frame(as_of=None, path=LABEL_DB, csv_path=LABELS_CSV):
+    """
+    (labels DataFrame, as_of timestamp) for training / ranking: a store snapshot,
+    or labels_master.csv (as_of None) when the store has not been created yet.
+    """
+    if os.path.exists(path):
+        as_of = normalize_timestamp(as_of) if as_of else now_timestamp()
+        return LabelStore(path).snapshot(as_of), as_of
+    if not os.path.exists(csv_path):
+        return None, None
+    return read_table(csv_path), None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keyed label store")
+    parser.add_argument('--export', nargs='?', const=LABELS_CSV, help="Write a labels_master.csv snapshot")
+    parser.add_argument('--as-of', help="Snapshot time for --export ('YYYY-MM-DD HH:MM:SS', KST)")
+    parser.add_argument('--compact', action='store_true', help="Compact the upsert log now")
+    args = parser.parse_args()
+
+    store = LabelStore()
+    if args.export:
+        print(f"[OK] Exported {store.export_csv(args.export, args.as_of)}")
+    elif args.compact:
+        print(f"[OK] {store.compact(force=True)} log entries removed")
+    else:
+        for key, value in store.summary().items():
+            print(f"  {key:<17} {value}")
@@ -0,0 +1,95 @@
+"""
+Cached LightGBM Binary Datasets
+Feature binning (lgb.Dataset construction) is done once per distinct
+(feature matrix, labels, weights, binning params) and saved with save_binary;
+later training runs and tuning trials on the same data load the binary file.
+
+Layout under data/cache/lgb_datasets/:
+    <key>.bin    key = sha256 of X / y / weights / binning params / reference dataset key
+A validation set is keyed by its training set too, since it reuses that set's bin mappers.
+"""
+import os
+import glob
+import json
+import time
+import hashlib
+
+import numpy as np
+import lightgbm as lgb
+
+DATASET_CACHE_DIR = os.path.join("data", "cache", "lgb_datasets")
+MAX_CACHED_DATASETS = 200  # least recently used files beyond this are removed
+
+# Params that change how a Dataset is binned (everything else only affects training)
+BINNING_PARAMS = ['max_bin', 'max_bin_by_feature', 'min_data_in_bin', 'bin_construct_sample_cnt',
+                  'data_random_seed', 'min_data_in_leaf', 'feature_pre_filter', 'use_missing',
+                  'zero_as_missing', 'categorical_feature', 'linear_tree']
+
+
+def dataset_key(X, y, weight, params, reference_key=None):
+    h = hashlib.sha256()
+    for array in (X, y, weight):
+        if array is None:
+            h.update(b'none')
+            continue
+        array = np.ascontiguousarray(array)
+        h.update(f"{array.dtype}{array.shape}".encode())
+        h.update(array.tobytes())
+    binning = {k: params[k] for k in BINNING_PARAMS if k in params}
+    h.update(json.dumps(binning, sort_keys=True, default=str).encode())
+    h.update(f"{reference_key}|{lgb.__version__}".encode())
+    return h.hexdigest()
+
+
+class DatasetCache:
+    """Builds or loads constructed lgb.Datasets; tracks construction time for the training summary"""
+
+    def __init__(self, cache_dir=DATASET_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.built = 0
+        self.loaded = 0
+        self.seconds = 0.0
+
+    def dataset(self, X, y, weight=None, params=None, reference=None):
+        """Constructed lgb.Dataset for (X, y, weight); `reference` is the training set for a validation set"""
+        params = params or {}
+        dataset_params = {k: params[k] for k in BINNING_PARAMS + ['verbose'] if k in params}
+        key = dataset_key(X, y, weight, params, getattr(reference, 'cache_key', None))
+        path = os.path.join(self.cache_dir, f"{key}.bin")
+
+        started = time.time()
+        dataset = None
+        if os.path.exists(path):
+            try:
+                dataset = lgb.Dataset(path, reference=reference, params=dataset_params).construct()
+                os.utime(path)
+                self.loaded += 1
+            except Exception as e:
+                print(f"[WARNING] Could not load cached dataset {path} ({e}), rebuilding")
+                dataset = None
+        if dataset is None:
+            dataset = lgb.Dataset(X, label=y, weight=weight, reference=reference, params=dataset_params).construct()
+            self.built += 1
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                dataset.save_binary(tmp_path)
+                os.replace(tmp_path, path)
+                self._prune()
+            except Exception as e:
+                print(f"[WARNING] Could not cache dataset ({e})")
+        self.seconds += time.time() - started
+
+        dataset.cache_key = key
+        return dataset
+
+    def _prune(self):
+        files = sorted(glob.glob(os.path.join(self.cache_dir, "*.bin")), key=os.path.getmtime, reverse=True)
+        for old in files[MAX_CACHED_DATASETS:]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def summary(self):
+        return f"{self.seconds:.2f}s ({self.built} built, {self.loaded} loaded from cache)"
@@ -0,0 +1,174 @@
+"""
+LightGBM Hyperparameter Search (used by train_lgbm_model.py --tune)
+Features are extracted once (feature store + embedding cache); each configuration
+is scored by stratified k-fold cross-validation in a process pool, under a
+wall-clock budget. Reports mean AUC and top-K reward per configuration.
+"""
+import os
+import time
+import random
+import itertools
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import pandas as pd
+import lightgbm as lgb
+from sklearn.preprocessing import StandardScaler
+from sklearn.model_selection import StratifiedKFold
+from sklearn.metrics import roc_auc_score
+
+try:
+    from lgb_dataset_cache import DatasetCache
+except ImportError:
+    from scripts.lgb_dataset_cache import DatasetCache
+
+# Values tried for each parameter (grid = full product, random = sampled configs)
+SEARCH_SPACE = {
+    'num_leaves': [7, 15, 31, 63],
+    'max_depth': [3, 5, 7, -1],
+    'learning_rate': [0.02, 0.05, 0.1],
+    'min_data_in_leaf': [3, 5, 10, 20],
+    'feature_fraction': [0.5, 0.7, 0.8, 1.0],
+    'bagging_fraction': [0.7, 0.8, 1.0],
+    'lambda_l2': [0.0, 1.0, 5.0],
+}
+DEFAULT_FOLDS = 5
+DEFAULT_TRIALS = 30
+DEFAULT_BUDGET = 600  # seconds
+NUM_BOOST_ROUND = 100
+EARLY_STOPPING_ROUNDS = 10
+TOP_K = 5
+
+# Per-process copy of the feature matrix (set once by the pool initializer)
+_data = {}
+
+
+def _init_worker(X, y, weights, folds):
+    _data['X'], _data['y'], _data['w'] = X, y, weights
+    _data['splits'] = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=42).split(X, y))
+    # Folds are scaled once; binned fold datasets are shared by every trial with the same binning params
+    _data['scaled'] = []
+    for train_idx, valid_idx in _data['splits']:
+        scaler = StandardScaler()
+        _data['scaled'].append((scaler.fit_transform(X[train_idx]), scaler.transform(X[valid_idx])))
+    _data['datasets'] = DatasetCache()
+
+
+def evaluate_params(params):
+    """Cross-validate one configuration. Returns a metrics dict (runs inside a worker process)."""
+    y, w, datasets = _data['y'], _data['w'], _data['datasets']
+    params = dict(params, num_threads=1, verbose=-1)
+    started = time.time()
+    dataset_seconds = datasets.seconds
+    aucs, rewards, iterations = [], [], []
+    for (train_idx, valid_idx), (X_train, X_valid) in zip(_data['splits'], _data['scaled']):
+        train_data = datasets.dataset(X_train, y[train_idx], w[train_idx], params)
+        valid_data = datasets.dataset(X_valid, y[valid_idx], w[valid_idx], params, reference=train_data)
+        booster = lgb.train(
+            params, train_data,
+            num_boost_round=NUM_BOOST_ROUND,
+            valid_sets=[valid_data],
+            callbacks=[lgb.early_stopping(stopping_rounds=EARLY_STOPPING_ROUNDS, verbose=False)]
+        )
+        pred = booster.predict(X_valid, num_iteration=booster.best_iteration)
+        aucs.append(roc_auc_score(y[valid_idx], pred))
+        rewards.append(float(np.mean(y[valid_idx][np.argsort(-pred)[:TOP_K]])))
+        iterations.append(booster.best_iteration)
+    return {
+        'cv_auc': float(np.mean(aucs)),
+        'cv_auc_std': float(np.std(aucs)),
+        f'cv_reward_at_top{TOP_K}': float(np.mean(rewards)),
+        'best_iteration': int(np.median(iterations)),
+        'dataset_seconds': round(datasets.seconds - dataset_seconds, 3),
+        'seconds': round(time.time() - started, 2),
+    }
+
+
+def candidate_params(base_params, trials=DEFAULT_TRIALS, grid=False, seed=42):
+    """Baseline first, then the grid (in order) or `trials` distinct random configurations"""
+    keys = list(SEARCH_SPACE)
+    if grid:
+        combos = itertools.product(*(SEARCH_SPACE[k] for k in keys))
+    else:
+        rng = random.Random(seed)
+        total = int(np.prod([len(v) for v in SEARCH_SPACE.values()]))
+        seen = set()
+        combos = []
+        while len(combos) < min(trials, total):
+            combo = tuple(rng.choice(SEARCH_SPACE[k]) for k in keys)
+            if combo not in seen:
+                seen.add(combo)
+                combos.append(combo)
+
+    yield dict(base_params)
+    for combo in combos:
+        params = dict(base_params, **dict(zip(keys, combo)))
+        if params != base_params:
+            yield params
+
+
+def run_search(X, y, weights, base_params, trials=DEFAULT_TRIALS, grid=False, folds=DEFAULT_FOLDS,
+               budget=DEFAULT_BUDGET, workers=None):
+    """
+    Evaluate candidates in a process pool until done or the wall-clock budget is spent.
+    The budget is a soft limit: it is checked as configurations complete, and the ones still
+    running at the deadline are terminated (their results are lost), plus pool start-up time.
+    Returns (results DataFrame sorted best-first, best params dict or None).
+    """
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    deadline = time.time() + budget
+    candidates = candidate_params(base_params, trials=trials, grid=grid)
+    results, evaluated = [], []
+
+    print(f"\n>>> Tuning: {folds}-fold CV, {workers} workers, budget {budget}s...")
+    # No `with` block: its exit waits for running configurations, which would overrun the budget
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(X, y, weights, folds))
+    pending = {}
+    budget_reached = False
+    try:
+        def submit_next():
+            params = next(candidates, None)
+            if params is not None:
+                pending[executor.submit(evaluate_params, params)] = params
+            return params is not None
+
+        for _ in range(workers * 2):
+            if not submit_next():
+                break
+
+        while pending:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                print(f"[INFO] Budget reached, stopping {len(pending)} running/pending configurations")
+                budget_reached = True
+                break
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                params = pending.pop(future)
+                try:
+                    metrics = future.result()
+                except Exception as e:
+                    print(f"  [ERROR] {params}: {e}")
+                    continue
+                evaluated.append(params)
+                results.append({'trial': len(results), **{k: params.get(k) for k in SEARCH_SPACE}, **metrics})
+                print(f"  [{len(results)}] AUC {metrics['cv_auc']:.4f} ± {metrics['cv_auc_std']:.4f} | "
+                      f"Reward@{TOP_K} {metrics[f'cv_reward_at_top{TOP_K}']:.3f} | "
+                      + ", ".join(f"{k}={params.get(k)}" for k in SEARCH_SPACE))
+                if time.time() < deadline:
+                    submit_next()
+    finally:
+        # Workers still busy at the deadline (or on an error) are terminated rather than awaited
+        processes = list((executor._processes or {}).values()) if budget_reached or pending else []
+        executor.shutdown(wait=not processes, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+
+    if not results:
+        return pd.DataFrame(), None
+
+    results_df = pd.DataFrame(results).sort_values(
+        ['cv_auc', f'cv_reward_at_top{TOP_K}'], ascending=False, kind='mergesort'
+    ).reset_index(drop=True)
+    best_params = evaluated[int(results_df.loc[0, 'trial'])]
+    return results_df, best_params
@@ -0,0 +1,170 @@
+"""
+Persistent LLM Result Cache (SQLite)
+Gemini dedup/scoring verdicts per article, so re-running the filter for the same
+articles (after a crash, or re-ranking the same week) only sends the ones not seen yet.
+
+Key:  (model, prompt_hash, content_hash)
+    prompt_hash   = sha1 of the prompt template (persona + instructions), so editing the
+                    prompt invalidates every verdict made with the old one
+    content_hash  = sha1 of the article fields sent to the model (title | summary | category)
+Value: score, strategic_insight, is_high_priority
+    is_duplicate is not cached: it depends on the other articles of the batch, so cached
+    articles are still sent (title only) for dedup alongside new ones
+
+Entries expire after ttl_days; beyond max_entries the least recently used are evicted.
+The database is a cache (data/cache/llm_cache.db) and can be deleted at any time.
+
+    python scripts/llm_cache.py             # summary
+    python scripts/llm_cache.py --evict     # drop expired / over-size entries now
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import argparse
+from contextlib import contextmanager
+
+try:
+    from config import load_pipeline_config
+except ImportError:
+    from scripts.config import load_pipeline_config
+
+LLM_CACHE_PATH = os.path.join("data", "cache", "llm_cache.db")
+CONTENT_FIELDS = ['title', 'summary', 'category']
+RESULT_FIELDS = ['score', 'strategic_insight', 'is_high_priority']
+
+DEFAULT_SETTINGS = {
+    'ttl_days': 30,
+    'max_entries': 50000,
+}
+
+SCHEMA = """
+-- Earlier caches also stored is_duplicate, which is only valid for the batch it came from
+DROP TABLE IF EXISTS results;
+CREATE TABLE IF NOT EXISTS verdicts (
+    model TEXT NOT NULL,
+    prompt_hash TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    score REAL,
+    strategic_insight TEXT,
+    is_high_priority INTEGER,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (model, prompt_hash, content_hash)
+);
+CREATE INDEX IF NOT EXISTS idx_verdicts_last_used ON verdicts(last_used);
+CREATE INDEX IF NOT EXISTS idx_verdicts_created_at ON verdicts(created_at);
+"""
+
+
+def load_settings():
+    """LLM cache settings from config/pipeline.yaml (defaults if absent)"""
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        settings.update(load_pipeline_config().get('llm_cache', {}) or {})
+    except Exception as e:
+        print(f"[WARNING] Could not read pipeline config: {e}")
+    return settings
+
+
+def _sha1(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def prompt_hash(template):
+    return _sha1(template)
+
+
+def content_hash(article):
+    """Hash of the fields of an article dict that go into the prompt"""
+    return _sha1("\x1f".join(str(article.get(f, '') or '') for f in CONTENT_FIELDS))
+
+
+class LLMCache:
+    def __init__(self, path=LLM_CACHE_PATH, settings=None):
+        self.path = path
+        self.settings = settings or load_settings()
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Connection committed on success, rolled back on error, always closed"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_many(self, model, prompt_key, content_hashes):
+        """{content_hash: result dict} for unexpired entries; hits are marked as used"""
+        now = time.time()
+        oldest = now - self.settings['ttl_days'] * 86400
+        wanted = list(dict.fromkeys(content_hashes))
+        found = {}
+        with self._connect() as conn:
+            for i in range(0, len(wanted), 500):  # stay under SQLite's bound-parameter limit
+                chunk = wanted[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT content_hash, {', '.join(RESULT_FIELDS)} FROM verdicts "
+                    f"WHERE model = ? AND prompt_hash = ? AND created_at >= ? "
+                    f"AND content_hash IN ({','.join('?' * len(chunk))})",
+                    [model, prompt_key, oldest] + chunk).fetchall()
+                for key, score, insight, high in rows:
+                    found[key] = {'score': score, 'strategic_insight': insight or '', 'is_high_priority': bool(high)}
+            conn.executemany("UPDATE verdicts SET last_used = ? WHERE model = ? AND prompt_hash = ? AND content_hash = ?",
+                             [(now, model, prompt_key, key) for key in found])
+        self.hits += len(found)
+        self.misses += len(wanted) - len(found)
+        return found
+
+    def put_many(self, model, prompt_key, results):
+        """Store {content_hash: result dict} (model output fields as in RESULT_FIELDS)"""
+        if not results:
+            return 0
+        now = time.time()
+        rows = [(model, prompt_key, key, result.get('score'),
+                 result.get('strategic_insight', ''), int(bool(result.get('is_high_priority', False))), now, now)
+                for key, result in results.items()]
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def evict(self):
+        """Drop expired entries, then the least recently used beyond max_entries. Returns entries removed."""
+        oldest = time.time() - self.settings['ttl_days'] * 86400
+        with self._connect() as conn:
+            removed = conn.execute("DELETE FROM verdicts WHERE created_at < ?", (oldest,)).rowcount
+            excess = conn.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0] - self.settings['max_entries']
+            if excess > 0:
+                removed += conn.execute(
+                    "DELETE FROM verdicts WHERE rowid IN (SELECT rowid FROM verdicts ORDER BY last_used LIMIT ?)",
+                    (excess,)).rowcount
+        return removed
+
+    def summary(self):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT model, prompt_hash, COUNT(*), MIN(created_at), MAX(last_used) "
+                                "FROM verdicts GROUP BY model, prompt_hash ORDER BY MAX(last_used) DESC").fetchall()
+        return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Persistent LLM result cache")
+    parser.add_argument('--evict', action='store_true', help="Drop expired / over-size entries")
+    args = parser.parse_args()
+
+    cache = LLMCache()
+    if args.evict:
+        print(f"[OK] Evicted {cache.evict()} entries")
+    for model, key, count, created, used in cache.summary():
+        print(f"  {model:<24} prompt {key}  {count:>6} entries  "
+              f"(oldest {time.strftime('%Y-%m-%d', time.localtime(created))}, "
+              f"last used {time.strftime('%Y-%m-%d', time.localtime(used))})")
@@ -0,0 +1,73 @@
+"""
+Tolerant JSON Extraction for LLM Batch Responses
+A batch response is expected to look like {"results": [{...}, {...}, ...]}, possibly
+inside a ```json fence. When the whole text does not parse (output cut off at
+maxOutputTokens, a stray character after the last object, prose around the fence),
+every complete object of the list is still recovered:
+
+    1. strip the fence (a missing closing fence is fine)
+    2. json.loads the whole text; done if it parses
+    3. otherwise decode the list incrementally, object by object, from the "results" key
+       (or the first '['), stopping at the first object that does not decode
+
+    results, complete = salvage_objects(text, 'results', required='id')
+
+The caller re-requests whatever is missing (gemini_filter.py: only the missing IDs).
+"""
+import re
+import json
+
+FENCE_RE = re.compile(r"```(?:json|JSON)?\s*\n?(.*?)(?:```|$)", re.DOTALL)
+_decoder = json.JSONDecoder()
+
+
+def strip_fence(text):
+    """Contents of the first ``` fence (closed or not), else the text itself"""
+    text = (text or '').strip()
+    match = FENCE_RE.search(text)
+    return match.group(1).strip() if match else text
+
+
+def _list_start(text, key):
+    """Index just after the '[' opening the list under `key` (or the first list), or None"""
+    match = re.search(r'"%s"\s*:\s*\[' % re.escape(key), text) if key else None
+    if match:
+        return match.end()
+    position = text.find('[')
+    return position + 1 if position >= 0 else None
+
+
+def _decode_objects(text, position):
+    """Complete objects of a list from `position` on; stops at the end of the list or the first broken object"""
+    objects = []
+    while position < len(text):
+        while position < len(text) and text[position] in ' \t\r\n,':
+            position += 1
+        if position >= len(text) or text[position] != '{':
+            break
+        try:
+            obj, position = _decoder.raw_decode(text, position)
+        except ValueError:
+            break
+        objects.append(obj)
+    return objects
+
+
+def salvage_objects(text, key='results', required=None):
+    """
+    (objects, complete): the dicts listed under `key`, and whether the text parsed as a whole.
+    required: only keep objects that have this field (e.g. 'id').
+    """
+    body = strip_fence(text)
+    complete = True
+    try:
+        parsed = json.loads(body)
+        objects = parsed.get(key, []) if isinstance(parsed, dict) else parsed
+        if not isinstance(objects, list):
+            objects = []
+    except ValueError:
+        complete = False
+        start = _list_start(body, key)
+        objects = _decode_objects(body, start) if start is not None else []
+    objects = [o for o in objects if isinstance(o, dict) and (required is None or required in o)]
+    return objects, complete
@@ -1,32 +1,65 @@
 """
-Merge user feedback from feedback_log.csv into labels_master.csv
+Merge user feedback into the label store (data/labels/labels.db, see label_store.py)
+Sources: data/labels/feedback_events/*.json (one file per event, committed by the
+dashboard's feedback sink) and the legacy / local data/labels/feedback_log.csv.
 Run by GitHub Actions weekly pipeline before model training.
 """
 import os
+import glob
+import json
 import pandas as pd
 
+try:
+    from label_store import LabelStore, LABEL_DB
+    from data_io import read_table
+except ImportError:
+    from scripts.label_store import LabelStore, LABEL_DB
+    from scripts.data_io import read_table
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 FEEDBACK_FILE = os.path.join(BASE_DIR, "data", "labels", "feedback_log.csv")
-LABELS_FILE = os.path.join(BASE_DIR, "data", "labels", "labels_master.csv")
+EVENTS_DIR = os.path.join(BASE_DIR, "data", "labels", "feedback_events")
+LABELS_FILE = os.path.join(BASE_DIR, "data", "labels", "labels_master.csv")  # imported once into the store
+LABEL_STORE = os.path.join(BASE_DIR, LABEL_DB)
+
+
+def load_feedback_events():
+    """(DataFrame of feedback event files, their paths)"""
+    paths = sorted(glob.glob(os.path.join(EVENTS_DIR, "*.json")))
+    events = []
+    for path in paths:
+        try:
+            with open(path, encoding="utf-8") as f:
+                events.append(json.load(f))
+        except Exception as e:
+            print(f"[WARNING] Skipping unreadable feedback event {os.path.basename(path)}: {e}")
+    return pd.DataFrame(events), paths
 
 
 def merge_feedback():
-    """Merge feedback_log.csv into labels_master.csv using URL as key."""
+    """Upsert feedback events and feedback_log.csv into the label store using URL as key."""
     print("=" * 60)
     print(">>> Merging User Feedback into Training Labels...")
     print("=" * 60)
 
-    # Check if feedback file exists
-    if not os.path.exists(FEEDBACK_FILE):
-        print("[SKIP] No feedback_log.csv found. Nothing to merge.")
-        return
-
     # Load feedback
-    try:
-        feedback_df = pd.read_csv(FEEDBACK_FILE, encoding="utf-8")
-    except Exception as e:
-        print(f"[ERROR] Failed to read feedback_log.csv: {e}")
+    frames = []
+    events_df, event_paths = load_feedback_events()
+    if not events_df.empty:
+        print(f"[OK] Loaded {len(events_df)} feedback event files")
+        frames.append(events_df)
+    if os.path.exists(FEEDBACK_FILE):
+        try:
+            frames.append(read_table(FEEDBACK_FILE, schema="feedback", memo=False))
+        except Exception as e:
+            print(f"[ERROR] Failed to read feedback_log.csv: {e}")
+            return
+
+    if not frames:
+        print("[SKIP] No feedback events or feedback_log.csv found. Nothing to merge.")
         return
+    feedback_df = pd.concat(frames, ignore_index=True)
+    archive_df = feedback_df.drop(columns=["event_id", "event_time"], errors="ignore")
 
     if feedback_df.empty or "url" not in feedback_df.columns:
         print("[SKIP] Feedback file is empty or missing 'url' column.")
@@ -40,68 +73,56 @@ def merge_feedback():
     print(f"[OK] {len(feedback_df)} unique URLs after dedup")
 
     # Load existing labels
-    if not os.path.exists(LABELS_FILE):
-        print("[WARN] labels_master.csv not found. Creating from feedback only.")
+    if not os.path.exists(LABEL_STORE) and not os.path.exists(LABELS_FILE):
+        print("[WARN] No label store or labels_master.csv found. Creating from feedback only.")
         # Can't create full labels without raw article data — just log
         print("[INFO] Feedback will be available for next training cycle when raw data exists.")
         return
 
-    try:
-        labels_df = pd.read_csv(LABELS_FILE, encoding="utf-8")
-    except UnicodeDecodeError:
-        labels_df = pd.read_csv(LABELS_FILE, encoding="cp949")
-
-    labels_df["url"] = labels_df["url"].astype(str)
+    store = LabelStore(LABEL_STORE, import_csv=LABELS_FILE)
     feedback_df["url"] = feedback_df["url"].astype(str)
-
-    original_count = len(labels_df)
-
-    # Update existing rows: overwrite reward for matching URLs
-    matched = labels_df["url"].isin(feedback_df["url"])
-    matched_count = matched.sum()
-
-    if matched_count > 0:
-        feedback_map = feedback_df.set_index("url")["reward"].to_dict()
-        labels_df.loc[matched, "reward"] = labels_df.loc[matched, "url"].map(feedback_map)
-        print(f"[OK] Updated reward for {matched_count} existing articles")
-
-    # Add new URLs not in labels_master (these need raw article data to be useful)
-    new_urls = feedback_df[~feedback_df["url"].isin(labels_df["url"])]
-    if len(new_urls) > 0:
-        # Create minimal rows for new feedback entries
-        new_rows = []
-        for _, fb in new_urls.iterrows():
-            new_rows.append({
-                "date": fb.get("feedback_date", "")[:10] if pd.notna(fb.get("feedback_date")) else "",
-                "category": fb.get("category", ""),
-                "published_date": "",
-                "site_name": "Naver News",
-                "url": fb["url"],
-                "title": fb.get("title", ""),
-                "summary": "",
-                "region": "local",
-                "score_ag": fb.get("score_ag", 5),
-                "keywords": fb.get("keywords", ""),
-                "reward": fb["reward"],
-                "rl_score": "",
-            })
-        new_df = pd.DataFrame(new_rows)
-        labels_df = pd.concat([labels_df, new_df], ignore_index=True)
-        print(f"[OK] Added {len(new_rows)} new feedback entries")
-
-    # Save updated labels
-    labels_df.to_csv(LABELS_FILE, index=False, encoding="utf-8")
-    print(f"[OK] labels_master.csv: {original_count} → {len(labels_df)} rows")
-
-    # Archive processed feedback (rename with timestamp)
+    original_count = store.summary()["labels"]
+
+    # Minimal rows for URLs not labelled yet (these need raw article data to be useful);
+    # for labelled URLs only the reward is overwritten
+    new_rows = []
+    for _, fb in feedback_df.iterrows():
+        new_rows.append({
+            "date": fb.get("feedback_date", "")[:10] if pd.notna(fb.get("feedback_date")) else "",
+            "category": fb.get("category", ""),
+            "published_date": "",
+            "site_name": "Naver News",
+            "url": fb["url"],
+            "title": fb.get("title", ""),
+            "summary": "",
+            "region": "local",
+            "score_ag": fb.get("score_ag", 5),
+            "keywords": fb.get("keywords", ""),
+            "reward": fb["reward"],
+            "rl_score": "",
+        })
+    inserted, updated, stale = store.upsert(pd.DataFrame(new_rows), source="feedback",
+                                            updated_at=feedback_df["feedback_date"].tolist(),
+                                            update_columns=["reward"])
+    print(f"[OK] Updated reward for {updated} existing articles")
+    print(f"[OK] Added {inserted} new feedback entries")
+    if stale:
+        print(f"[INFO] {stale} feedback entries older than the stored label (kept in the label log only)")
+    print(f"[OK] Label store: {original_count} → {original_count + inserted} labels")
+    compaction = store.compact_in_background()
+
+    # Archive processed feedback (one CSV with timestamp), then remove the merged sources
     from datetime import datetime
     timestamp = datetime.now().strftime("%Y%m%d_%H%M")
     archive_dir = os.path.join(BASE_DIR, "data", "labels", "feedback_archive")
     os.makedirs(archive_dir, exist_ok=True)
     archive_path = os.path.join(archive_dir, f"feedback_{timestamp}.csv")
-    os.rename(FEEDBACK_FILE, archive_path)
+    archive_df.to_csv(archive_path, index=False, encoding="utf-8")
+    for path in event_paths + ([FEEDBACK_FILE] if os.path.exists(FEEDBACK_FILE) else []):
+        os.remove(path)
     print(f"[OK] Archived processed feedback to {archive_path}")
 
+    compaction.join()
     print("=" * 60)
     print(">>> Feedback Merge Complete!")
     print("=" * 60)
@@ -0,0 +1,316 @@
+"""
+Versioned Model Bundle
+One directory holding the LightGBM booster, the fused PCA+StandardScaler
+projection (memory-mapped .npy weights), the feature schema and a checksum.
+The unfused PCA (projection_components/mean.npy, see projection.py) is kept
+next to it so the next training run can reuse the same projection.
+
+Rank-time feature extraction becomes a single GEMM:
+    X[:, :T] = E @ W + b          (PCA 768 -> 128 folded with the scaler's text slice)
+    X[:, T:] = (M - mean) / scale (scaler's metadata slice)
+"""
+import os
+import sys
+import json
+import shutil
+import hashlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+MODEL_DIR = "model"
+BUNDLE_DIR = os.path.join(MODEL_DIR, "bundle")
+BUNDLE_FORMAT = 1
+
+MANIFEST_FILE = "manifest.json"
+BOOSTER_FILE = "lgbm_model.txt"
+WEIGHT_FILES = {
+    'projection_weight': "projection_weight.npy",
+    'projection_bias': "projection_bias.npy",
+    'meta_mean': "meta_mean.npy",
+    'meta_scale': "meta_scale.npy",
+}
+# Optional (not needed at rank time; absent from older bundles)
+PROJECTION_FILES = {
+    'projection_components': "projection_components.npy",
+    'projection_mean': "projection_mean.npy",
+}
+
+# Fallback when no category schema was saved with a legacy model
+KNOWN_CATEGORY_COLS = ['cat_BD', 'cat_Client', 'cat_Distribution', 'cat_Product Approval', 'cat_Reimbursement',
+                       'cat_Supply Issues', 'cat_Therapeutic Areas', 'cat_Zuellig']
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def fuse_projection(pca, scaler, n_text):
+    """
+    Fold PCA and the text slice of the StandardScaler into one affine map.
+    Returns (W, b, meta_mean, meta_scale) with W: (embedding_dim, n_text).
+    """
+    components = np.asarray(pca.components_, dtype=np.float64)
+    if getattr(pca, 'whiten', False):
+        components = components / np.sqrt(pca.explained_variance_)[:, None]
+
+    mean_t = scaler.mean_[:n_text]
+    scale_t = scaler.scale_[:n_text]
+
+    W = components.T / scale_t
+    b = (-(pca.mean_ @ components.T) - mean_t) / scale_t
+    return W, b, scaler.mean_[n_text:].astype(np.float64), scaler.scale_[n_text:].astype(np.float64)
+
+
+class ModelBundle:
+    """Booster + fused projection + feature schema, loaded once per process"""
+
+    def __init__(self, booster, weights, manifest, path=None):
+        self.booster = booster
+        self.W = weights['projection_weight']
+        self.b = weights['projection_bias']
+        self.meta_mean = weights['meta_mean']
+        self.meta_scale = weights['meta_scale']
+        self.manifest = manifest
+        self.path = path
+
+    @property
+    def version(self):
+        return self.manifest.get('version', 'legacy')
+
+    @property
+    def category_cols(self):
+        return self.manifest['feature_schema']['category_cols']
+
+    @property
+    def n_text(self):
+        return self.W.shape[1]
+
+    @property
+    def n_features(self):
+        return self.n_text + len(self.meta_mean)
+
+    def meta_features(self, df):
+        """score_ag + category one-hot in the training column order"""
+        meta = np.zeros((len(df), 1 + len(self.category_cols)), dtype=np.float64)
+        meta[:, 0] = pd.to_numeric(df['score_ag'], errors='coerce').fillna(0).values
+        categories = df['category'].astype(str).values if 'category' in df.columns else np.array([])
+        for j, col in enumerate(self.category_cols):
+            meta[:, 1 + j] = (categories == col[len('cat_'):])
+        return meta
+
+    def transform(self, embeddings, meta):
+        """Scaled feature matrix from raw embeddings and metadata features"""
+        embeddings = np.asarray(embeddings)
+        X = np.empty((len(embeddings), self.n_features), dtype=np.float64)
+        np.matmul(embeddings, self.W, out=X[:, :self.n_text])
+        X[:, :self.n_text] += self.b
+        np.subtract(meta, self.meta_mean, out=X[:, self.n_text:])
+        X[:, self.n_text:] /= self.meta_scale
+        return X
+
+    def predict(self, X):
+        return self.booster.predict(X)
+
+    @classmethod
+    def from_legacy(cls, model_dir=MODEL_DIR):
+        """Build an in-memory bundle from the old lgbm_model.txt + pickles"""
+        import joblib
+        import lightgbm as lgb
+
+        booster = lgb.Booster(model_file=os.path.join(model_dir, "lgbm_model.txt"))
+        pca = joblib.load(os.path.join(model_dir, "pca.pkl"))
+        scaler = joblib.load(os.path.join(model_dir, "scaler.pkl"))
+        cat_cols_path = os.path.join(model_dir, "category_cols.pkl")
+        category_cols = joblib.load(cat_cols_path) if os.path.exists(cat_cols_path) else list(KNOWN_CATEGORY_COLS)
+
+        W, b, meta_mean, meta_scale = fuse_projection(pca, scaler, pca.n_components_)
+        weights = {'projection_weight': W, 'projection_bias': b, 'meta_mean': meta_mean, 'meta_scale': meta_scale}
+        manifest = _build_manifest(pca, category_cols, version='legacy')
+        legacy_files = ["lgbm_model.txt", "pca.pkl", "scaler.pkl"]
+        manifest['checksum'] = hashlib.sha256(
+            "".join(_sha256(os.path.join(model_dir, f)) for f in legacy_files).encode()
+        ).hexdigest()
+        return cls(booster, weights, manifest, path=model_dir)
+
+
+def _build_manifest(pca, category_cols, version=None, params=None, metrics=None, tuning=None):
+    n_text = int(pca.n_components_)
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'version': version or datetime.now().strftime('%Y%m%d_%H%M%S'),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'feature_schema': {
+            'embedding_dim': int(pca.components_.shape[1]),
+            'text_features': [f"pca_{i}" for i in range(n_text)],
+            'meta_features': ['score_ag'] + list(category_cols),
+            'category_cols': list(category_cols),
+        },
+        'params': params or {},
+        'metrics': metrics or {},
+    }
+    if getattr(pca, 'info', None):
+        manifest['projection'] = pca.info
+    if tuning:
+        manifest['tuning'] = tuning
+    return manifest
+
+
+def save_bundle(booster, pca, scaler, category_cols, bundle_dir=BUNDLE_DIR, params=None, metrics=None, tuning=None):
+    """Write a new bundle atomically (temp dir + rename) and return its manifest"""
+    W, b, meta_mean, meta_scale = fuse_projection(pca, scaler, pca.n_components_)
+    manifest = _build_manifest(pca, category_cols, params=params, metrics=metrics, tuning=tuning)
+    arrays = {'projection_weight': W, 'projection_bias': b, 'meta_mean': meta_mean, 'meta_scale': meta_scale,
+              'projection_components': pca.components_, 'projection_mean': pca.mean_}
+    return _write_bundle(booster, arrays, manifest, bundle_dir)
+
+
+def save_updated_bundle(booster, base, bundle_dir=BUNDLE_DIR, params=None, metrics=None, tuning=None, training=None):
+    """
+    New bundle for a booster trained in an existing bundle's feature space
+    (warm start / refit): projection and schema are copied from `base`.
+    """
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'version': datetime.now().strftime('%Y%m%d_%H%M%S'),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'feature_schema': base.manifest['feature_schema'],
+        'params': params or {},
+        'metrics': metrics or {},
+        'parent_version': base.version,
+    }
+    if base.manifest.get('projection'):
+        manifest['projection'] = base.manifest['projection']
+    if tuning:
+        manifest['tuning'] = tuning
+    if training:
+        manifest['training'] = training
+    arrays = {'projection_weight': np.array(base.W), 'projection_bias': np.array(base.b),
+              'meta_mean': np.array(base.meta_mean), 'meta_scale': np.array(base.meta_scale)}
+    stored = load_projection_arrays(base.path) if base.path else None
+    if stored is not None:
+        arrays['projection_components'], arrays['projection_mean'], _ = stored
+    return _write_bundle(booster, arrays, manifest, bundle_dir)
+
+
+def _write_bundle(booster, arrays, manifest, bundle_dir):
+    tmp_dir = bundle_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    booster.save_model(os.path.join(tmp_dir, BOOSTER_FILE))
+    files = [BOOSTER_FILE]
+    for key, filename in {**WEIGHT_FILES, **PROJECTION_FILES}.items():
+        if key in arrays:
+            np.save(os.path.join(tmp_dir, filename), np.ascontiguousarray(arrays[key]))
+            files.append(filename)
+
+    manifest['files'] = {f: _sha256(os.path.join(tmp_dir, f)) for f in files}
+    manifest['checksum'] = hashlib.sha256(
+        "".join(manifest['files'][f] for f in files).encode()
+    ).hexdigest()
+
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    old_dir = bundle_dir + ".old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(bundle_dir):
+        os.rename(bundle_dir, old_dir)
+    os.rename(tmp_dir, bundle_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    print(f"[OK] Model bundle {manifest['version']} saved to {bundle_dir}")
+    return manifest
+
+
+def load_bundle(bundle_dir=BUNDLE_DIR, verify=True):
+    """Load a bundle with memory-mapped weights, verifying file checksums"""
+    import lightgbm as lgb
+
+    with open(os.path.join(bundle_dir, MANIFEST_FILE), encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    if manifest.get('format') != BUNDLE_FORMAT:
+        raise ValueError(f"Unsupported bundle format: {manifest.get('format')}")
+
+    if verify:
+        for filename, expected in manifest['files'].items():
+            actual = _sha256(os.path.join(bundle_dir, filename))
+            if actual != expected:
+                raise ValueError(f"Checksum mismatch for {filename} in {bundle_dir}")
+
+    weights = {key: np.load(os.path.join(bundle_dir, filename), mmap_mode='r')
+               for key, filename in WEIGHT_FILES.items()}
+    booster = lgb.Booster(model_file=os.path.join(bundle_dir, BOOSTER_FILE))
+
+    bundle = ModelBundle(booster, weights, manifest, path=bundle_dir)
+    if booster.num_feature() != bundle.n_features:
+        raise ValueError(f"Booster expects {booster.num_feature()} features, schema has {bundle.n_features}")
+    return bundle
+
+
+def load_model(model_dir=MODEL_DIR):
+    """Prefer the versioned bundle; fall back to the legacy pickles"""
+    bundle_dir = os.path.join(model_dir, "bundle")
+    if os.path.exists(os.path.join(bundle_dir, MANIFEST_FILE)):
+        return load_bundle(bundle_dir)
+    print("[INFO] No model bundle found, using legacy model files (lgbm_model.txt + pickles)")
+    return ModelBundle.from_legacy(model_dir)
+
+
+def load_projection_arrays(bundle_dir=BUNDLE_DIR):
+    """(components, mean, projection info) saved with a bundle, or None (no bundle / older bundle)"""
+    manifest = read_manifest(bundle_dir)
+    if manifest is None or not manifest.get('projection'):
+        return None
+    if any(filename not in manifest.get('files', {}) for filename in PROJECTION_FILES.values()):
+        return None
+    components = np.load(os.path.join(bundle_dir, PROJECTION_FILES['projection_components']))
+    mean = np.load(os.path.join(bundle_dir, PROJECTION_FILES['projection_mean']))
+    return components, mean, manifest['projection']
+
+
+def read_manifest(bundle_dir=BUNDLE_DIR):
+    """Manifest of the current bundle, or None"""
+    path = os.path.join(bundle_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def update_manifest(updates, bundle_dir=BUNDLE_DIR):
+    """Merge metadata into the current bundle's manifest (file checksums are unaffected)"""
+    manifest = read_manifest(bundle_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No model bundle in {bundle_dir}")
+    manifest.update(updates)
+    path = os.path.join(bundle_dir, MANIFEST_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    return manifest
+
+
+if __name__ == "__main__":
+    if "--from-legacy" in sys.argv:
+        # One-off migration of the pickled model files into a bundle
+        import joblib
+        import lightgbm as lgb
+        cat_cols_path = os.path.join(MODEL_DIR, "category_cols.pkl")
+        save_bundle(
+            lgb.Booster(model_file=os.path.join(MODEL_DIR, "lgbm_model.txt")),
+            joblib.load(os.path.join(MODEL_DIR, "pca.pkl")),
+            joblib.load(os.path.join(MODEL_DIR, "scaler.pkl")),
+            joblib.load(cat_cols_path) if os.path.exists(cat_cols_path) else list(KNOWN_CATEGORY_COLS)
+        )
+    else:
+        bundle = load_model()
+        print(json.dumps(bundle.manifest, ensure_ascii=False, indent=2))
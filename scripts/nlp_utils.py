@@ -16,17 +16,12 @@ except ImportError:
     print("[Warning] KoNLPy not installed. Using basic tokenization.")
     print("Install with: pip install konlpy")
 
-from sentence_transformers import SentenceTransformer
+from embedding_backend import get_embedding_backend
 
-# Global sentence transformer for embeddings
-_st_model = None
 
 def get_sentence_transformer():
-    """Lazy load sentence transformer model"""
-    global _st_model
-    if _st_model is None:
-        _st_model = SentenceTransformer('jhgan/ko-sroberta-multitask')
-    return _st_model
+    """Lazy load the configured embedding backend (sentence-transformers or ONNX)"""
+    return get_embedding_backend()
 
 
 def extract_morphemes(text: str) -> List[str]:
@@ -0,0 +1,127 @@
+"""
+Noise Filter Rules of the Weekly Dashboards
+Each dashboard drops articles matching its exclusion list, or a generic deal keyword
+(계약, M&A, ...) without pharma context, or "제약" used as "constraint". The rules read
+the article body, so they are evaluated when an article file is ranked
+(rank_articles.py -> is_noise_internal / is_noise_external columns) rather than on every
+dashboard load, which would decompress every body from the blob store each time.
+
+    internal_weekly.py   INTERNAL_EXCLUDED_KEYWORDS, generic check on the `keywords` column
+    external_weekly.py   EXTERNAL_EXCLUDED_KEYWORDS, generic check on the text
+"""
+try:
+    from blob_store import load_content, BLOB_DIR
+except ImportError:
+    from scripts.blob_store import load_content, BLOB_DIR
+
+NOISE_COLUMNS = {'internal': 'is_noise_internal', 'external': 'is_noise_external'}
+
+GENERIC_KEYWORDS = ["계약", "M&A", "인수", "합병", "투자", "제휴", "CJ"]
+PHARMA_CONTEXT_KEYWORDS = ["제약", "바이오", "신약", "임상", "헬스케어", "의료", "병원", "약국", "치료제", "백신", "진단", "물류", "유통", "공급"]
+
+
+INTERNAL_EXCLUDED_KEYWORDS = [
+    "네이버 배송", "네이버 쇼핑", "네이버 페이", "도착보장", 
+    "쿠팡", "배달의민족", "요기요", "무신사", "컬리", "알리익스프레스", "테무",
+    "부동산", "아파트", "전세", "매매", "청약", "건설", 
+    "금리 인하", "주식 개장", "환율", "코스피", "코스닥", "증시", "상한가", 
+    "주가", "주식", "목표주가", "특징주", "급등",
+    "여행", "호텔", "항공권", "예능", "드라마", "축구", "야구", "올림픽", "연예", "공연", "뮤지컬", "전시회", "관람",
+    "이차전지", "배터리", "전기차", "반도체", "디스플레이", "조선", "철강",
+    "채용", "신입사원", "공채", "원서접수", "고양이",
+    "음식", "1인분", "문여는", "대전시장", "이뮨온시아", "에스바이오메딕스", "이지메디컴", "낙태", "살인", "의료진", "구속", "선고", "알테오젠"
+]
+
+
+def is_noise_internal(row):
+    # Check Title + Summary + Content (Body)
+    text = str(row['title']) + " " + str(row.get('summary', '')) + " " + str(row.get('content', ''))
+    
+    # 1. Check Explicit Exclusions
+    for exc in INTERNAL_EXCLUDED_KEYWORDS:
+        if exc in text:
+            return True
+            
+    # 2. Homonym Check: "제약" (Constraint vs Pharma)
+    if "제약" in text:
+        if any(x in text for x in ["시간 제약", "공간 제약", "물리적 제약", "발전 제약", "활동 제약"]):
+            if not any(pk in text for pk in PHARMA_CONTEXT_KEYWORDS if pk != "제약"):
+                return True
+
+    # 3. Generic Keyword Context Check
+    row_kws = str(row.get('keywords', ''))
+    if row_kws:
+        matched_gen = [gk for gk in GENERIC_KEYWORDS if gk in row_kws]
+        if matched_gen:
+             if not any(pk in text for pk in PHARMA_CONTEXT_KEYWORDS):
+                 return True
+                 
+    # 4. Specific Distribution Exclusion
+    if str(row.get('category')) == 'Distribution':
+        if '도이치뱅크' in text:
+            return True
+            
+    return False
+
+
+EXTERNAL_EXCLUDED_KEYWORDS = [
+    "네이버 배송", "네이버 쇼핑", "네이버 페이", "도착보장", 
+    "쿠팡", "배달의민족", "요기요", "무신사", "컬리", "알리익스프레스", "테무",
+    "부동산", "아파트", "전세", "매매", "청약", "건설", 
+    "금리 인하", "주식 개장", "환율", "코스피", "코스닥", "증시", "상한가", 
+    "주가", "주식", "목표주가", "특징주", "급등",
+    "여행", "호텔", "항공권", "예능", "드라마", "축구", "야구", "올림픽", "연예", "공연", "뮤지컬", "전시회", "관람",
+    "이차전지", "배터리", "전기차", "반도체", "디스플레이", "조선", "철강",
+    "채용", "신입사원", "공채", "원서접수", "고양이",
+    "음식", "1인분", "문여는", "대전시장", "이뮨온시아", "에스바이오메딕스", "알테오젠"
+]
+
+
+def is_noise_external(row):
+    # Check Title + Summary + Content (Body)
+    text = str(row['title']) + " " + str(row.get('summary', '')) + " " + str(row.get('content', ''))
+    
+    # 1. Check Explicit Exclusions
+    for exc in EXTERNAL_EXCLUDED_KEYWORDS:
+        if exc in text:
+            return True
+            
+    # 2. Homonym Check: "제약" (Constraint vs Pharma)
+    if "제약" in text:
+        if any(x in text for x in ["시간 제약", "공간 제약", "물리적 제약", "발전 제약", "활동 제약"]):
+            if not any(pk in text for pk in PHARMA_CONTEXT_KEYWORDS if pk != "제약"):
+                return True
+                
+    # 3. Context Check for Generics (M&A, Investment)
+    if any(k in text for k in GENERIC_KEYWORDS):
+        if not any(pk in text for pk in PHARMA_CONTEXT_KEYWORDS):
+            return True
+            
+    # 4. Specific Distribution Exclusion
+    if str(row.get('category')) == 'Distribution':
+        if '도이치뱅크' in text:
+            return True
+            
+    return False
+
+def add_noise_flags(df, blob_dir=BLOB_DIR):
+    """Frame with both dashboards' noise flags (bodies read from the blob store when not inline)"""
+    if df.empty:
+        return df
+    bodies = load_content(df, blob_dir=blob_dir)
+    df = df.copy()
+    df[NOISE_COLUMNS['internal']] = bodies.apply(is_noise_internal, axis=1).astype(bool).values
+    df[NOISE_COLUMNS['external']] = bodies.apply(is_noise_external, axis=1).astype(bool).values
+    return df
+
+
+def noise_mask(df, dashboard, blob_dir=BLOB_DIR):
+    """
+    Boolean Series (is noise) for one dashboard: the flag stored at rank time, or, for files
+    ranked before the flags existed, the rules applied to the bodies loaded now
+    """
+    column = NOISE_COLUMNS[dashboard]
+    if column in df.columns:
+        return df[column].astype(str).str.lower().isin(['true', '1'])
+    rule = is_noise_internal if dashboard == 'internal' else is_noise_external
+    return load_content(df, blob_dir=blob_dir).apply(rule, axis=1).astype(bool)
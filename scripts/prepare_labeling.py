@@ -5,20 +5,16 @@ Extracts recent articles from crawled data for user to add reward labels
 import pandas as pd
 from datetime import datetime, timedelta
 import os
-import glob
+from article_store import load_latest
+from data_io import atomic_write_csv
 
-# Configuration
-def find_latest_file(pattern):
-    """Find the most recent file matching the pattern"""
-    files = glob.glob(pattern)
-    if not files:
-        return None
-    return max(files, key=os.path.getmtime)
+# Columns copied into the labeling file (the large 'content' column is never read)
+LABEL_COLUMNS = ['date', 'category', 'published_date', 'site_name', 'url', 'title', 'summary', 'region', 'score_ag', 'keywords']
 
-# Auto-detect latest crawled data
-INPUT_FILE = find_latest_file('data/articles_raw/articles_naver_api_*.csv')
+# Auto-detect latest crawled data (Parquet article store, or the newest weekly CSV)
+new_articles, INPUT_FILE = load_latest('weekly', columns=LABEL_COLUMNS)
 if not INPUT_FILE:
-    print("Error: No crawled data found in data/articles_raw/")
+    print("Error: No crawled data found in data/articles or data/articles_raw/")
     print("Expected file pattern: articles_naver_api_YYYYMMDD.csv")
     exit(1)
 
@@ -27,9 +23,6 @@ print(f"Using crawled data: {INPUT_FILE}")
 OUTPUT_DIR = 'data/labels'
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-# Load newest articles file
-new_articles = pd.read_csv(INPUT_FILE, encoding='utf-8-sig')
-
 # Filter for last 45 days (full dataset for initial labeling)
 period_ago = datetime.now() - timedelta(days=45)
 new_articles['published_date_dt'] = pd.to_datetime(new_articles['published_date'])
@@ -40,7 +33,7 @@ print(f"Last 45 days articles: {len(this_period)}")
 print(f"Date range: {this_period['published_date'].min()} to {this_period['published_date'].max()}")
 
 # Create simplified labeling file
-labeling_df = this_period[['date', 'category', 'published_date', 'site_name', 'url', 'title', 'summary', 'region', 'score_ag', 'keywords']].copy()
+labeling_df = this_period[LABEL_COLUMNS].copy()
 
 # Add empty reward column for manual labeling
 labeling_df['reward'] = ''
@@ -51,7 +44,7 @@ labeling_df = labeling_df.sort_values('score_ag', ascending=False)
 # Save to labeling file (with today's date)
 today_str = datetime.now().strftime('%Y%m%d')
 output_file = f'data/labels/articles_to_label_{today_str}.csv'
-labeling_df.to_csv(output_file, index=False, encoding='utf-8-sig')
+atomic_write_csv(labeling_df, output_file)
 
 print(f"\nCreated labeling file: {output_file}")
 print(f"Total articles to label: {len(labeling_df)}")
@@ -0,0 +1,166 @@
+"""
+Text Embedding Projection (PCA 768 -> 128) for train_lgbm_model.py
+Fits the projection from embedding batches read through the embedding cache
+instead of one in-memory matrix, and keeps it fixed between weekly runs until
+the refit policy says otherwise, so text features stay stable across bundles.
+
+Methods (projection.method in config/pipeline.yaml):
+  incremental  IncrementalPCA.partial_fit over batches (memory bounded by batch_size)
+  randomized   PCA with randomized SVD (one in-memory fit)
+  full         exact PCA on the full matrix
+
+Refit policy - the projection of the current bundle is reused unless:
+  - there is none (first run, legacy model) or it was fitted for another encoder / size
+  - the labeled corpus grew by more than refit_growth since it was fitted
+  - it keeps less than min_retained_ratio of the variance it kept when fitted (drift)
+The projection is saved inside the model bundle; its version is in the manifest.
+"""
+import hashlib
+from datetime import datetime
+
+import numpy as np
+
+try:
+    from config import load_pipeline_config
+    from model_bundle import load_projection_arrays, BUNDLE_DIR
+except ImportError:
+    from scripts.config import load_pipeline_config
+    from scripts.model_bundle import load_projection_arrays, BUNDLE_DIR
+
+DEFAULT_SETTINGS = {
+    'method': 'incremental',
+    'n_components': 128,
+    'batch_size': 256,
+    'refit_growth': 0.25,
+    'min_retained_ratio': 0.9,
+}
+METHODS = ('incremental', 'randomized', 'full')
+
+
+def load_settings():
+    """Projection settings from config/pipeline.yaml (defaults if absent)"""
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        settings.update(load_pipeline_config().get('projection', {}) or {})
+    except Exception as e:
+        print(f"[WARNING] Could not read pipeline config: {e}")
+    if settings['method'] not in METHODS:
+        raise ValueError(f"Unknown projection method: {settings['method']} (expected one of {METHODS})")
+    return settings
+
+
+class Projection:
+    """Fitted PCA (components + mean) with the same attributes fuse_projection reads"""
+    whiten = False
+
+    def __init__(self, components, mean, info):
+        self.components_ = np.asarray(components, dtype=np.float64)
+        self.mean_ = np.asarray(mean, dtype=np.float64)
+        self.info = info
+
+    @property
+    def n_components_(self):
+        return self.components_.shape[0]
+
+    @property
+    def version(self):
+        return self.info.get('version')
+
+    def transform(self, embeddings):
+        return (np.asarray(embeddings, dtype=np.float64) - self.mean_) @ self.components_.T
+
+
+def iter_batches(texts, embed, batch_size, min_size=1):
+    """embed(batch) for consecutive batches; a short tail is merged into the previous batch"""
+    starts = list(range(0, len(texts), batch_size))
+    if len(starts) > 1 and len(texts) - starts[-1] < min_size:
+        starts.pop()
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else len(texts)
+        yield embed(texts[start:end])
+
+
+def fit_projection(texts, embed, encoder, settings):
+    """Fit a new projection over embed(batch) batches of `texts`"""
+    from sklearn.decomposition import PCA, IncrementalPCA
+
+    n_components, batch_size, method = settings['n_components'], settings['batch_size'], settings['method']
+    if method == 'incremental':
+        # partial_fit needs at least n_components rows per batch
+        pca = IncrementalPCA(n_components=n_components)
+        for batch in iter_batches(texts, embed, max(batch_size, n_components), min_size=n_components):
+            pca.partial_fit(batch)
+    else:
+        matrix = np.vstack(list(iter_batches(texts, embed, batch_size)))
+        pca = PCA(n_components=n_components, svd_solver=method, random_state=42).fit(matrix)
+
+    components = np.ascontiguousarray(pca.components_, dtype=np.float64)
+    info = {
+        'version': hashlib.sha256(components.tobytes()).hexdigest()[:12],
+        'method': method,
+        'encoder': encoder,
+        'n_components': int(n_components),
+        'embedding_dim': int(components.shape[1]),
+        'n_samples': int(len(texts)),
+        'retained_variance': float(np.sum(pca.explained_variance_ratio_)),
+        'fitted_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    return Projection(components, pca.mean_, info)
+
+
+def retained_variance(projection, texts, embed, batch_size):
+    """Share of the variance (around the projection's mean) that the projection keeps, in one streaming pass"""
+    total = kept = 0.0
+    for batch in iter_batches(texts, embed, batch_size):
+        centered = np.asarray(batch, dtype=np.float64) - projection.mean_
+        total += float(np.sum(centered ** 2))
+        kept += float(np.sum((centered @ projection.components_.T) ** 2))
+    return kept / total if total > 0 else 1.0
+
+
+def load_projection(bundle_dir=BUNDLE_DIR):
+    """Projection stored in the current bundle, or None"""
+    stored = load_projection_arrays(bundle_dir)
+    if stored is None:
+        return None
+    components, mean, info = stored
+    return Projection(components, mean, info)
+
+
+def refit_reason(current, texts, embed, encoder, settings):
+    """Why the current projection must be refitted, or None to reuse it"""
+    if current is None:
+        return "no projection in the current bundle"
+    info = current.info
+    if info.get('encoder') != encoder:
+        return f"encoder changed ({info.get('encoder')} -> {encoder})"
+    if info.get('n_components') != settings['n_components']:
+        return f"n_components changed ({info.get('n_components')} -> {settings['n_components']})"
+    if len(texts) > info['n_samples'] * (1 + settings['refit_growth']):
+        return f"corpus grew from {info['n_samples']} to {len(texts)} texts"
+    try:
+        ratio = retained_variance(current, texts, embed, settings['batch_size']) / info['retained_variance']
+    except ValueError as e:
+        return f"embedding dim changed ({e})"
+    if ratio < settings['min_retained_ratio']:
+        return f"retained variance dropped to {ratio:.1%} of the fitted value"
+    return None
+
+
+def get_projection(texts, embed, encoder, settings=None, bundle_dir=BUNDLE_DIR, force_refit=False):
+    """
+    Reuse the current bundle's projection or fit a new one (see refit policy above).
+    Returns (projection, refit reason or None if reused).
+    """
+    settings = settings or load_settings()
+    current = None if force_refit else load_projection(bundle_dir)
+    reason = "refit requested" if force_refit else refit_reason(current, texts, embed, encoder, settings)
+    if reason is None:
+        print(f"  - Reusing projection {current.version} ({current.info['method']}, "
+              f"fitted on {current.info['n_samples']} texts at {current.info['fitted_at']})")
+        return current, None
+
+    print(f"  - Fitting projection ({settings['method']}, {len(texts)} texts): {reason}")
+    projection = fit_projection(texts, embed, encoder, settings)
+    print(f"  - Projection {projection.version}: {projection.info['retained_variance']:.1%} variance retained")
+    return projection, reason
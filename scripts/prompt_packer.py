@@ -0,0 +1,126 @@
+"""
+Token-Budget Prompt Packer
+Fills each Gemini request up to an input/output token budget instead of a fixed
+item count: many short articles share one request, long ones get fewer per request,
+and no batch is sized to overrun maxOutputTokens.
+
+    tokens(request) = fixed instruction tokens (sent once per request)
+                      + sum of per-item input tokens          <= input_token_budget
+    output(request) = sum of per-item output estimates        <= output_token_budget
+
+Tokens are estimated without a tokenizer: ASCII text at ~chars_per_token characters
+per token, other characters (Hangul) at non_ascii_tokens_per_char tokens each.
+Groups (e.g. clusters of near-duplicates) are kept in one request when they fit
+(first fit, in input order so neighbouring groups tend to share a request);
+larger groups are split across requests.
+
+Used by gemini_filter.py (dedup/scoring batches) and the internal dashboard's translation.
+"""
+import math
+
+try:
+    from config import load_pipeline_config
+except ImportError:
+    from scripts.config import load_pipeline_config
+
+DEFAULT_SETTINGS = {
+    'input_token_budget': 8000,
+    'output_token_budget': 6500,  # headroom under maxOutputTokens (8192)
+    'max_items': 40,
+    'chars_per_token': 4.0,
+    'non_ascii_tokens_per_char': 0.8,
+}
+
+
+def load_settings(section=None):
+    """Packer settings from config/pipeline.yaml `packer` (plus a caller's own section, e.g. gemini.packer)"""
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        config = load_pipeline_config()
+        settings.update(config.get('packer', {}) or {})
+        if section:
+            settings.update((config.get(section, {}) or {}).get('packer', {}) or {})
+    except Exception as e:
+        print(f"[WARNING] Could not read pipeline config: {e}")
+    return settings
+
+
+def estimate_tokens(text, settings=None):
+    settings = settings or DEFAULT_SETTINGS
+    text = str(text or '')
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return int(math.ceil((len(text) - non_ascii) / settings['chars_per_token']
+                         + non_ascii * settings['non_ascii_tokens_per_char']))
+
+
+class Pack:
+    """Items of one request with their estimated token totals"""
+
+    def __init__(self, fixed_tokens):
+        self.items = []
+        self.input_tokens = fixed_tokens
+        self.output_tokens = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, item, input_tokens, output_tokens):
+        self.items.append(item)
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+
+
+class PromptPacker:
+    """
+    fixed_tokens:  instruction tokens repeated in every request
+    input_cost:    item -> estimated input tokens (default: estimate_tokens(str(item)))
+    output_cost:   item -> estimated output tokens (default: output_tokens_per_item)
+    """
+
+    def __init__(self, fixed_tokens=0, input_cost=None, output_cost=None, output_tokens_per_item=100, settings=None):
+        self.settings = settings or load_settings()
+        self.fixed_tokens = fixed_tokens
+        self.input_cost = input_cost or (lambda item: estimate_tokens(item, self.settings))
+        self.output_cost = output_cost or (lambda item: output_tokens_per_item)
+
+    def _fits(self, pack, input_tokens, output_tokens, count=1):
+        return (len(pack) + count <= self.settings['max_items']
+                and pack.input_tokens + input_tokens <= self.settings['input_token_budget']
+                and pack.output_tokens + output_tokens <= self.settings['output_token_budget'])
+
+    def pack(self, items):
+        """Packs (requests) for independent items, in input order"""
+        return self.pack_groups([[item] for item in items])
+
+    def pack_groups(self, groups):
+        """Packs holding whole groups where possible: first fit, in input order"""
+        costed = []
+        for group in groups:
+            costs = [(item, self.input_cost(item), self.output_cost(item)) for item in group]
+            costed.append((sum(c[1] for c in costs), sum(c[2] for c in costs), costs))
+
+        packs = []
+        for group_in, group_out, costs in costed:
+            target = next((p for p in packs if self._fits(p, group_in, group_out, len(costs))), None)
+            if target is None and self._fits(Pack(self.fixed_tokens), group_in, group_out, len(costs)):
+                target = Pack(self.fixed_tokens)
+                packs.append(target)
+            if target is not None:
+                for item, item_in, item_out in costs:
+                    target.add(item, item_in, item_out)
+                continue
+            # Larger than one request: split over new pack(s)
+            for item, item_in, item_out in costs:
+                if not packs or not self._fits(packs[-1], item_in, item_out):
+                    packs.append(Pack(self.fixed_tokens))
+                packs[-1].add(item, item_in, item_out)  # a single oversized item still gets its own pack
+        return packs
+
+    def report(self, packs, prefix="  "):
+        """One utilisation line per request"""
+        for i, pack in enumerate(packs, 1):
+            print(f"{prefix}[Request {i}] {len(pack)} items, "
+                  f"input ~{pack.input_tokens}/{self.settings['input_token_budget']} tokens "
+                  f"({pack.input_tokens / self.settings['input_token_budget']:.0%}), "
+                  f"output ~{pack.output_tokens}/{self.settings['output_token_budget']} "
+                  f"({pack.output_tokens / self.settings['output_token_budget']:.0%})")
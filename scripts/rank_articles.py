@@ -11,22 +11,48 @@ import pandas as pd
 import os
 import glob
 import re
-import joblib
-try:
-    import lightgbm as lgb
-    HAS_LGBM = True
-except ImportError:
-    HAS_LGBM = False
+import time
+import argparse
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# The booster itself is loaded by model_bundle; only its availability is checked here
+HAS_LGBM = importlib.util.find_spec('lightgbm') is not None
+if not HAS_LGBM:
     print("[WARNING] LightGBM not found. Skipping model-based ranking.")
 
-from sentence_transformers import SentenceTransformer
+from embedding_backend import get_embedding_backend
+from model_bundle import load_model, BUNDLE_DIR
+from strategic_rules import compute_strategic_scores, RULES_VERSION
+from topk_selector import select_top_k
+from embedding_cache import EmbeddingCache
+from score_cache import ScoreCache, article_keys
+from data_io import atomic_write_csv, read_table, canonical_columns, apply_schema
+from article_catalog import index_output
+from blob_store import externalize_content
+from noise_filter import add_noise_flags
+from label_store import load_labels_frame
+
+try:
+    from article_store import write_csv_output, list_partitions, read_articles, parse_filename, csv_filename
+    HAS_ARTICLE_STORE = True
+except ImportError:
+    HAS_ARTICLE_STORE = False
+    print("[WARNING] pyarrow not found. Article store (Parquet) disabled.")
 
 # Configuration
 RAW_DATA_DIR = "data/articles_raw"
-LABELS_FILE = "data/labels/labels_master.csv"
 MODEL_DIR = "model"
-MODEL_PATH = os.path.join(MODEL_DIR, "lgbm_model.txt")
-SCALER_PATH = os.path.join(MODEL_DIR, "scaler.pkl")
+MODEL_PATH = os.path.join(MODEL_DIR, "lgbm_model.txt")  # Legacy (pre-bundle) model
+
+# Category-balanced Top-K selection
+TOP_K = 20
+PRIORITY_QUOTAS = [('Distribution', 3), ('Zuellig', 3), ('BD', 8), ('Client', 8)]
+MIN_SCORE_OTHER = 5.0
+MAX_OBESITY = 2  # Obesity drug terms: 위고비, 마운자로, 삭센다, 오젬픽, GLP-1, 비만치료제, 비만약, 비만
+
+# Backfill (re-rank historical files in one process)
+BACKFILL_WORKERS = 4
 
 def get_days_since(date_str):
     from datetime import datetime
@@ -38,173 +64,199 @@ def get_days_since(date_str):
     except:
         return 0
 
-def rank_articles():
-    """Rank articles using LightGBM model"""
-    print("="*70)
-    print(">>> Ranking Articles with LightGBM Model...")
-    print("="*70)
-    
+def extract_date_from_filename(filepath):
+    basename = os.path.basename(filepath)
+    match = re.search(r'_(\d{8})\.csv$', basename)
+    if match:
+        return match.group(1)
+    return "00000000"
+
+
+def find_article_files(start=None, end=None):
+    """
+    Raw article CSVs (ranked outputs excluded), oldest first, optionally within [start, end] (YYYYMMDD).
+    Crawls whose CSV was retired by retention.py are listed under the same path; load_articles reads them from the store.
+    """
+    csv_files = glob.glob(os.path.join(RAW_DATA_DIR, "articles_*.csv"))
+    csv_files = [f for f in csv_files if "ranked" not in os.path.basename(f)]
+    if HAS_ARTICLE_STORE:
+        present = {os.path.basename(f) for f in csv_files}
+        csv_files += [os.path.join(RAW_DATA_DIR, csv_filename(kind, crawl_date))
+                      for kind, crawl_date in list_partitions(['weekly', 'daily'], start, end)
+                      if csv_filename(kind, crawl_date) not in present]
+    if start:
+        csv_files = [f for f in csv_files if extract_date_from_filename(f) >= start]
+    if end:
+        csv_files = [f for f in csv_files if extract_date_from_filename(f) <= end]
+    return sorted(csv_files, key=lambda f: (extract_date_from_filename(f), os.path.basename(f)))
+
+
+def ranked_output_path(input_file):
+    date_str = os.path.basename(input_file).replace("articles_", "").replace(".csv", "")
+    return os.path.join(RAW_DATA_DIR, f"articles_ranked_{date_str}.csv")
+
+
+def save_ranked(df_sorted, output_file):
+    """Write a ranked frame: dashboard noise flags, bodies to the blob store, CSV (atomic), article store partition, catalog"""
+    # The dashboards' noise rules read the bodies: evaluated once here, not on every dashboard load
+    df_sorted = add_noise_flags(df_sorted)
+    df_sorted = externalize_content(df_sorted, extract_date_from_filename(output_file))
+    atomic_write_csv(df_sorted, output_file)
+    if HAS_ARTICLE_STORE:
+        write_csv_output(df_sorted, output_file)
+    index_output(df_sorted, output_file)
+    return df_sorted
+
+
+def load_articles(path, verbose=True):
+    if not os.path.exists(path) and HAS_ARTICLE_STORE and parse_filename(path):
+        kind, crawl_date = parse_filename(path)
+        df = apply_schema(read_articles(kind, crawl_date, crawl_date).drop(columns=['kind', 'crawl_date']), 'articles')
+    else:
+        df = read_table(path, schema='articles', memo=False)
+    if verbose:
+        print(f"[OK] Loaded {len(df)} articles")
+    return df
+
+
+def load_labels(verbose=True):
+    """Current labels (label store, or labels_master.csv) with the reward column renamed to 'reward', or None"""
     try:
-        # Step 1: Find latest article file
-        print("\n[Step 1/6] Finding article files...")
-        csv_files = glob.glob(os.path.join(RAW_DATA_DIR, "articles_*.csv"))
-        csv_files = [f for f in csv_files if "ranked" not in os.path.basename(f)]
-        
-        if not csv_files:
-            print("[ERROR] No article CSVs found.")
-            return
-        
-        def extract_date_from_filename(filepath):
-            basename = os.path.basename(filepath)
-            match = re.search(r'_(\d{8})\.csv$', basename)
-            if match:
-                return match.group(1)
-            return "00000000"
-        
-        latest_file = max(csv_files, key=extract_date_from_filename)
-        print(f"[OK] Found: {os.path.basename(latest_file)}")
-        
-        # Step 2: Load articles
-        print("\n[Step 2/6] Loading article data...")
-        try:
-            df = pd.read_csv(latest_file, encoding='utf-8')
-            print(f"[OK] Loaded {len(df)} articles (UTF-8)")
-        except UnicodeDecodeError:
-            print("[INFO] UTF-8 failed, trying CP949...")
-            df = pd.read_csv(latest_file, encoding='cp949')
-            print(f"[OK] Loaded {len(df)} articles (CP949)")
-        
-        if df.empty:
-            print("[ERROR] File is empty.")
-            return
-        
+        labels_df, as_of = load_labels_frame()
+    except Exception as e:
+        print(f"  - Warning: Could not load labels: {str(e)}")
+        return None
+    if labels_df is None or labels_df.empty:
+        return None
+    if verbose:
+        print(f"  - Loaded labels ({'label store' if as_of else 'labels_master.csv'})")
+
+    labels_df = canonical_columns(labels_df)
+    if 'reward' not in labels_df.columns:
+        return None
+    labels_df['url'] = labels_df['url'].astype(str)
+    return labels_df[['url', 'reward']]
+
+
+class ArticleRanker:
+    """
+    Model bundle, embedding backend (with on-disk cache) and labels loaded once,
+    then reused for any number of article frames.
+    """
+
+    def __init__(self, verbose=True):
+        self.verbose = verbose
+        self.bundle = None
+        self.encoder = None
+        self.use_model = False
+        self.model_version = None
+
         # Step 3: Check model files
-        print("\n[Step 3/6] Checking model files...")
-        if not os.path.exists(MODEL_PATH):
-            print(f"[ERROR] Model not found: {MODEL_PATH}")
-            return
-        if not os.path.exists(SCALER_PATH):
-            print(f"[ERROR] Scaler not found: {SCALER_PATH}")
-            return
-        print("[OK] Model files exist")
-        
-        # Step 4: Load model & scaler
-        print("\n[Step 4/6] Loading model & scaler...")
+        self._log("\n[Step 3/6] Checking model files...")
+        if not os.path.exists(os.path.join(BUNDLE_DIR, "manifest.json")) and not os.path.exists(MODEL_PATH):
+            raise FileNotFoundError(f"Model not found: {BUNDLE_DIR} or {MODEL_PATH}")
+        self._log("[OK] Model files exist")
+
+        # Step 4: Load model bundle (booster + fused projection + schema)
+        self._log("\n[Step 4/6] Loading model bundle...")
         try:
             if not HAS_LGBM:
                  raise ImportError("LightGBM module not loaded")
-            
-            model = lgb.Booster(model_file=MODEL_PATH)
-            # Use joblib instead of pickle for better numpy compatibility
-            scaler = joblib.load(SCALER_PATH)
-            print("[OK] Model & scaler loaded")
-            use_model = True
+
+            self.bundle = load_model(MODEL_DIR)
+            print(f"[OK] Model bundle loaded (version: {self.bundle.version})")
+            self.use_model = True
         except Exception as e:
-            print(f"[WARNING] Could not load model/scaler: {str(e)}")
+            print(f"[WARNING] Could not load model bundle: {str(e)}")
             print("[INFO] Falling back to score_ag ranking only")
-            use_model = False
-        
+
+        if self.use_model:
+            self._log("  - Loading embedding backend...")
+            sys.stdout.flush()
+            # Using Korean-Specific Model (backend selected in config/pipeline.yaml)
+            self.encoder = EmbeddingCache(get_embedding_backend())
+            backend = self.encoder.backend
+            self.model_version = f"{self.bundle.version}:{self.bundle.manifest.get('checksum', '')[:12]}:{backend.name}"
+
+        # Per-article score records (only new or changed rows are re-scored)
+        self.scores = ScoreCache()
+        self.labels_df = load_labels(verbose)
+
+    def _log(self, message):
+        if self.verbose:
+            print(message)
+
+    def close(self):
+        if self.encoder is not None:
+            self.encoder.save()
+        self.scores.save()
+
+    def score_dataframe(self, df):
+        """
+        lgbm_score, strategic_* and final_score for one article frame.
+        Returns (scored df, obesity tag array aligned with its rows).
+        """
+        use_model = self.use_model
+
         # Step 5: Feature extraction (skip if model not available)
         if use_model:
-            print("\n[Step 5/6] Extracting features...")
-            print("  - Loading SentenceTransformer...")
-            sys.stdout.flush()
-            
-            print("  - Encoding text features (jhgan/ko-sroberta-multitask)...")
-            # Using Korean-Specific Model
-            model_st = SentenceTransformer('jhgan/ko-sroberta-multitask')
-            text_features = model_st.encode(
-                (df['title'] + " " + df['summary'].fillna('')).tolist(),
-                show_progress_bar=False
-            )
-            
-            # PCA: Encode 768 -> 128 dimensions (Load trained PCA)
-            PCA_PATH = os.path.join(MODEL_DIR, "pca.pkl")
-            if not os.path.exists(PCA_PATH):
-                print(f"[ERROR] PCA model not found at {PCA_PATH}")
-                print("Please retrain the model first: python scripts/train_lgbm_model.py")
-                sys.exit(1)
-            
-            pca = joblib.load(PCA_PATH)
-            
-            print("  - Reducing dimensions (PCA 768 -> 128)...")
-            text_features = pca.transform(text_features)
-            
-            print("  - Extracting metadata features...")
+            bundle = self.bundle
             df['score_ag'] = pd.to_numeric(df['score_ag'], errors='coerce').fillna(0)
-            
-            # Category encoding (one-hot) - must match training
-            category_dummies = pd.get_dummies(df['category'], prefix='cat')
-            
-            # Reindex to match training categories
-            CAT_COLS_PATH = os.path.join(MODEL_DIR, "category_cols.pkl")
-            if os.path.exists(CAT_COLS_PATH):
-                training_cat_cols = joblib.load(CAT_COLS_PATH)
-                category_dummies = category_dummies.reindex(columns=training_cat_cols, fill_value=0)
-            else:
-                # Fallback to known 8 categories if file doesn't exist
-                known_cats = ['cat_BD', 'cat_Client', 'cat_Distribution', 'cat_Product Approval', 'cat_Reimbursement', 'cat_Supply Issues', 'cat_Therapeutic Areas', 'cat_Zuellig']
-                category_dummies = category_dummies.reindex(columns=known_cats, fill_value=0)
-            
-            # Removed days_old to reduce temporal bias
-            
-            meta_features = pd.concat([
-                df[['score_ag']],
-                category_dummies
-            ], axis=1).fillna(0).values
-            
-            X = np.hstack([text_features, meta_features])
-            X_scaled = scaler.transform(X)
-            print("[OK] Feature extraction complete")
-            
-            # Step 6: Prediction
-            print("\n[Step 6/6] Running LightGBM prediction...")
+
+            # Reuse lgbm scores of unchanged articles scored by the same model version
+            article_ids, content_hashes = article_keys(df)
+            lgbm_scores = self.scores.lookup_lgbm(article_ids, content_hashes, self.model_version)
+            todo = np.isnan(lgbm_scores)
+            self._log(f"\n[Step 5/6] Extracting features ({int(todo.sum())} new/changed, {int((~todo).sum())} cached)...")
+
             try:
-                scores = model.predict(X_scaled)
-                print(f"[OK] Predicted scores for {len(scores)} articles")
-                df['lgbm_score'] = scores
+                if todo.any():
+                    df_todo = df[todo]
+                    self._log(f"  - Encoding text features ({self.encoder.backend.model_name}, {self.encoder.backend.name})...")
+                    text_embeddings = self.encoder.encode(
+                        (df_todo['title'] + " " + df_todo['summary'].fillna('')).tolist(),
+                        show_progress_bar=False
+                    )
+
+                    # score_ag + category one-hot, reindexed to the training schema
+                    # Removed days_old to reduce temporal bias
+                    self._log("  - Extracting metadata features...")
+                    meta_features = bundle.meta_features(df_todo)
+
+                    # PCA 768 -> 128 and scaling folded into one projection (single GEMM)
+                    self._log(f"  - Projecting features (fused PCA + scaler, {bundle.W.shape[0]} -> {bundle.n_text})...")
+                    X_scaled = bundle.transform(text_embeddings, meta_features)
+                    self._log("[OK] Feature extraction complete")
+
+                    # Step 6: Prediction
+                    self._log("\n[Step 6/6] Running LightGBM prediction...")
+                    new_scores = bundle.predict(X_scaled)
+                    lgbm_scores[todo] = new_scores
+                    self.scores.update_lgbm(article_ids[todo], content_hashes[todo], self.model_version, new_scores)
+                else:
+                    self._log("\n[Step 6/6] All LightGBM scores cached")
+                self._log(f"[OK] Predicted scores for {len(lgbm_scores)} articles")
+                df['lgbm_score'] = lgbm_scores
             except Exception as e:
                 print(f"[ERROR] LightGBM prediction failed: {str(e)}")
                 print("       Fallback: Using raw strategic score component.")
                 df['lgbm_score'] = 0
                 use_model = False # Force fallback logic in final combination
         else:
-            print("\n[Step 5/6] Skipping feature extraction (no model)")
-            print("\n[Step 6/6] Using score_ag only for ranking...")
+            self._log("\n[Step 5/6] Skipping feature extraction (no model)")
+            self._log("\n[Step 6/6] Using score_ag only for ranking...")
             df['score_ag'] = pd.to_numeric(df['score_ag'], errors='coerce').fillna(0)
             df['lgbm_score'] = 0  # Placeholder
-        
-        # Load labels if available
-        if os.path.exists(LABELS_FILE):
-            try:
-                labels_df = pd.read_csv(LABELS_FILE, encoding='utf-8')
-                print("  - Loaded labels (UTF-8)")
-            except UnicodeDecodeError:
-                labels_df = pd.read_csv(LABELS_FILE, encoding='cp949')
-                print("  - Loaded labels (CP949)")
-            except Exception as e:
-                print(f"  - Warning: Could not load labels: {str(e)}")
-                labels_df = None
-            
-            if labels_df is not None:
-                labels_df['url'] = labels_df['url'].astype(str)
-                df['url'] = df['url'].astype(str)
-                
-                # Handle reward column naming
-                reward_col = None
-                for col in ['reward', 'reward_label', 'reward_raw']:
-                    if col in labels_df.columns:
-                        reward_col = col
-                        break
-                
-                if reward_col:
-                    df = pd.merge(df, labels_df[['url', reward_col]].rename(columns={reward_col: 'reward'}), 
-                                  on='url', how='left')
-                    print(f"  - Merged {len(labels_df)} labels")
-        
+
+        # Merge labels if available
+        if self.labels_df is not None:
+            df['url'] = df['url'].astype(str)
+            df = pd.merge(df, self.labels_df, on='url', how='left')
+            self._log(f"  - Merged {len(self.labels_df)} labels")
+
         # Normalize scores
-        print("  - Calculating final scores...")
-        
+        self._log("  - Calculating final scores...")
+
         if use_model:
             # LGBM weight increased to 0.6 - feedback data is being reflected well
             LGBM_WEIGHT = 0.6      # Increased from 0.3 (model now learning from thumbs-up)
@@ -219,112 +271,21 @@ def rank_articles():
             # Use score_ag only
             df['final_score'] = df['score_ag'].clip(0, 10) / 10
 
-
-        # --- Strategic Scoring (Rule-Based Enhancement) ---
-        # User Feedback:
-        # - High Priority: MNC (Global Pharma), Major Distributors (Zuellig, Geo-Young), Key Topics (Patent Expiry, Price Cut, Reimbursement, Co-promotion)
-        # - Low Priority: Domestic Pharma Earnings (unless Major Distributor), Minor Clinical Trials (Phase 1/2) without MNC context
-        
-        # --- New Strategic Scoring (Business Value Based) ---
-        def calculate_bd_strategic_score(row):
-            # 1. Base Score by Category
-            category_map = {
-                'Distribution': 10.0, 
-                'Zuellig': 10.0,
-                'Reimbursement': 6.0,  # Lowered from 9: was inflating low-LGBM articles via strategic stacking
-                'Client': 7.0,        # Restored to 7.0 so important Client news isn't lost
-                'BD': 7.0, 
-                'Product Approval': 7.0,
-                'Supply Issues': 5.0, 
-                'Therapeutic Areas': 5.0,
-                'Regulation': 5.0
-            }
-            base_score = category_map.get(row.get('category'), 2.0)
-
-            
-            # Text Extraction (Title + Summary + Keywords)
-            text = (str(row.get('title', '')) + " " + str(row.get('summary', '')) + " " + str(row.get('keywords', ''))).lower()
-            
-            # 2. Commercial Boost Keywords (+3.0)
-            commercial_keywords = [
-                "출시", "판권", "유통", "계약", "파트너", "공동판매", "코프로모션", "허가완료", "급여", "도입",
-                "launch", "license", "distribution", "contract", "partner", "co-promotion", "approval", "reimbursement"
-            ]
-            has_commercial = any(k in text for k in commercial_keywords)
-            
-            # 2-1. Co-promotion MUST appear — extra strong boost
-            COPROM_TERMS = ["코프로모션", "공동판매", "co-promotion", "코프로"]
-            has_coprom = any(k in text for k in COPROM_TERMS)
-            
-            # 3. Market Dynamic Keywords (+2.0)
-            market_keywords = [
-                "지오영", "백제", "m&a", "인수", "철수", "한국 법인", "점유율",
-                "geo-young", "market share"
-            ]
-            has_market = any(k in text for k in market_keywords)
-            
-            # 4. Clinical Penalty Keywords (-8.0 ~ -10.0)
-            clinical_keywords = [
-                "임상", "1상", "2상", "3상", "진입", "시험 중", "파이프라인", "전임상", "후보물질", "연구 결과",
-                "clinical", "phase 1", "phase 2", "phase 3", "trial", "preclinical", "pipeline"
-            ]
-            has_clinical = any(k in text for k in clinical_keywords)
-            
-            # 5. Calculate Strategic Score
-            strategic_score = base_score
-            
-            if has_coprom:
-                strategic_score += 6.0  # Co-promotion: strongest commercial boost (must-see)
-            elif has_commercial:
-                strategic_score += 3.0
-            
-            if has_market:
-                strategic_score += 2.0
-                
-            if has_clinical:
-                if has_commercial:
-                    strategic_score -= 2.0  # Commercial context (e.g. "Phase 3 complete, Launch imminent") -> Mild Penalty
-                else:
-                    strategic_score -= 10.0 # Pure Clinical -> Severe Penalty (Remove from Top 20)
-            
-            # 6. General Corporate Penalty (Softened based on user feedback)
-            # Remove "흑자전환", "재편" as user considers major pharma restructuring/earnings as important Client news
-            corporate_keywords_minor = [
-                "주주총회", "배당", "적자", "단순 실적"
-            ]
-            if str(row.get('category')) == 'Client':
-                if any(k in text for k in corporate_keywords_minor):
-                    strategic_score -= 5.0  # Milder penalty for very generic IR news
-            
-            # 7. VIP Client boost (User cited specific MNCs and major domestics)
-            vip_keywords = ["베링거인겔하임", "마운자로", "위고비", "노보노디스크", "릴리", "바이오젠", "화이자", "MSD", "바로팜"]
-            if any(k in text for k in vip_keywords):
-                strategic_score += 4.0
-
-            # 8. Specific Exclusion (User Request)
-            exclusion_keywords = ["동아쏘시오", "donga socio", "이뮨온시아", "immuneoncia", "에스바이오메딕스", "s-biomedics", "원바이오젠", "동물", "사료", "낙태", "살인", "의료진", "구속", "선고"]
-            if any(k in text for k in exclusion_keywords):
-                strategic_score = -100.0 # Extreme penalty to ensure it's dropped from Top 20
-                
-            # 9. Conditional Exclusion: Distribution + (Hospital & Bidding)
-            if row.get('category') == 'Distribution':
-                if '병원' in text and '입찰' in text:
-                    strategic_score -= 20.0 # Force remove (User Request)
-                if '도이치뱅크' in text:
-                    strategic_score -= 20.0 # Force remove (User Request)
-            
-            # 10. Obesity Refinement (User Request)
-            obesity_terms = ['위고비', '마운자로', '삭센다', '오젬픽', 'glp-1', '비만치료제', '비만약', '비만']
-            is_obesity = any(t in text for t in obesity_terms)
-            if is_obesity:
-                if any(k in text for k in ['품절', '공급부족', '수급불균형', '공급 차질']):
-                    strategic_score += 4.0 # Balanced boost for supply issues
-                if any(k in text for k in ['중국', '미국', '해외 공장', '해외 투자']) and not any(k in text for k in ['한국', '국내']):
-                    strategic_score -= 3.0 # Deprioritize foreign investment unless local context exists
-            
-            return max(0, strategic_score)
-
-        df['strategic_score'] = df.apply(calculate_bd_strategic_score, axis=1)
+        # --- Strategic Scoring (Rule-Based Enhancement, Business Value Based) ---
+        # Rules live in strategic_rules.py: vectorized over a keyword-hit matrix,
+        # with one strategic_* column per rule so each score can be audited.
+        self._log(f"  - Applying strategic rules (version {RULES_VERSION})...")
+        article_ids, content_hashes = article_keys(df)
+        strategic = self.scores.lookup_strategic(article_ids, content_hashes, RULES_VERSION)
+        todo = strategic['strategic_score'].isna().values
+        if todo.any():
+            fresh, fresh_masks = compute_strategic_scores(df[todo], return_masks=True)
+            fresh['obesity'] = fresh_masks['obesity'].astype(np.float64)
+            strategic.loc[todo, fresh.columns] = fresh.values
+            self.scores.update_strategic(article_ids[todo], content_hashes[todo], RULES_VERSION, fresh)
+        for col in strategic.columns.drop('obesity'):
+            df[col] = strategic[col].values
+        obesity = strategic['obesity'].values.astype(bool)
         
         # Combine Scores: Final = (LGBM_Component * 0.4) + (Strategic_Score * 0.6)
         # LGBM_Component needs to be on 0-10 scale.
@@ -340,75 +301,36 @@ def rank_articles():
         # Final_Score = (LGBM_Component * 0.6) + (Strategic_Score * 0.4)
         # 60/40 weight as requested by the user
         df['final_score'] = (df['lgbm_component'] * 0.6) + (df['strategic_score'] * 0.4)
-        
+
+        return df, obesity
+
+    def select_top(self, df, obesity, k=TOP_K, min_quotas=PRIORITY_QUOTAS, max_obesity=MAX_OBESITY,
+                   secondary_quota=1, secondary_floor=MIN_SCORE_OTHER):
+        """Category-balanced top-k of a scored frame. Returns (df_sorted with is_top20, top-k frame)"""
         # Category-balanced selection for top results
-        print("  - Applying category balancing...")
+        self._log("  - Applying category balancing...")
         df_sorted = df.sort_values(by='final_score', ascending=False)
         
         # Strategy: Pick top articles from each category proportionally
         # Target: Exactly 20 articles with diverse categories and diversity caps
-        selected_urls = set()
-        df_top20_list = []
-        categories = df['category'].unique()
-        
-        OBESITY_DRUG_TERMS = ['위고비', '마운자로', '삭센다', '오젬픽', 'GLP-1', '비만치료제', '비만약', '비만']
-        MAX_OBESITY = 2
-        obesity_count = 0
-
-        def is_obesity_article(row):
-            text = (str(row.get('title', '')) + ' ' + str(row.get('summary', '')) + ' ' + str(row.get('keywords', ''))).lower()
-            return any(t.lower() in text for t in OBESITY_DRUG_TERMS)
-
-        # 1. First pass: High priority category guarantees
-        for cat, limit in [('Distribution', 3), ('Zuellig', 3), ('BD', 8), ('Client', 8)]:
-            if cat in categories:
-                cat_pool = df_sorted[df_sorted['category'] == cat]
-                added_in_cat = 0
-                for _, row in cat_pool.iterrows():
-                    if added_in_cat >= limit: break
-                    if row['url'] in selected_urls: continue
-                    
-                    is_ob = is_obesity_article(row)
-                    if is_ob and obesity_count >= MAX_OBESITY: continue
-                    
-                    df_top20_list.append(row)
-                    selected_urls.add(row['url'])
-                    added_in_cat += 1
-                    if is_ob: obesity_count += 1
-
-        # 2. Second pass: Max 1 from secondary categories
-        MIN_SCORE_OTHER = 5.0
-        for cat in categories:
-            if cat not in ['Distribution', 'Client', 'BD', 'Zuellig']:
-                 cat_pool = df_sorted[df_sorted['category'] == cat]
-                 for _, row in cat_pool.iterrows():
-                     if row['final_score'] < MIN_SCORE_OTHER: break
-                     if row['url'] in selected_urls: continue
-                     
-                     is_ob = is_obesity_article(row)
-                     if is_ob and obesity_count >= MAX_OBESITY: continue
-                     
-                     df_top20_list.append(row)
-                     selected_urls.add(row['url'])
-                     if is_ob: obesity_count += 1
-                     break # Only 1 per secondary category
-
-        # 3. Third pass: Fill remaining slots until 20
-        # No absolute score threshold (picks best available) to guarantee 20 count
-        for _, row in df_sorted.iterrows():
-            if len(df_top20_list) >= 20: break
-            if row['url'] in selected_urls: continue
-            
-            is_ob = is_obesity_article(row)
-            if is_ob and obesity_count >= MAX_OBESITY: continue
-            
-            df_top20_list.append(row)
-            selected_urls.add(row['url'])
-            if is_ob: obesity_count += 1
+        # 1. High priority category guarantees, 2. max 1 from secondary categories (score >= 5.0),
+        # 3. fill remaining slots with the best available (no absolute threshold, guarantees 20)
+        obesity_mask = pd.Series(obesity, index=df.index).loc[df_sorted.index].values
+        top_positions = select_top_k(
+            df_sorted['final_score'].values,
+            df_sorted['category'].values,
+            k=k,
+            keys=df_sorted['url'].values,
+            min_quotas=min_quotas,
+            secondary_quota=secondary_quota,
+            secondary_floor=secondary_floor,
+            tag_masks={'obesity': obesity_mask},
+            tag_caps={'obesity': max_obesity},
+            category_order=df['category'].unique()
+        )
 
-        if df_top20_list:
-            df_top20_balanced = pd.DataFrame(df_top20_list).sort_values(by='final_score', ascending=False)
-            df_top20_balanced = df_top20_balanced.head(20)
+        if len(top_positions):
+            df_top20_balanced = df_sorted.iloc[top_positions]
             
             # Mark is_top20 in the main dataframe
             df_sorted['is_top20'] = df_sorted['url'].isin(df_top20_balanced['url'])
@@ -416,13 +338,65 @@ def rank_articles():
         else:
             df_sorted['is_top20'] = False
             df_top20_display = df_sorted.head(0)
+
+        return df_sorted, df_top20_display
+
+    def rank_dataframe(self, df):
+        """Score and balance one article frame. Returns (df_sorted with is_top20, top-20 frame)"""
+        df, obesity = self.score_dataframe(df)
+        return self.select_top(df, obesity)
+
+    def rank_file(self, input_file):
+        """Rank one raw article CSV and write its articles_ranked_* file atomically"""
+        df = load_articles(input_file, verbose=self.verbose)
+        if df.empty:
+            return None, None
+        df_sorted, df_top = self.rank_dataframe(df)
+        output_file = ranked_output_path(input_file)
+        save_ranked(df_sorted, output_file)
+        return output_file, df_top
+
+
+def rank_articles():
+    """Rank the latest article file using the LightGBM model"""
+    print("="*70)
+    print(">>> Ranking Articles with LightGBM Model...")
+    print("="*70)
+    
+    try:
+        # Step 1: Find latest article file
+        print("\n[Step 1/6] Finding article files...")
+        csv_files = find_article_files()
+        
+        if not csv_files:
+            print("[ERROR] No article CSVs found.")
+            return
+        
+        latest_file = max(csv_files, key=extract_date_from_filename)
+        print(f"[OK] Found: {os.path.basename(latest_file)}")
+        
+        # Step 2: Load articles
+        print("\n[Step 2/6] Loading article data...")
+        df = load_articles(latest_file)
+        
+        if df.empty:
+            print("[ERROR] File is empty.")
+            return
+        
+        try:
+            ranker = ArticleRanker()
+        except FileNotFoundError as e:
+            print(f"[ERROR] {e}")
+            return
+        
+        df_sorted, df_top20_display = ranker.rank_dataframe(df)
+        ranker.close()
         
         # Step 8: Save results
         print("\n[Step 8/8] Saving results...")
-        date_str = os.path.basename(latest_file).replace("articles_", "").replace(".csv", "")
-        output_file = os.path.join(RAW_DATA_DIR, f"articles_ranked_{date_str}.csv")
+        output_file = ranked_output_path(latest_file)
         
-        df_sorted.to_csv(output_file, index=False, encoding='utf-8-sig')
+        save_ranked(df_sorted, output_file)
         print(f"\n[SUCCESS] Saved ranked articles to:")
         print(f"  {output_file}")
         
@@ -448,5 +422,60 @@ def rank_articles():
         print("\n[FAILED] Ranking process terminated due to error")
         sys.exit(1)
 
+
+def backfill(start=None, end=None, workers=BACKFILL_WORKERS):
+    """
+    Re-rank every raw article file in [start, end] (all files by default) in one process.
+    The model bundle and encoder are loaded once; files stream through a thread pool and
+    embeddings come from the on-disk cache, so only never-seen texts are encoded.
+    """
+    print("="*70)
+    print(">>> Backfill: Re-ranking historical article files...")
+    print("="*70)
+
+    files = find_article_files(start, end)
+    if not files:
+        print("[ERROR] No article CSVs found in range.")
+        return
+    print(f"[OK] {len(files)} files ({extract_date_from_filename(files[0])} ~ {extract_date_from_filename(files[-1])})")
+
+    ranker = ArticleRanker(verbose=False)
+    started = time.time()
+    done, failed = 0, []
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {executor.submit(ranker.rank_file, f): f for f in files}
+            for future in as_completed(futures):
+                input_file = futures[future]
+                try:
+                    output_file, df_top = future.result()
+                    if output_file is None:
+                        print(f"  [SKIP] {os.path.basename(input_file)} (empty)")
+                        continue
+                    done += 1
+                    print(f"  [OK] {os.path.basename(output_file)} ({done}/{len(files)})")
+                except Exception as e:
+                    failed.append(input_file)
+                    print(f"  [ERROR] {os.path.basename(input_file)}: {type(e).__name__}: {e}")
+    finally:
+        ranker.close()
+
+    print(f"\n[SUCCESS] Re-ranked {done} files in {time.time() - started:.1f}s"
+          f" (model {ranker.bundle.version if ranker.bundle else 'none'}, rules {RULES_VERSION})")
+    if failed:
+        print(f"[WARNING] {len(failed)} files failed: {', '.join(os.path.basename(f) for f in failed)}")
+
+
 if __name__ == "__main__":
-    rank_articles()
+    parser = argparse.ArgumentParser(description="Rank articles using the trained LightGBM model")
+    parser.add_argument('--backfill', action='store_true', help="Re-rank all historical article files")
+    parser.add_argument('--start', help="Backfill start date (YYYYMMDD)")
+    parser.add_argument('--end', help="Backfill end date (YYYYMMDD)")
+    parser.add_argument('--workers', type=int, default=BACKFILL_WORKERS, help="Backfill worker threads")
+    args = parser.parse_args()
+
+    if args.backfill:
+        backfill(args.start, args.end, args.workers)
+    else:
+        rank_articles()
@@ -0,0 +1,265 @@
+"""
+Retention for Historical Article Files
+data/articles_raw gains a few CSVs every week and all of them stay in git. Once a
+month is older than keep_days this job:
+
+    canonical crawls (weekly / daily)   folded into one compacted Parquet file per kind and month
+                                        (data/articles/kind=<k>/crawl_month=YYYYMM/), the CSVs removed
+    derived ranked files                dropped (CSV and store partition) - rank_articles.py --backfill
+                                        regenerates them from the canonical crawls
+    per-day aggregates                  kept for every crawl, before anything is dropped
+
+Aggregates (data/articles/_aggregates/, one Parquet file each):
+    category_counts   kind, crawl_date, category, articles
+    keyword_counts    kind, crawl_date, keyword, articles
+    top20             kind, crawl_date, rank, article_id, url, title, category, final_score
+
+The compacted months record the sha256 of each retired CSV, so the dataset manifest,
+the feature store, rank_articles.py and the article catalog keep reading those crawls
+(from the store) as if the files were still there.
+
+    python scripts/retention.py                 # apply (config/pipeline.yaml `retention`)
+    python scripts/retention.py --keep-days 28
+    python scripts/retention.py --aggregates    # refresh the aggregates only
+"""
+import os
+import glob
+import shutil
+import hashlib
+import argparse
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytz
+
+try:
+    from config import load_pipeline_config
+    from data_io import read_table, detect_encoding
+    from score_cache import article_keys
+    from article_store import (list_partitions, partition_files, partition_path, read_articles, write_articles,
+                               compact_month, month_index, parse_filename, STORE_DIR, RAW_DATA_DIR)
+except ImportError:
+    from scripts.config import load_pipeline_config
+    from scripts.data_io import read_table, detect_encoding
+    from scripts.score_cache import article_keys
+    from scripts.article_store import (list_partitions, partition_files, partition_path, read_articles, write_articles,
+                                       compact_month, month_index, parse_filename, STORE_DIR, RAW_DATA_DIR)
+
+AGGREGATES_DIR = "_aggregates"
+CANONICAL_KINDS = ['weekly', 'daily']
+DERIVED_KINDS = ['ranked', 'ranked_daily']
+TOP_K = 20
+
+DEFAULT_SETTINGS = {
+    'keep_days': 56,
+    'drop_derived': True,
+}
+KST = pytz.timezone('Asia/Seoul')
+
+
+def load_settings():
+    """Retention settings from config/pipeline.yaml (defaults if absent)"""
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        settings.update(load_pipeline_config().get('retention', {}) or {})
+    except Exception as e:
+        print(f"[WARNING] Could not read pipeline config: {e}")
+    return settings
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ------------------------------------------------------------------ aggregates
+def aggregate_path(name, store_dir=STORE_DIR):
+    return os.path.join(store_dir, AGGREGATES_DIR, f"{name}.parquet")
+
+
+def load_aggregate(name, kind=None, start=None, end=None, store_dir=STORE_DIR):
+    """One aggregate table (category_counts / keyword_counts / top20), optionally by kind and crawl date range"""
+    path = aggregate_path(name, store_dir)
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    filters = []
+    if kind:
+        filters.append(('kind', 'in', [kind] if isinstance(kind, str) else list(kind)))
+    if start:
+        filters.append(('crawl_date', '>=', start))
+    if end:
+        filters.append(('crawl_date', '<=', end))
+    return pq.read_table(path, filters=filters or None).to_pandas()
+
+
+def day_aggregates(df, kind, crawl_date):
+    """{name: frame} of one crawl"""
+    df = df.reset_index(drop=True)
+    categories = df['category'].fillna('') if 'category' in df.columns else pd.Series('', index=df.index)
+    category_counts = categories.value_counts().rename_axis('category').reset_index(name='articles')
+
+    keywords = df['keywords'] if 'keywords' in df.columns else pd.Series(dtype=object)
+    keywords = keywords.dropna().astype(str).str.split(',').explode().str.strip()
+    keyword_counts = keywords[keywords != ''].value_counts().rename_axis('keyword').reset_index(name='articles')
+
+    top = df.iloc[0:0]
+    if kind in DERIVED_KINDS:
+        if 'is_top20' in df.columns:
+            top = df[df['is_top20'].fillna(False).astype(str).str.lower().isin(['true', '1'])]
+        elif 'final_score' in df.columns:
+            top = df.sort_values('final_score', ascending=False, kind='stable').head(TOP_K)
+    top20 = pd.DataFrame({
+        'rank': range(1, len(top) + 1),
+        'article_id': article_keys(top)[0] if len(top) else [],
+        'url': top['url'].astype(str).tolist() if 'url' in top.columns else [None] * len(top),
+        'title': top['title'].astype(str).tolist() if 'title' in top.columns else [None] * len(top),
+        'category': top['category'].tolist() if 'category' in top.columns else [None] * len(top),
+        'final_score': pd.to_numeric(top['final_score'], errors='coerce').tolist()
+        if 'final_score' in top.columns else [None] * len(top),
+    })
+
+    frames = {'category_counts': category_counts, 'keyword_counts': keyword_counts, 'top20': top20}
+    for frame in frames.values():
+        frame.insert(0, 'crawl_date', crawl_date)
+        frame.insert(0, 'kind', kind)
+    return frames
+
+
+def update_aggregates(store_dir=STORE_DIR):
+    """
+    Aggregate crawls not aggregated yet plus every uncompacted partition (those may still be rewritten);
+    rows of crawls that left the store (dropped ranked files) are kept. Returns crawls aggregated.
+    """
+    names = ['category_counts', 'keyword_counts', 'top20']
+    existing = {name: load_aggregate(name, store_dir=store_dir) for name in names}
+    done = set()
+    if not existing['category_counts'].empty:
+        done = set(zip(existing['category_counts']['kind'], existing['category_counts']['crawl_date']))
+
+    todo = [(key, path) for key, path in sorted(partition_files(store_dir).items(), key=lambda i: (i[0][1], i[0][0]))
+            if key not in done or 'crawl_date=' in path]
+    if not todo:
+        return 0
+
+    fresh = {name: [] for name in names}
+    for (kind, crawl_date), _ in todo:
+        df = read_articles(kind, crawl_date, crawl_date, store_dir=store_dir)
+        for name, frame in day_aggregates(df, kind, crawl_date).items():
+            fresh[name].append(frame)
+
+    redone = pd.DataFrame([key for key, _ in todo], columns=['kind', 'crawl_date'])
+    for name in names:
+        frame = existing[name]
+        if not frame.empty:
+            stale = frame.merge(redone, on=['kind', 'crawl_date'], how='left', indicator=True)['_merge'] == 'both'
+            frame = frame[~stale.values]
+        parts = [f for f in [frame] + fresh[name] if not f.empty]
+        if not parts:
+            continue
+        frame = pd.concat(parts, ignore_index=True)
+        frame = frame.sort_values(['crawl_date', 'kind'], kind='stable').reset_index(drop=True)
+        path = aggregate_path(name, store_dir)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        try:
+            pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), tmp_path, compression='zstd')
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return len(todo)
+
+
+# ------------------------------------------------------------------ retention
+def retired_months(partitions, cutoff):
+    """Months (YYYYMM) that ended before cutoff (YYYYMMDD)"""
+    cutoff_month = cutoff[:6]
+    return sorted({d[:6] for _, d in partitions if d[:6] < cutoff_month})
+
+
+def apply_retention(keep_days=None, drop_derived=None, raw_dir=RAW_DATA_DIR, store_dir=STORE_DIR, today=None):
+    """Compact, drop and aggregate everything from months older than keep_days. Returns a stats dict."""
+    settings = load_settings()
+    keep_days = settings['keep_days'] if keep_days is None else keep_days
+    drop_derived = settings['drop_derived'] if drop_derived is None else drop_derived
+    today = today or datetime.now(KST).strftime('%Y%m%d')
+    cutoff = (datetime.strptime(today, '%Y%m%d') - timedelta(days=keep_days)).strftime('%Y%m%d')
+    stats = {'cutoff': cutoff, 'imported': 0, 'compacted': 0, 'dropped': 0, 'csv_removed': 0, 'bytes_freed': 0}
+
+    # 1. Every CSV of a retired month must be in the store before anything is removed
+    csv_files = {}
+    in_store = set(partition_files(store_dir))
+    for path in sorted(glob.glob(os.path.join(raw_dir, "articles_*.csv"))):
+        parsed = parse_filename(path)
+        if parsed is None or parsed[1][:6] >= cutoff[:6]:
+            continue
+        csv_files[parsed] = path
+        if parsed not in in_store:
+            write_articles(read_table(path, memo=False), *parsed, store_dir=store_dir)
+            stats['imported'] += 1
+
+    # 2. Aggregates while the derived partitions are still there
+    update_aggregates(store_dir)
+
+    # 3. Canonical crawls -> monthly files (ranked ones too unless they are dropped)
+    compact_kinds = CANONICAL_KINDS + ([] if drop_derived else DERIVED_KINDS)
+    for kind in compact_kinds:
+        partitions = list_partitions(kind, store_dir=store_dir)
+        for month in retired_months(partitions, cutoff):
+            sources = {}
+            for crawl_date in [d for _, d in partitions if d[:6] == month]:
+                csv_path = csv_files.get((kind, crawl_date))
+                if csv_path:
+                    sources[crawl_date] = {'sha256': _sha256(csv_path), 'size': os.path.getsize(csv_path),
+                                           'encoding': detect_encoding(csv_path)}
+                elif os.path.exists(partition_path(kind, crawl_date, store_dir)):
+                    # Crawl only ever written to the store: its partition file stands in for the CSV hash
+                    sources.setdefault(crawl_date, {'sha256': _sha256(partition_path(kind, crawl_date, store_dir))})
+            stats['compacted'] += len(compact_month(kind, month, sources, store_dir))
+
+    # 4. Derived partitions of retired months are dropped (aggregated above)
+    if drop_derived:
+        files = partition_files(store_dir)
+        retired = {files[p] for p in list_partitions(DERIVED_KINDS, end=f"{cutoff[:6]}00", store_dir=store_dir)}
+        for path in sorted(retired):
+            stats['bytes_freed'] += os.path.getsize(path)
+            shutil.rmtree(os.path.dirname(path))
+            stats['dropped'] += 1
+
+    # 5. CSVs whose content is now held (byte-identical hash) by a compacted month, or that were derived
+    files = partition_files(store_dir)
+    for (kind, crawl_date), csv_path in csv_files.items():
+        if kind in DERIVED_KINDS and drop_derived:
+            removable = True
+        else:
+            held = files.get((kind, crawl_date))
+            removable = (held is not None and 'crawl_month=' in held
+                         and month_index(held)[crawl_date].get('sha256') == _sha256(csv_path))
+        if removable:
+            stats['bytes_freed'] += os.path.getsize(csv_path)
+            os.remove(csv_path)
+            stats['csv_removed'] += 1
+        else:
+            print(f"[WARNING] Keeping {os.path.basename(csv_path)}: not held by a compacted month")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact, drop and aggregate historical article files")
+    parser.add_argument('--keep-days', type=int, help="Keep crawls of the last N days as-is (default: config)")
+    parser.add_argument('--keep-derived', action='store_true', help="Compact ranked files instead of dropping them")
+    parser.add_argument('--aggregates', action='store_true', help="Only refresh the per-day aggregates")
+    args = parser.parse_args()
+
+    if args.aggregates:
+        print(f"[OK] Aggregated {update_aggregates()} crawls into {os.path.join(STORE_DIR, AGGREGATES_DIR)}")
+    else:
+        stats = apply_retention(args.keep_days, False if args.keep_derived else None)
+        print(f"[OK] Retention before {stats['cutoff']}: {stats['compacted']} crawls compacted, "
+              f"{stats['dropped']} ranked partitions dropped, {stats['csv_removed']} CSVs removed "
+              f"({stats['bytes_freed'] / 1024 / 1024:.1f} MB freed, {stats['imported']} imported first)")
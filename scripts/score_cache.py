@@ -0,0 +1,134 @@
+"""
+Per-Article Score Records for Incremental Ranking
+Caches the expensive parts of ranking per article so re-ranking after a small
+crawl only scores new or edited rows.
+
+Record key:  (article_id, content_hash)
+    article_id   = sha1(url)[:16]
+    content_hash = sha1(title | summary | keywords | category | score_ag)[:16]
+The LightGBM score is reused only for the same model version (bundle checksum +
+encoder); the strategic columns only for the same RULES_VERSION.
+"""
+import os
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+try:
+    from strategic_rules import RULE_COLUMNS
+    from data_io import atomic_write_csv
+except ImportError:
+    from scripts.strategic_rules import RULE_COLUMNS
+    from scripts.data_io import atomic_write_csv
+
+SCORE_CACHE_FILE = os.path.join("data", "cache", "score_records.csv")
+CONTENT_COLUMNS = ['title', 'summary', 'keywords', 'category', 'score_ag']
+STRATEGIC_COLUMNS = RULE_COLUMNS + ['strategic_score', 'obesity']
+RECORD_COLUMNS = ['article_id', 'content_hash', 'model_version', 'lgbm_score', 'rules_version'] + STRATEGIC_COLUMNS
+
+
+def _short_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def article_keys(df):
+    """(article_id, content_hash) arrays for every row of df"""
+    urls = df['url'].astype(str) if 'url' in df.columns else pd.Series([''] * len(df), index=df.index)
+    parts = []
+    for col in CONTENT_COLUMNS:
+        if col == 'score_ag' and col in df.columns:
+            parts.append(pd.to_numeric(df[col], errors='coerce').fillna(0).map(repr))
+        elif col in df.columns:
+            parts.append(df[col].map(str))
+        else:
+            parts.append(pd.Series([''] * len(df), index=df.index))
+    content = parts[0]
+    for part in parts[1:]:
+        content = content + "\x1f" + part
+    article_ids = np.array([_short_hash(u) for u in urls], dtype=object)
+    content_hashes = np.array([_short_hash(c) for c in content], dtype=object)
+    return article_ids, content_hashes
+
+
+class ScoreCache:
+    """Thread-safe (article_id, content_hash) -> score record store"""
+
+    def __init__(self, path=SCORE_CACHE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._records = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            df = pd.read_csv(self.path, encoding='utf-8', float_precision='round_trip',
+                             dtype={'article_id': str, 'content_hash': str, 'model_version': str, 'rules_version': str})
+            for rec in df.to_dict('records'):
+                self._records[(rec['article_id'], rec['content_hash'])] = rec
+        except Exception as e:
+            print(f"[WARNING] Could not load score cache: {e}")
+
+    def __len__(self):
+        return len(self._records)
+
+    def lookup_lgbm(self, article_ids, content_hashes, model_version):
+        """lgbm_score per row (NaN where no record for this model version)"""
+        out = np.full(len(article_ids), np.nan)
+        with self._lock:
+            for i, key in enumerate(zip(article_ids, content_hashes)):
+                rec = self._records.get(key)
+                if rec is not None and rec.get('model_version') == model_version:
+                    out[i] = rec['lgbm_score']
+        return out
+
+    def lookup_strategic(self, article_ids, content_hashes, rules_version):
+        """DataFrame of STRATEGIC_COLUMNS per row (NaN rows where no record for this rules version)"""
+        out = np.full((len(article_ids), len(STRATEGIC_COLUMNS)), np.nan)
+        with self._lock:
+            for i, key in enumerate(zip(article_ids, content_hashes)):
+                rec = self._records.get(key)
+                if rec is not None and rec.get('rules_version') == rules_version:
+                    out[i] = [rec[col] for col in STRATEGIC_COLUMNS]
+        return pd.DataFrame(out, columns=STRATEGIC_COLUMNS)
+
+    def _record(self, key):
+        rec = self._records.get(key)
+        if rec is None:
+            rec = {col: np.nan for col in RECORD_COLUMNS}
+            rec['article_id'], rec['content_hash'] = key
+            rec['model_version'] = rec['rules_version'] = None
+            self._records[key] = rec
+        return rec
+
+    def update_lgbm(self, article_ids, content_hashes, model_version, scores):
+        with self._lock:
+            for key, score in zip(zip(article_ids, content_hashes), scores):
+                rec = self._record(key)
+                rec['model_version'] = model_version
+                rec['lgbm_score'] = float(score)
+            self._dirty = True
+
+    def update_strategic(self, article_ids, content_hashes, rules_version, strategic):
+        """strategic: DataFrame with STRATEGIC_COLUMNS, rows aligned with the keys"""
+        values = strategic[STRATEGIC_COLUMNS].values.astype(np.float64)
+        with self._lock:
+            for key, row in zip(zip(article_ids, content_hashes), values):
+                rec = self._record(key)
+                rec['rules_version'] = rules_version
+                for col, value in zip(STRATEGIC_COLUMNS, row):
+                    rec[col] = value
+            self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            df = pd.DataFrame(list(self._records.values()), columns=RECORD_COLUMNS)
+            atomic_write_csv(df, self.path, encoding='utf-8')
+            self._dirty = False
+        print(f"[OK] Score cache saved ({len(df)} records)")
@@ -0,0 +1,65 @@
+"""
+Client for the local scoring service (scripts/scoring_service.py)
+Light on purpose (requests + config only) so the dashboards can import it
+without pulling in LightGBM or the encoder.
+"""
+import os
+import requests
+
+try:
+    from config import load_pipeline_config
+except ImportError:
+    from scripts.config import load_pipeline_config
+
+ROW_COLUMNS = ['url', 'title', 'summary', 'keywords', 'category', 'score_ag']
+
+
+def load_service_settings():
+    """Scoring service settings from config/pipeline.yaml (SCORING_SERVICE_URL overrides host/port)"""
+    settings = {'host': '127.0.0.1', 'port': 8765, 'timeout': 10}
+    try:
+        settings.update(load_pipeline_config().get('scoring_service', {}) or {})
+    except Exception as e:
+        print(f"[WARNING] Could not read pipeline config: {e}")
+    settings['url'] = os.getenv('SCORING_SERVICE_URL', f"http://{settings['host']}:{settings['port']}")
+    return settings
+
+
+class ScoringClient:
+    def __init__(self, base_url=None, timeout=None):
+        settings = load_service_settings()
+        self.base_url = (base_url or settings['url']).rstrip('/')
+        self.timeout = timeout or settings['timeout']
+
+    def health(self, timeout=0.5):
+        """Service status dict, or None if it is not running"""
+        try:
+            response = requests.get(f"{self.base_url}/health", timeout=timeout)
+            response.raise_for_status()
+            return response.json()
+        except requests.RequestException:
+            return None
+
+    def _post(self, endpoint, payload):
+        response = requests.post(f"{self.base_url}{endpoint}", json=payload, timeout=self.timeout)
+        if response.status_code != 200:
+            raise RuntimeError(f"Scoring service error {response.status_code}: {response.text[:200]}")
+        return response.json()
+
+    @staticmethod
+    def rows_from_frame(df):
+        """JSON-safe article rows (NaN -> None) with the columns the ranker needs"""
+        cols = [c for c in ROW_COLUMNS if c in df.columns]
+        subset = df[cols].astype(object)
+        return subset.where(subset.notna(), None).to_dict('records')
+
+    def score(self, rows=None, article_ids=None):
+        return self._post('/score', {'rows': rows, 'article_ids': article_ids})
+
+    def select_top(self, rows=None, article_ids=None, k=20, quotas=None, max_obesity=2,
+                   secondary_quota=1, secondary_floor=5.0):
+        payload = {
+            'rows': rows, 'article_ids': article_ids, 'k': k, 'quotas': quotas,
+            'max_obesity': max_obesity, 'secondary_quota': secondary_quota, 'secondary_floor': secondary_floor,
+        }
+        return self._post('/select_top', payload)
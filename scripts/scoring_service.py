@@ -0,0 +1,186 @@
+"""
+Local Scoring Service
+Keeps the model bundle, rule engine and embedding/score caches warm in one
+long-running process so the dashboards can re-rank a view on demand.
+
+Run (from the repository root):
+    python scripts/scoring_service.py [--host 127.0.0.1] [--port 8765]
+
+Endpoints (JSON):
+    GET  /health       model/rules versions and cache sizes
+    POST /score        {"rows": [...]} or {"article_ids": [...]}
+    POST /select_top   same input + {"k": 20, "quotas": {"BD": 8, ...}, "max_obesity": 2,
+                                     "secondary_quota": 1, "secondary_floor": 5.0}
+"""
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from rank_articles import (ArticleRanker, find_article_files, load_articles,
+                           TOP_K, PRIORITY_QUOTAS, MAX_OBESITY, MIN_SCORE_OTHER)
+from score_cache import article_keys
+from strategic_rules import RULES_VERSION
+from scoring_client import load_service_settings
+
+# Flush embedding/score caches to disk at most this often
+CACHE_SAVE_INTERVAL = 60
+RESPONSE_COLUMNS = ['article_id', 'url', 'category', 'lgbm_score', 'strategic_score', 'final_score']
+
+
+class ScoringService:
+    """Warm ranker + article index shared by all request threads"""
+
+    def __init__(self):
+        print(">>> Loading model bundle, encoder and caches...")
+        self.ranker = ArticleRanker(verbose=False)
+        self._articles = None
+        self._articles_lock = threading.Lock()
+        self._last_save = time.time()
+        print(f"[OK] Scoring service ready (model {self.ranker.model_version}, rules {RULES_VERSION})")
+
+    def articles(self):
+        """article_id -> row index over all raw article files (latest file wins), built on first use"""
+        with self._articles_lock:
+            if self._articles is None:
+                frames = [load_articles(f, verbose=False) for f in find_article_files()]
+                frames = [f for f in frames if not f.empty]
+                df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['url'])
+                df['article_id'], _ = article_keys(df)
+                self._articles = df.drop_duplicates(subset=['article_id'], keep='last').set_index('article_id')
+                print(f"[OK] Indexed {len(self._articles)} articles")
+            return self._articles
+
+    def _frame(self, payload):
+        if payload.get('rows'):
+            df = pd.DataFrame(payload['rows'])
+            df = df.where(df.notna(), np.nan)
+        elif payload.get('article_ids'):
+            index = self.articles()
+            ids = [a for a in payload['article_ids'] if a in index.index]
+            df = index.loc[ids].reset_index(drop=True)
+        else:
+            raise ValueError("Request needs 'rows' or 'article_ids'")
+        for col in ['title', 'summary', 'keywords', 'category', 'url']:
+            if col not in df.columns:
+                df[col] = np.nan
+        if 'score_ag' not in df.columns:
+            df['score_ag'] = 0
+        return df
+
+    def _records(self, df):
+        out = df.copy()
+        out['article_id'], _ = article_keys(out)
+        out = out[[c for c in RESPONSE_COLUMNS if c in out.columns]]
+        return json.loads(out.to_json(orient='records', force_ascii=False))
+
+    def score(self, payload):
+        df, _ = self.ranker.score_dataframe(self._frame(payload))
+        return {'articles': self._records(df)}
+
+    def select_top(self, payload):
+        df, obesity = self.ranker.score_dataframe(self._frame(payload))
+        quotas = payload.get('quotas')
+        _, df_top = self.ranker.select_top(
+            df, obesity,
+            k=int(payload.get('k', TOP_K)),
+            min_quotas=list(quotas.items()) if quotas is not None else PRIORITY_QUOTAS,
+            max_obesity=int(payload.get('max_obesity', MAX_OBESITY)),
+            secondary_quota=int(payload.get('secondary_quota', 1)),
+            secondary_floor=float(payload.get('secondary_floor', MIN_SCORE_OTHER))
+        )
+        return {'selected': self._records(df_top), 'n_candidates': len(df)}
+
+    def health(self):
+        return {
+            'status': 'ok',
+            'model_version': self.ranker.model_version,
+            'rules_version': RULES_VERSION,
+            'embedding_cache': len(self.ranker.encoder) if self.ranker.encoder is not None else 0,
+            'score_cache': len(self.ranker.scores),
+        }
+
+    def save_caches(self, force=False):
+        if force or time.time() - self._last_save >= CACHE_SAVE_INTERVAL:
+            self._last_save = time.time()
+            self.ranker.close()
+
+
+class ScoringRequestHandler(BaseHTTPRequestHandler):
+    service = None  # set in serve()
+
+    def _send(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send(200, self.service.health())
+        else:
+            self._send(404, {'error': f"Unknown endpoint: {self.path}"})
+
+    def do_POST(self):
+        handlers = {'/score': self.service.score, '/select_top': self.service.select_top}
+        if self.path not in handlers:
+            self._send(404, {'error': f"Unknown endpoint: {self.path}"})
+            return
+        started = time.time()
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            body = handlers[self.path](payload)
+        except ValueError as e:
+            self._send(400, {'error': str(e)})
+            return
+        except Exception as e:
+            print(f"[ERROR] {self.path}: {type(e).__name__}: {e}")
+            self._send(500, {'error': f"{type(e).__name__}: {e}"})
+            return
+        body['model_version'] = self.service.ranker.model_version
+        body['rules_version'] = RULES_VERSION
+        body['elapsed_ms'] = round((time.time() - started) * 1000, 1)
+        self._send(200, body)
+
+    def log_message(self, format, *args):
+        print(f"[INFO] {self.address_string()} {format % args}")
+
+
+class ScoringHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def service_actions(self):
+        # Runs between requests in the serve_forever loop
+        ScoringRequestHandler.service.save_caches()
+
+
+def serve(host=None, port=None):
+    settings = load_service_settings()
+    host = host or settings['host']
+    port = int(port or settings['port'])
+
+    ScoringRequestHandler.service = ScoringService()
+    server = ScoringHTTPServer((host, port), ScoringRequestHandler)
+    print(f"[OK] Listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[INTERRUPTED] Shutting down scoring service")
+    finally:
+        server.server_close()
+        ScoringRequestHandler.service.save_caches(force=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local scoring service for on-demand ranking")
+    parser.add_argument('--host', help="Bind address (default from config/pipeline.yaml)")
+    parser.add_argument('--port', type=int, help="Port (default from config/pipeline.yaml)")
+    args = parser.parse_args()
+    serve(args.host, args.port)
@@ -0,0 +1,246 @@
+"""
+Strategic Scoring Rules (Business Value Based) - Vectorized
+Same rules as the former row-wise calculate_bd_strategic_score in rank_articles.py,
+evaluated on a precomputed keyword-hit matrix. Every rule's contribution is
+emitted as its own column so the final strategic_score can be audited.
+"""
+import os
+import sys
+import glob
+import json
+import bisect
+import time
+import hashlib
+import numpy as np
+import pandas as pd
+
+# User Feedback:
+# - High Priority: MNC (Global Pharma), Major Distributors (Zuellig, Geo-Young), Key Topics (Patent Expiry, Price Cut, Reimbursement, Co-promotion)
+# - Low Priority: Domestic Pharma Earnings (unless Major Distributor), Minor Clinical Trials (Phase 1/2) without MNC context
+
+# 1. Base Score by Category
+CATEGORY_BASE_SCORES = {
+    'Distribution': 10.0,
+    'Zuellig': 10.0,
+    'Reimbursement': 6.0,  # Lowered from 9: was inflating low-LGBM articles via strategic stacking
+    'Client': 7.0,        # Restored to 7.0 so important Client news isn't lost
+    'BD': 7.0,
+    'Product Approval': 7.0,
+    'Supply Issues': 5.0,
+    'Therapeutic Areas': 5.0,
+    'Regulation': 5.0
+}
+DEFAULT_BASE_SCORE = 2.0
+
+# Keyword groups (matched as substrings of lower-cased title + summary + keywords)
+KEYWORD_GROUPS = {
+    # 2. Commercial Boost Keywords (+3.0)
+    'commercial': [
+        "출시", "판권", "유통", "계약", "파트너", "공동판매", "코프로모션", "허가완료", "급여", "도입",
+        "launch", "license", "distribution", "contract", "partner", "co-promotion", "approval", "reimbursement"
+    ],
+    # 2-1. Co-promotion MUST appear — extra strong boost (+6.0 instead of +3.0)
+    'coprom': ["코프로모션", "공동판매", "co-promotion", "코프로"],
+    # 3. Market Dynamic Keywords (+2.0)
+    'market': [
+        "지오영", "백제", "m&a", "인수", "철수", "한국 법인", "점유율",
+        "geo-young", "market share"
+    ],
+    # 4. Clinical Penalty Keywords (-2.0 with commercial context, else -10.0)
+    'clinical': [
+        "임상", "1상", "2상", "3상", "진입", "시험 중", "파이프라인", "전임상", "후보물질", "연구 결과",
+        "clinical", "phase 1", "phase 2", "phase 3", "trial", "preclinical", "pipeline"
+    ],
+    # 6. General Corporate Penalty for Client news (-5.0)
+    # "흑자전환", "재편" removed: user considers major pharma restructuring/earnings as important Client news
+    'corporate_minor': ["주주총회", "배당", "적자", "단순 실적"],
+    # 7. VIP Client boost (+4.0) (User cited specific MNCs and major domestics)
+    'vip': ["베링거인겔하임", "마운자로", "위고비", "노보노디스크", "릴리", "바이오젠", "화이자", "MSD", "바로팜"],
+    # 8. Specific Exclusion (User Request) -> -100.0
+    'exclusion': ["동아쏘시오", "donga socio", "이뮨온시아", "immuneoncia", "에스바이오메딕스", "s-biomedics", "원바이오젠",
+                  "동물", "사료", "낙태", "살인", "의료진", "구속", "선고"],
+    # 9. Conditional Exclusion for Distribution (User Request) -> -20.0 each
+    'hospital': ['병원'],
+    'bidding': ['입찰'],
+    'deutsche_bank': ['도이치뱅크'],
+    # 10. Obesity Refinement (User Request)
+    'obesity': ['위고비', '마운자로', '삭센다', '오젬픽', 'glp-1', '비만치료제', '비만약', '비만'],
+    'obesity_supply': ['품절', '공급부족', '수급불균형', '공급 차질'],
+    'foreign': ['중국', '미국', '해외 공장', '해외 투자'],
+    'domestic': ['한국', '국내'],
+}
+
+RULE_WEIGHTS = {
+    'coprom': 6.0,
+    'commercial': 3.0,
+    'market': 2.0,
+    'clinical_with_commercial': -2.0,  # e.g. "Phase 3 complete, Launch imminent" -> Mild Penalty
+    'clinical_pure': -10.0,            # Pure Clinical -> Severe Penalty (Remove from Top 20)
+    'corporate_minor': -5.0,           # Milder penalty for very generic IR news
+    'vip': 4.0,
+    'exclusion': -100.0,               # Extreme penalty to ensure it's dropped from Top 20
+    'distribution_exclusion': -20.0,   # Force remove (User Request)
+    'obesity_supply': 4.0,             # Balanced boost for supply issues
+    'obesity_foreign': -3.0,           # Deprioritize foreign investment unless local context exists
+}
+
+# Audit columns in evaluation order; they sum to the unclipped strategic score
+RULE_COLUMNS = [
+    'strategic_base', 'strategic_commercial', 'strategic_market', 'strategic_clinical',
+    'strategic_corporate', 'strategic_vip', 'strategic_exclusion', 'strategic_distribution',
+    'strategic_obesity'
+]
+
+# Changes whenever a rule, keyword or weight changes (used to invalidate cached scores)
+RULES_VERSION = hashlib.sha1(
+    json.dumps([CATEGORY_BASE_SCORES, DEFAULT_BASE_SCORE, KEYWORD_GROUPS, RULE_WEIGHTS],
+               ensure_ascii=False, sort_keys=True).encode('utf-8')
+).hexdigest()[:12]
+
+# Flattened vocabulary: each distinct term is scanned once per batch
+VOCABULARY = sorted({term for terms in KEYWORD_GROUPS.values() for term in terms})
+_TERM_INDEX = {term: i for i, term in enumerate(VOCABULARY)}
+GROUP_COLUMNS = {group: np.array([_TERM_INDEX[t] for t in terms]) for group, terms in KEYWORD_GROUPS.items()}
+
+
+def build_rule_text(df):
+    """Lower-cased title + summary + keywords (str() of missing values, like the row-wise rules)"""
+    parts = []
+    for col in ['title', 'summary', 'keywords']:
+        if col in df.columns:
+            parts.append(df[col].map(str))
+        else:
+            parts.append(pd.Series('', index=df.index))
+    return (parts[0] + " " + parts[1] + " " + parts[2]).str.lower()
+
+
+def keyword_hits(texts):
+    """Boolean hit matrix (n_rows x len(VOCABULARY)) for substring matches"""
+    texts = [str(t) for t in texts]
+    hits = np.zeros((len(texts), len(VOCABULARY)), dtype=bool)
+    if not texts:
+        return hits
+
+    # Scan one NUL-joined corpus per term and map match offsets back to rows
+    # (terms never contain NUL, so a match cannot span two rows)
+    corpus = "\x00".join(texts)
+    row_starts = [0]
+    for t in texts[:-1]:
+        row_starts.append(row_starts[-1] + len(t) + 1)
+    row_ends = row_starts[1:] + [len(corpus) + 1]
+
+    for j, term in enumerate(VOCABULARY):
+        rows = []
+        pos = corpus.find(term)
+        while pos != -1:
+            row = bisect.bisect_right(row_starts, pos) - 1
+            rows.append(row)
+            # Jump to the next row: one hit per row is enough
+            pos = corpus.find(term, row_ends[row])
+        hits[rows, j] = True
+    return hits
+
+
+def group_masks(hits):
+    """Any-hit mask per keyword group"""
+    return {group: hits[:, cols].any(axis=1) for group, cols in GROUP_COLUMNS.items()}
+
+
+def score_from_hits(categories, masks):
+    """
+    Apply the business rules to precomputed group masks.
+    Returns a DataFrame of per-rule contributions plus strategic_score.
+    """
+    categories = pd.Series(categories)
+    category_str = categories.map(str).values
+    is_client = category_str == 'Client'
+    is_distribution = category_str == 'Distribution'
+
+    base = categories.map(CATEGORY_BASE_SCORES).fillna(DEFAULT_BASE_SCORE).values.astype(np.float64)
+
+    commercial = np.where(masks['coprom'], RULE_WEIGHTS['coprom'],
+                          np.where(masks['commercial'], RULE_WEIGHTS['commercial'], 0.0))
+    market = np.where(masks['market'], RULE_WEIGHTS['market'], 0.0)
+    clinical = np.where(masks['clinical'],
+                        np.where(masks['commercial'], RULE_WEIGHTS['clinical_with_commercial'], RULE_WEIGHTS['clinical_pure']),
+                        0.0)
+    corporate = np.where(is_client & masks['corporate_minor'], RULE_WEIGHTS['corporate_minor'], 0.0)
+    vip = np.where(masks['vip'], RULE_WEIGHTS['vip'], 0.0)
+
+    # Exclusion overrides everything accumulated so far (score is set, not adjusted)
+    running = base + commercial + market + clinical + corporate + vip
+    exclusion = np.where(masks['exclusion'], RULE_WEIGHTS['exclusion'] - running, 0.0)
+
+    distribution = (
+        np.where(is_distribution & masks['hospital'] & masks['bidding'], RULE_WEIGHTS['distribution_exclusion'], 0.0)
+        + np.where(is_distribution & masks['deutsche_bank'], RULE_WEIGHTS['distribution_exclusion'], 0.0)
+    )
+
+    obesity = (
+        np.where(masks['obesity'] & masks['obesity_supply'], RULE_WEIGHTS['obesity_supply'], 0.0)
+        + np.where(masks['obesity'] & masks['foreign'] & ~masks['domestic'], RULE_WEIGHTS['obesity_foreign'], 0.0)
+    )
+
+    result = pd.DataFrame({
+        'strategic_base': base,
+        'strategic_commercial': commercial,
+        'strategic_market': market,
+        'strategic_clinical': clinical,
+        'strategic_corporate': corporate,
+        'strategic_vip': vip,
+        'strategic_exclusion': exclusion,
+        'strategic_distribution': distribution,
+        'strategic_obesity': obesity,
+    }, index=categories.index)
+
+    total = np.zeros(len(result))
+    for col in RULE_COLUMNS:
+        total = total + result[col].values
+    result['strategic_score'] = np.maximum(0, total)
+    return result
+
+
+def compute_strategic_scores(df, return_masks=False):
+    """
+    Vectorized strategic score for every row of df.
+    Returns a DataFrame (same index) with RULE_COLUMNS + strategic_score,
+    and optionally the group masks (e.g. 'obesity' for the top-K selector).
+    """
+    texts = build_rule_text(df)
+
+    # Scan each distinct text once (raw and ranked files repeat the same articles)
+    codes, unique_texts = pd.factorize(texts)
+    unique_masks = group_masks(keyword_hits(unique_texts))
+    masks = {group: mask[codes] for group, mask in unique_masks.items()}
+    categories = df['category'] if 'category' in df.columns else pd.Series([None] * len(df), index=df.index)
+    result = score_from_hits(categories.reset_index(drop=True), masks)
+    result.index = df.index
+    if return_masks:
+        return result, masks
+    return result
+
+
+def rescore_history(raw_data_dir="data/articles_raw"):
+    """Re-score every ranked file in place (in memory) and compare with the stored strategic_score"""
+    try:
+        from data_io import read_table
+    except ImportError:
+        from scripts.data_io import read_table
+    files = sorted(glob.glob(os.path.join(raw_data_dir, "articles_ranked_*.csv")))
+    total_rows = 0
+    start = time.time()
+    for f in files:
+        df = read_table(f, memo=False)
+        scores = compute_strategic_scores(df)
+        total_rows += len(df)
+        if 'strategic_score' in df.columns:
+            changed = int((~np.isclose(scores['strategic_score'].values,
+                                       pd.to_numeric(df['strategic_score'], errors='coerce').fillna(-1).values)).sum())
+            print(f"  {os.path.basename(f)}: {len(df)} rows, {changed} changed vs stored score")
+        else:
+            print(f"  {os.path.basename(f)}: {len(df)} rows (no stored score)")
+    print(f"[OK] Re-scored {total_rows} rows from {len(files)} files in {time.time() - start:.2f}s (rules {RULES_VERSION})")
+
+
+if __name__ == "__main__":
+    rescore_history(sys.argv[1] if len(sys.argv) > 1 else "data/articles_raw")
@@ -0,0 +1,168 @@
+"""
+Quota-Constrained Top-K Selector
+Category-balanced picking on NumPy arrays (used by rank_articles.py and the dashboards' fallback AI view)
+
+Passes (same semantics as the original three iterrows() passes):
+  1. Guarantees: for each (category, n) in min_quotas, take the best n of that category
+  2. Secondary: for every other category, take up to secondary_quota articles scoring >= secondary_floor
+  3. Fill: take the best remaining articles until k are selected
+Throughout, keys (e.g. URLs) are picked at most once, per-category max quotas and
+per-tag caps (e.g. MAX_OBESITY) are respected, and articles below min_score are never picked.
+
+Candidates are ranked by (score desc, input position asc). Per-category heaps and one global
+heap are built in O(n) and popped lazily, so a selection costs O(n + m log n) where m is the
+number of candidates actually inspected (picks + skips, typically a few dozen).
+"""
+import heapq
+import numpy as np
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and value != value)
+
+
+class _LazyHeap:
+    """Min-heap of (rank_key, position) with peek/pop"""
+
+    def __init__(self, items):
+        self._heap = list(items)
+        heapq.heapify(self._heap)
+
+    def peek(self):
+        return self._heap[0][1] if self._heap else None
+
+    def pop(self):
+        return heapq.heappop(self._heap)[1] if self._heap else None
+
+
+def select_top_k(scores, categories, k=20, keys=None, min_quotas=(), max_quotas=None,
+                 secondary_quota=0, secondary_floor=None, min_score=None,
+                 tag_masks=None, tag_caps=None, category_order=None):
+    """
+    Select up to k positions from the candidate arrays.
+
+    Args:
+        scores: 1-D array of scores (higher is better)
+        categories: 1-D array of category labels (missing labels only compete in the fill pass)
+        k: number of articles to select
+        keys: 1-D array of identity keys (e.g. url); defaults to positions
+        min_quotas: ordered [(category, n), ...] guaranteed in pass 1
+        max_quotas: {category: max} hard caps across all passes
+        secondary_quota: picks per non-guaranteed category in pass 2 (0 disables the pass)
+        secondary_floor: minimum score for pass 2 picks
+        min_score: minimum score for any pick
+        tag_masks: {tag: bool array} precomputed tags (e.g. {'obesity': mask})
+        tag_caps: {tag: max picks carrying that tag}
+        category_order: iteration order of categories in pass 2 (default: first appearance)
+
+    Returns:
+        np.ndarray of selected positions ordered by score (best first)
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    categories = np.asarray(categories, dtype=object)
+    n = len(scores)
+    keys = np.arange(n) if keys is None else np.asarray(keys, dtype=object)
+    max_quotas = max_quotas or {}
+    tag_masks = {tag: np.asarray(mask, dtype=bool) for tag, mask in (tag_masks or {}).items()}
+    tag_caps = {tag: cap for tag, cap in (tag_caps or {}).items() if tag in tag_masks}
+
+    # Rank key: NaN scores go last, ties keep input order
+    rank_keys = np.where(np.isnan(scores), np.inf, -scores)
+
+    pools = {}
+    for pos in range(n):
+        cat = categories[pos]
+        if _is_missing(cat):
+            continue
+        pools.setdefault(cat, []).append((rank_keys[pos], pos))
+    heaps = {cat: _LazyHeap(items) for cat, items in pools.items()}
+    global_heap = _LazyHeap(zip(rank_keys, range(n)))
+
+    selected = []
+    selected_keys = set()
+    category_counts = {}
+    tag_counts = {tag: 0 for tag in tag_caps}
+
+    def blocked(pos):
+        """True if pos can never be picked again (selection state only grows)"""
+        if keys[pos] in selected_keys:
+            return True
+        if min_score is not None and not scores[pos] >= min_score:  # also drops NaN
+            return True
+        cat = categories[pos]
+        if cat in max_quotas and category_counts.get(cat, 0) >= max_quotas[cat]:
+            return True
+        for tag, cap in tag_caps.items():
+            if tag_masks[tag][pos] and tag_counts[tag] >= cap:
+                return True
+        return False
+
+    def pick(pos):
+        selected.append(pos)
+        selected_keys.add(keys[pos])
+        cat = categories[pos]
+        category_counts[cat] = category_counts.get(cat, 0) + 1
+        for tag in tag_counts:
+            if tag_masks[tag][pos]:
+                tag_counts[tag] += 1
+
+    # 1. Guarantees per priority category
+    guaranteed = set()
+    for cat, quota in min_quotas:
+        guaranteed.add(cat)
+        heap = heaps.get(cat)
+        added = 0
+        while heap is not None and added < quota:
+            pos = heap.pop()
+            if pos is None:
+                break
+            if blocked(pos):
+                continue
+            pick(pos)
+            added += 1
+
+    # 2. Secondary categories (score floor, few picks each)
+    if secondary_quota > 0:
+        if category_order is None:
+            category_order = list(dict.fromkeys(c for c in categories if not _is_missing(c)))
+        for cat in category_order:
+            if _is_missing(cat) or cat in guaranteed:
+                continue
+            heap = heaps.get(cat)
+            added = 0
+            while heap is not None and added < secondary_quota:
+                pos = heap.peek()
+                if pos is None:
+                    break
+                if secondary_floor is not None and scores[pos] < secondary_floor:
+                    break
+                heap.pop()
+                if blocked(pos):
+                    continue
+                pick(pos)
+                added += 1
+
+    # 3. Fill with the best remaining candidates
+    while len(selected) < k:
+        pos = global_heap.pop()
+        if pos is None:
+            break
+        if blocked(pos):
+            continue
+        pick(pos)
+
+    # Best k by score (passes 1-2 can overshoot k)
+    selected = np.asarray(selected, dtype=np.int64)
+    return selected[_argsort_desc(scores[selected])][:k]
+
+
+def _argsort_desc(values):
+    """
+    Descending argsort with the same tie order as DataFrame.sort_values(ascending=False)
+    (reverse, quicksort, reverse; NaN last), so a trim at k matches the pandas-based ranking.
+    """
+    idx = np.arange(len(values))
+    valid = ~np.isnan(values)
+    non_nan, non_nan_idx = values[valid][::-1], idx[valid][::-1]
+    order = non_nan_idx[non_nan.argsort(kind='quicksort')][::-1]
+    return np.concatenate([order, idx[~valid]])
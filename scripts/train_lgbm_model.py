@@ -5,22 +5,24 @@ Optimized for small datasets and production use
 import pandas as pd
 import numpy as np
 import os
-import pickle
 import lightgbm as lgb
-from sentence_transformers import SentenceTransformer
+from embedding_backend import get_embedding_backend
+from model_bundle import save_bundle, read_manifest, update_manifest, BUNDLE_DIR
+from feature_store import FeatureStore
+from lgb_dataset_cache import DatasetCache
+from label_store import load_labels_frame
+from score_cache import article_keys
+from projection import get_projection, iter_batches, load_settings as load_projection_settings
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import roc_auc_score, accuracy_score
 from datetime import datetime
 
 # Configuration
-LABELS_FILE = "data/labels/labels_master.csv"
 RAW_DATA_DIR = "data/articles_raw"
 MODEL_DIR = "model"
 LOG_DIR = "data/logs"
 
-MODEL_PATH = os.path.join(MODEL_DIR, "lgbm_model.txt")
-SCALER_PATH = os.path.join(MODEL_DIR, "scaler.pkl")
 
 # LightGBM Hyperparameters (optimized for small data)
 LGBM_PARAMS = {
@@ -37,6 +39,17 @@ LGBM_PARAMS = {
     'max_depth': 5
 }
 
+
+def get_lgbm_params():
+    """LGBM_PARAMS overridden by the winning params of the last --tune run (stored in the bundle manifest)"""
+    params = dict(LGBM_PARAMS)
+    manifest = read_manifest(BUNDLE_DIR) or {}
+    tuning = manifest.get('tuning')
+    if tuning and tuning.get('best_params'):
+        params.update(tuning['best_params'])
+        print(f"  - Using tuned params from {tuning.get('tuned_at', 'last tuning run')} (CV AUC {tuning.get('cv_auc', float('nan')):.4f})")
+    return params, tuning
+
 # Ensure directories
 os.makedirs(MODEL_DIR, exist_ok=True)
 os.makedirs(LOG_DIR, exist_ok=True)
@@ -51,90 +64,74 @@ def get_days_since(date_str):
         return 0
 
 
-def load_data():
-    """Load and merge labeled data with raw features"""
+def load_data(store, labels_as_of=None):
+    """
+    Load labeled data merged with raw features (raw articles come from the feature store).
+    Labels are a label store snapshot (at labels_as_of, default now), recorded in df.attrs['labels_as_of'].
+    """
     print("\n>>> Loading Data...")
     
     # Load labels
-    try:
-        labels_df = pd.read_csv(LABELS_FILE, encoding='utf-8')
-    except UnicodeDecodeError:
-        labels_df = pd.read_csv(LABELS_FILE, encoding='cp949')
+    labels_df, as_of = load_labels_frame(labels_as_of)
+    if labels_df is None or labels_df.empty:
+        print("No labels found.")
+        return None
+    print(f"  - Labels: {len(labels_df)} rows "
+          + (f"(label store snapshot at {as_of})" if as_of else "(labels_master.csv)"))
     
     labels_df['url'] = labels_df['url'].astype(str)
     
-    # Load all raw CSVs
-    import glob
-    all_files = glob.glob(os.path.join(RAW_DATA_DIR, "articles_*.csv"))
-    all_files.sort()
-    
-    raw_df_list = []
-    for f in all_files:
-        try:
-            raw_df_list.append(pd.read_csv(f, encoding='utf-8'))
-        except UnicodeDecodeError:
-            raw_df_list.append(pd.read_csv(f, encoding='cp949'))
-    
-    if not raw_df_list:
+    # Only new or modified raw CSVs are read; the rest is already in the store
+    store.sync_articles()
+    if store.articles.empty:
         print("No raw articles found.")
         return None
-        
-    raw_df = pd.concat(raw_df_list, ignore_index=True)
-    raw_df['url'] = raw_df['url'].astype(str)
-    raw_df = raw_df.drop_duplicates(subset=['url'], keep='last')
     
-    # Merge
-    df = pd.merge(labels_df, raw_df, on='url', how='inner', suffixes=('_label', '_raw'))
+    n_new_labels = store.sync_labels(labels_df)
+    print(f"  - {n_new_labels} new/changed labels since the last run")
     
-    # Use raw columns
-    for col in ['title', 'summary', 'published_date', 'category', 'score_ag']:
-        if f'{col}_raw' in df.columns:
-            df[col] = df[f'{col}_raw']
+    # Merge (raw title/summary/published_date/category/score_ag win over the label file's copies)
+    df = store.training_frame(labels_df)
+    df.attrs['labels_as_of'] = as_of
     
     print(f"[OK] Loaded {len(df)} labeled articles")
     return df
 
 
-def extract_features(df):
+def extract_features(df, store, refit_projection=False):
     """Extract features for LightGBM"""
     print("\n>>> Extracting Features...")
     
     # Load sentence transformer (Korean-Specific Model)
-    print("  - Loading Korean embedding model (jhgan/ko-sroberta-multitask)...")
-    model_st = SentenceTransformer('jhgan/ko-sroberta-multitask')
-    
-    # Text embeddings
-    print("  - Encoding text features...")
-    text_embeddings = model_st.encode(
-        (df['title'] + " " + df['summary'].fillna('')).tolist(),
-        show_progress_bar=True
-    )
-    
-    # PCA: Encode 768 -> 128 dimensions (RoBERTa is 768d)
-    from sklearn.decomposition import PCA
-    print("  - Reducing dimensions (PCA 768 -> 128)...")
-    pca = PCA(n_components=128, random_state=42)
-    text_features = pca.fit_transform(text_embeddings)
-    
-    # Save PCA model
-    PCA_PATH = os.path.join(MODEL_DIR, "pca.pkl")
-    with open(PCA_PATH, 'wb') as f:
-        pickle.dump(pca, f)
-    print(f"[OK] PCA model saved to {PCA_PATH}")
-
+    print("  - Loading Korean embedding model...")
+    model_st = get_embedding_backend()
+    print(f"  - Backend: {model_st.name} ({model_st.model_name})")
+    
+    # Text embeddings are read batch by batch through the embedding cache
+    # (only texts missing from the cache are encoded) - the full matrix is never held in memory
+    texts = (df['title'] + " " + df['summary'].fillna('')).tolist()
+    settings = load_projection_settings()
+    hits, misses = store.encoder_stats()
+    
+    def embed(batch):
+        return store.embeddings(batch, model_st, verbose=False)
+    
+    # PCA 768 -> 128: reuse the current bundle's projection unless the refit policy says otherwise
+    print("  - Projecting text embeddings (PCA 768 -> 128)...")
+    pca, _ = get_projection(texts, embed, f"{model_st.name}:{model_st.model_name}", settings,
+                            force_refit=refit_projection)
+    text_features = np.vstack([pca.transform(batch) for batch in iter_batches(texts, embed, settings['batch_size'])])
+    new_hits, new_misses = store.encoder_stats()
+    print(f"  - Encoded {new_misses - misses} new texts ({new_hits - hits} cache reads)")
+    # Projection is saved inside the model bundle (raw + fused with the scaler) after training
     
     # Metadata features
     print("  - Extracting metadata features...")
     df['score_ag'] = pd.to_numeric(df['score_ag'], errors='coerce').fillna(0)
     
-    # Category encoding (one-hot)
+    # Category encoding (one-hot) - column order becomes the bundle's feature schema
     category_dummies = pd.get_dummies(df['category'], prefix='cat')
-    
-    # Save category columns
-    import joblib
-    CAT_COLS_PATH = os.path.join(MODEL_DIR, "category_cols.pkl")
-    joblib.dump(category_dummies.columns.tolist(), CAT_COLS_PATH)
-    print(f"[OK] Category columns saved to {CAT_COLS_PATH}")
+    category_cols = category_dummies.columns.tolist()
     
     # Removed days_old - it was causing temporal bias
     
@@ -146,6 +143,15 @@ def extract_features(df):
     # Combine
     X = np.hstack([text_features, meta_features])
     
+    y, weights = get_labels_and_weights(df)
+    
+    print(f"[OK] Feature extraction complete: {X.shape}")
+    print(f"[OK] Text features: {pca.n_components_} dims (PCA {pca.version}) + Metadata: {meta_features.shape[1]} features")
+    return X, y, weights, df, pca, category_cols
+
+
+def get_labels_and_weights(df):
+    """Reward labels (handles merge suffixes) and score_ag-based sample weights"""
     # Get reward labels (handle suffix from merge)
     if 'reward' in df.columns:
         y = df['reward'].values
@@ -159,31 +165,32 @@ def extract_features(df):
     # Create sample weights based on score_ag (Higher score = More important to learn)
     weights = df['score_ag'].values
     weights = np.clip(weights, 1, 10) # Clip 1~10
-    
-    print(f"[OK] Feature extraction complete: {X.shape}")
-    print(f"[OK] Text features: 128 dims (PCA) + Metadata: {meta_features.shape[1]} features")
-    return X, y, weights, df
+    return y, weights
 
 
-def train_model():
-    """Train LightGBM model"""
+def train_model(refit_projection=False, labels_as_of=None):
+    """Train LightGBM model (labels_as_of: reproduce a run from an earlier label snapshot)"""
     print("="*70)
     print(">>> Starting LightGBM Training...")
     print("="*70)
     
     # Load data
-    df = load_data()
+    store = FeatureStore(raw_data_dir=RAW_DATA_DIR)
+    df = load_data(store, labels_as_of)
     if df is None or len(df) == 0:
         print("No data available for training.")
         return
+    # The snapshot actually read (the normalized --labels-as-of, or now); None for labels_master.csv
+    labels_as_of = df.attrs.get('labels_as_of')
     
     # Extract features
-    X, y, weights, df = extract_features(df)
+    X, y, weights, df, pca, category_cols = extract_features(df, store, refit_projection)
+    store.save()
     
     # Stratified split (Splitting X, y, AND weights)
     print("\n>>> Splitting Data...")
-    X_train, X_test, y_train, y_test, w_train, w_test = train_test_split(
-        X, y, weights,
+    X_train, X_test, y_train, y_test, w_train, w_test, _, test_idx = train_test_split(
+        X, y, weights, np.arange(len(y)),
         test_size=0.3,
         stratify=y,
         random_state=42
@@ -199,20 +206,17 @@ def train_model():
     X_train_scaled = scaler.fit_transform(X_train)
     X_test_scaled = scaler.transform(X_test)
     
-    # Save scaler
-    with open(SCALER_PATH, 'wb') as f:
-        pickle.dump(scaler, f)
-    print(f"[OK] Scaler saved to {SCALER_PATH}")
-    
     # Create LightGBM datasets WITH WEIGHTS
     print("\n>>> Training LightGBM Model (Weighted by score_ag)...")
-    train_data = lgb.Dataset(X_train_scaled, label=y_train, weight=w_train)
-    test_data = lgb.Dataset(X_test_scaled, label=y_test, weight=w_test, reference=train_data)
-
+    params, tuning = get_lgbm_params()
+    # Binned datasets are reused from data/cache/lgb_datasets when the features are unchanged
+    datasets = DatasetCache()
+    train_data = datasets.dataset(X_train_scaled, y_train, w_train, params)
+    test_data = datasets.dataset(X_test_scaled, y_test, w_test, params, reference=train_data)
     
     # Train
     model = lgb.train(
-        LGBM_PARAMS,
+        params,
         train_data,
         num_boost_round=100,
         valid_sets=[train_data, test_data],
@@ -223,10 +227,6 @@ def train_model():
         ]
     )
     
-    # Save model
-    model.save_model(MODEL_PATH)
-    print(f"\n[OK] Model saved to {MODEL_PATH}")
-    
     # Evaluate
     print("\n>>> Evaluating on Test Set...")
     y_pred_proba = model.predict(X_test_scaled)
@@ -243,14 +243,38 @@ def train_model():
     top_indices = np.argsort(-y_pred_proba)[:top_k]
     top_k_reward = y_test[top_indices].mean()
     print(f"Test Avg Reward @ Top-{top_k}: {top_k_reward:.4f}")
+    print(f"Dataset construction: {datasets.summary()}")
+    
+    # Save booster + fused PCA/scaler projection + feature schema as one versioned bundle
+    print("\n>>> Saving Model Bundle...")
+    save_bundle(
+        model, pca, scaler, category_cols,
+        bundle_dir=BUNDLE_DIR,
+        params=params,
+        tuning=tuning,
+        metrics={
+            'test_auc': float(auc),
+            'test_accuracy': float(acc),
+            f'test_reward_at_top{top_k}': float(top_k_reward),
+            'best_iteration': int(model.best_iteration),
+            'n_train': int(len(X_train)),
+            'n_test': int(len(X_test)),
+        }
+    )
+    # Held-out articles: incremental updates validate on these, which the booster never trained on
+    article_ids, _ = article_keys(df)
+    updates = {'validation_ids': sorted(set(article_ids[test_idx]))}
+    if labels_as_of:
+        updates['labels_as_of'] = labels_as_of
+        print(f"  - Label snapshot: {labels_as_of} (reproduce with --labels-as-of)")
+    update_manifest(updates, BUNDLE_DIR)
     
     # Feature importance
     print("\n>>> Top 10 Feature Importances:")
     importance = model.feature_importance(importance_type='gain')
     
     # Reconstruct feature names (removed days_old)
-    category_cols = pd.get_dummies(df['category'], prefix='cat').columns.tolist()
-    feature_names = [f"pca_{i}" for i in range(128)] + ['score_ag'] + category_cols
+    feature_names = [f"pca_{i}" for i in range(pca.n_components_)] + ['score_ag'] + category_cols
     
     importance_df = pd.DataFrame({
         'feature': feature_names,
@@ -264,7 +288,78 @@ def train_model():
     print("="*70)
 
 
+def tune_model(trials=None, budget=None, folds=None, workers=None, grid=False):
+    """Cross-validated hyperparameter search over cached features; winner goes into the bundle manifest"""
+    from lgbm_tuning import run_search, DEFAULT_TRIALS, DEFAULT_BUDGET, DEFAULT_FOLDS, SEARCH_SPACE, TOP_K
+    print("="*70)
+    print(">>> LightGBM Hyperparameter Tuning...")
+    print("="*70)
+    
+    # Features are extracted once for all configurations
+    store = FeatureStore(raw_data_dir=RAW_DATA_DIR)
+    df = load_data(store)
+    if df is None or len(df) == 0:
+        print("No data available for tuning.")
+        return
+    X, y, weights, df, pca, category_cols = extract_features(df, store)
+    store.save()
+    
+    results_df, best_params = run_search(
+        X, y, weights, LGBM_PARAMS,
+        trials=trials or DEFAULT_TRIALS,
+        grid=grid,
+        folds=folds or DEFAULT_FOLDS,
+        budget=budget or DEFAULT_BUDGET,
+        workers=workers
+    )
+    if best_params is None:
+        print("[ERROR] No configuration finished within the budget.")
+        return
+    
+    log_file = os.path.join(LOG_DIR, f"tuning_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+    results_df.to_csv(log_file, index=False, encoding='utf-8-sig')
+    
+    print(f"\n>>> Top 10 Configurations ({len(results_df)} evaluated):")
+    print(results_df.head(10).to_string(index=False))
+    print(f"Dataset construction: {results_df['dataset_seconds'].sum():.2f}s across all configurations")
+    
+    best = results_df.iloc[0]
+    tuning = {
+        'tuned_at': datetime.now().isoformat(timespec='seconds'),
+        'best_params': {k: best_params[k] for k in SEARCH_SPACE if k in best_params},
+        'cv_auc': float(best['cv_auc']),
+        'cv_auc_std': float(best['cv_auc_std']),
+        f'cv_reward_at_top{TOP_K}': float(best[f'cv_reward_at_top{TOP_K}']),
+        'n_folds': int(folds or DEFAULT_FOLDS),
+        'n_configs': int(len(results_df)),
+        'n_samples': int(len(y)),
+        'log_file': log_file,
+    }
+    
+    try:
+        update_manifest({'tuning': tuning}, BUNDLE_DIR)
+        print(f"\n[OK] Winning params written to {BUNDLE_DIR} manifest (used by the next training run)")
+    except FileNotFoundError:
+        print(f"\n[WARNING] No model bundle yet - run training first, then re-run --tune. Results: {log_file}")
+    print(f"[OK] Tuning log saved to {log_file}")
+
+
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Train the LightGBM article ranking model")
+    parser.add_argument('--tune', action='store_true', help="Cross-validated hyperparameter search")
+    parser.add_argument('--trials', type=int, help="Random-search configurations (--tune)")
+    parser.add_argument('--grid', action='store_true', help="Full grid instead of random search (--tune)")
+    parser.add_argument('--budget', type=int, help="Wall-clock budget in seconds (--tune)")
+    parser.add_argument('--folds', type=int, help="Cross-validation folds (--tune)")
+    parser.add_argument('--workers', type=int, help="Worker processes (--tune)")
+    parser.add_argument('--incremental', action='store_true', help="Warm-start update of the current bundle from new labels")
+    parser.add_argument('--refit', action='store_true', help="Refit leaf values instead of adding rounds (--incremental)")
+    parser.add_argument('--refit-projection', action='store_true', help="Refit the PCA projection even if the current one can be reused")
+    parser.add_argument('--labels-as-of', help="Train on the label store snapshot at this time ('YYYY-MM-DD HH:MM:SS', KST)")
+    parser.add_argument('--benchmark', action='store_true', help="Compare incremental update vs full retrain (nothing saved)")
+    args = parser.parse_args()
+    
     # Auto-install LightGBM if needed
     try:
         import lightgbm
@@ -275,4 +370,13 @@ if __name__ == "__main__":
         subprocess.check_call([sys.executable, "-m", "pip", "install", "lightgbm", "-q"])
         print("✅ LightGBM installed")
     
-    train_model()
+    if args.tune:
+        tune_model(args.trials, args.budget, args.folds, args.workers, args.grid)
+    elif args.benchmark:
+        from incremental_training import benchmark
+        benchmark()
+    elif args.incremental:
+        from incremental_training import train_incremental
+        train_incremental('refit' if args.refit else 'continue')
+    else:
+        train_model(refit_projection=args.refit_projection, labels_as_of=args.labels_as_of)